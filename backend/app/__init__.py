@@ -7,6 +7,7 @@ import sys
 from sqlalchemy import inspect
 from models import User, Camera, CameraStatus
 from ip import ipaddress
+from storage import init_storage
 
 # Add parent directory to sys.path so we can import from it
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -29,12 +30,14 @@ def create_app():
 
     from app.auth.routes import auth_bp
     from app.camera.routes import camera_bp
+    from app.nodes.routes import nodes_bp
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(camera_bp)
+    app.register_blueprint(nodes_bp, url_prefix='/api/nodes')
 
     with app.app_context():
-        # Create all tables
-        db.create_all()
+        # SQLite pragmas, create all tables, apply pending migrations
+        init_storage()
 
         inspector = inspect(db.engine)
         print("📋 Tables:", inspector.get_table_names())
@@ -0,0 +1,146 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, current_app, jsonify, request
+
+from rollups import data_version
+
+DEFAULT_TTL = 5.0  # seconds; bounds how far relative ranges ('5min', 'today') lag the clock
+MAX_ENTRIES = 256
+COALESCE_WAIT = 10.0  # seconds a coalesced request waits for the leader before giving up with a 503
+
+
+class CacheWaitTimeout(Exception):
+    """The request computing a coalesced response did not finish in time."""
+
+
+class CachedResponse:
+    def __init__(self, body, version):
+        self.body = body
+        self.version = version
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.created_at = time.monotonic()
+
+
+class _Flight:
+    """One computation in progress; requests for the same key wait for it instead of starting their own."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResponseCache:
+    """
+    JSON responses keyed on (endpoint, query args). An entry is served
+    while it is younger than ttl and the detection log data version it was
+    computed at is still current; the version is bumped in the same
+    transaction as every insert or delete, by whichever process makes it.
+    Concurrent misses on the same key are coalesced: the first request
+    computes, the others wait for its result, but no longer than
+    coalesce_wait so a hung query doesn't hold every worker thread.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=MAX_ENTRIES, coalesce_wait=COALESCE_WAIT):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.coalesce_wait = coalesce_wait
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.not_modified = 0
+        self.wait_timeouts = 0
+
+    def get_or_compute(self, key, version, compute):
+        """The cached response for key at this data version, computing it once if needed."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.version == version and time.monotonic() - entry.created_at < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not flight.done.wait(self.coalesce_wait):
+                with self._lock:
+                    self.wait_timeouts += 1
+                raise CacheWaitTimeout(f"Timed out after {self.coalesce_wait}s waiting for {key[0]}")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = CachedResponse(compute(), version)
+            with self._lock:
+                self._entries[key] = flight.result
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return flight.result
+        except Exception as e:
+            flight.error = e  # waiters fail with it too; nothing is cached
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def get_stats(self):
+        return {
+            'entries': len(self._entries),
+            'in_flight': len(self._flights),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'not_modified': self.not_modified,
+            'wait_timeouts': self.wait_timeouts,
+        }
+
+
+_cache = ResponseCache()
+
+
+def get_response_cache():
+    return _cache
+
+
+def cached_json(endpoint, compute):
+    """
+    Response for a GET route whose JSON payload only depends on its query
+    args and the detection logs. compute() returns the payload; a client
+    sending the current ETag in If-None-Match gets a 304 without a body,
+    and one that gave up waiting for a slow coalesced query gets a 503.
+    """
+    cache = get_response_cache()
+    key = (endpoint, tuple(sorted(request.args.items(multi=True))))
+    try:
+        entry = cache.get_or_compute(key, data_version(), lambda: current_app.json.dumps(compute()).encode())
+    except CacheWaitTimeout as e:
+        print(f"⏳ {e}")
+        response = jsonify({'error': 'The server is busy computing this response, try again shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+
+    if request.if_none_match.contains(entry.etag):
+        cache.not_modified += 1
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = 'no-cache'  # always revalidate, the 304 makes that cheap
+    return response
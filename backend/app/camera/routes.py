@@ -1,7 +1,12 @@
-from flask import Blueprint, send_from_directory, Response, stream_with_context, current_app, jsonify, request
+from flask import Blueprint, send_from_directory, Response, current_app, jsonify, request
 from app.camera.camera_manager import get_camera_manager  # Use the singleton manager already created
 from models import DetectionLog, Camera, CameraStatus
 from app.camera.model import predict_emotion, ResEmoteNet
+from app.nodes.registry import emotion_service_url as emotion_service_url_for, emotion_service_urls
+from app.camera.response_cache import cached_json, get_response_cache
+from app.camera.stream_relay import get_relay_hub
+from camera_registry import get_camera_registry
+from rollups import detection_counts, first_detections, rebuild_rollups
 from extensions import db
 import requests
 import cv2
@@ -28,6 +33,7 @@ from pytz import timezone as pytz_timezone, utc
 camera_bp = Blueprint('camera_feed', __name__)
 
 IST = ZoneInfo("Asia/Kolkata")
+CAMERA_LIST_MAX_AGE = 5.0  # seconds the camera list may lag status changes made on the emotion nodes
 
 # Helper function for resizing with padding (16:9)
 def resize_and_pad(image, target_size):
@@ -66,23 +72,17 @@ def resize_and_pad(image, target_size):
 # Emotion-detected feed from background thread
 @camera_bp.route('/api/camera_feed/<int:camera_id>')
 def camera_feed(camera_id):
-    emotion_service_url = f"http://{ipaddress}:5001/stream/{camera_id}"
+    # Stream from whichever emotion node owns this camera
+    emotion_service_url = f"{emotion_service_url_for(camera_id)}/stream/{camera_id}"
+    # Pass the stream profile through (fps, width, quality, adaptive), e.g. for thumbnail grids
+    profile_params = request.args.to_dict()
 
-    def external_stream():
-        try:
-            with requests.get(emotion_service_url, stream=True, timeout=5) as r:
-                r.raise_for_status()
-                for chunk in r.iter_content(chunk_size=1024):
-                    if chunk:
-                        yield chunk
-        except requests.RequestException as e:
-            current_app.logger.warning(f"External stream failed for camera_id={camera_id}: {e}")
-            # Raise to propagate the error and return HTTP 500
-            raise
-
-    return Response(stream_with_context(external_stream()),
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
+    def relayed_stream():
+        # All viewers of the same feed share one upstream connection and receive whole JPEG parts
+        relay = get_relay_hub().subscribe(camera_id, emotion_service_url, profile_params)
+        yield from relay.stream()
 
+    return Response(relayed_stream(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
 @camera_bp.route('/api/detection-logs', methods=['GET'])
@@ -102,28 +102,31 @@ def get_detection_logs():
     else:
         return jsonify({"error": "Invalid range parameter"}), 400
 
-    # Fetch logs from database
-    if start_time:
-        logs = DetectionLog.query.filter(
-            DetectionLog.timestamp >= start_time
-        ).order_by(DetectionLog.timestamp.desc()).all()
-    else:
-        logs = DetectionLog.query.order_by(
-            DetectionLog.timestamp.desc()
-        ).all()
-
-    # Format logs
-    result = []
-    for log in logs:
-        result.append({
-            'id': log.id,
-            'camera_label': getattr(log, 'camera_label', 'Unknown'),
-            'emotion': log.emotion,
-            'timestamp': log.timestamp.strftime('%b %d, %Y, %I:%M %p') if log.timestamp else None,
-            'image_url': f"/{log.image_path}" if log.image_path else None
-        })
+    def load_logs():
+        # Fetch logs from database
+        if start_time:
+            logs = DetectionLog.query.filter(
+                DetectionLog.timestamp >= start_time
+            ).order_by(DetectionLog.timestamp.desc()).all()
+        else:
+            logs = DetectionLog.query.order_by(
+                DetectionLog.timestamp.desc()
+            ).all()
 
-    return jsonify(result)
+        # Format logs
+        result = []
+        for log in logs:
+            result.append({
+                'id': log.id,
+                'camera_label': getattr(log, 'camera_label', 'Unknown'),
+                'emotion': log.emotion,
+                'timestamp': log.timestamp.strftime('%b %d, %Y, %I:%M %p') if log.timestamp else None,
+                'image_url': f"/{log.image_path}" if log.image_path else None
+            })
+        return result
+
+    # Dashboards poll the same ranges; they share one query per data change and TTL
+    return cached_json('detection-logs', load_logs)
 # Serve alert screenshots
 @camera_bp.route('/alerts/<path:filename>')
 def serve_alert_image(filename):
@@ -133,8 +136,19 @@ def serve_alert_image(filename):
 
 @camera_bp.route('/api/cameras', methods=['GET'])
 def get_cameras():
-    cameras = Camera.query.all()
-    return jsonify([camera.to_dict() for camera in cameras])
+    registry = get_camera_registry()
+    # Status changes made by the emotion nodes (failed reconnects) only reach this process through the DB
+    registry.reload(max_age=CAMERA_LIST_MAX_AGE)
+    return jsonify([info.record for info in registry.all()])
+
+
+@camera_bp.route('/api/backend-stats', methods=['GET'])
+def get_backend_stats():
+    # Shared-work counters of this backend process: cached dashboard responses and one upstream per relayed feed
+    return jsonify({
+        'response_cache': get_response_cache().get_stats(),
+        'relays': get_relay_hub().get_stats(),
+    })
 
 
 @camera_bp.route('/api/detection-analytics', methods=['GET'])
@@ -143,8 +157,12 @@ def get_detection_analytics():
     Returns detection analytics (pie chart, timeline, trends, etc.)
     Filtered by time range: '5m', '30m', '1h', 'today', 'overall'.
     """
-    ist = pytz_timezone('Asia/Kolkata')
     time_range = request.args.get('range', 'overall')
+    return cached_json('detection-analytics', lambda: build_detection_analytics(time_range))
+
+
+def build_detection_analytics(time_range):
+    ist = pytz_timezone('Asia/Kolkata')
     now_utc = datetime.utcnow().replace(tzinfo=utc)
 
     # Define time deltas for short ranges
@@ -167,74 +185,65 @@ def get_detection_analytics():
         delta = time_deltas.get(time_range, timedelta(minutes=5))  # fallback to 5m
         since = now_utc - delta
 
-    # Fetch logs within time window
-    if time_range == 'overall':
-        logs = DetectionLog.query.order_by(DetectionLog.timestamp.asc()).all()
-    else:
-        logs = DetectionLog.query.filter(
-            DetectionLog.timestamp >= since
-        ).order_by(DetectionLog.timestamp.asc()).all()
+    # The stored timestamps are compared as naive values, as the query on the aware bounds always did
+    since_naive = since.replace(tzinfo=None) if since is not None else None
 
-    # Aggregate emotion counts for the current period
-    emotion_counts = defaultdict(int)
-    for log in logs:
-        emotion = log.emotion.upper()
-        emotion_counts[emotion] += 1
-
-    total = sum(emotion_counts.values())
-
-    pie_data = [{'name': emo, 'value': count} for emo, count in emotion_counts.items()]
-    pie_percentage_data = [
-        {'name': emo, 'value': count, 'percentage': round(count / total * 100, 2)}
-        for emo, count in emotion_counts.items()
-    ] if total > 0 else []
-
-    most_frequent_emotion = max(emotion_counts, key=emotion_counts.get) if emotion_counts else None
+    # Per-bucket totals from the rollup tables, no coarser than the timeline groups by
+    coarsest = {'overall': 'day', 'today': 'hour'}.get(time_range, 'minute')
+    rows = detection_counts(start=since_naive, coarsest=coarsest)
 
     # Timeline aggregation with fixed emotions only
     emotions = ['FEAR', 'ANGER', 'SADNESS', 'DISGUST']
     timeline_buckets = defaultdict(lambda: {emo: 0 for emo in emotions})
 
-    def bucket_time(ts, range_type):
-        """Create time buckets based on range type"""
-        ts_ist = ts.replace(tzinfo=utc).astimezone(ist)
-
+    def bucket_time(bucket, range_type):
+        """Create time buckets based on range type; rollup buckets are already on the IST clock"""
         if range_type == 'overall':
             # For overall, group by day
-            return ts_ist.strftime('%Y-%m-%d')
+            return bucket.strftime('%Y-%m-%d')
         elif range_type == 'today':
             # For today, group by hour
-            return ts_ist.strftime('%H:00')
+            return bucket.strftime('%H:00')
         else:
             # For short ranges (5m, 30m, 1h), group by 5-minute intervals
-            minute_bucket = (ts_ist.minute // 5) * 5
-            return ts_ist.replace(minute=minute_bucket, second=0, microsecond=0).strftime('%H:%M')
-
-    for log in logs:
-        if not log.timestamp:
-            continue
-        bucket = bucket_time(log.timestamp, time_range)
-        emo = log.emotion.upper()
+            minute_bucket = (bucket.minute // 5) * 5
+            return bucket.replace(minute=minute_bucket).strftime('%H:%M')
+
+    # Aggregate emotion counts, timeline and confidence for the current period
+    emotion_counts = defaultdict(int)
+    confidence_sums = defaultdict(float)
+    confidence_counts = defaultdict(int)
+    # Emotions enter the dicts in the order they were first detected, as when counting log by log;
+    # that order breaks ties for most_frequent_emotion
+    first_seen = first_detections({row[1] for row in rows}, since_naive)
+    rows.sort(key=lambda row: (row[0], first_seen[row[1]]))
+    for bucket, emotion, count, confidence_sum, confidence_count in rows:
+        emo = emotion.upper()
+        emotion_counts[emo] += count
         if emo in emotions:
-            timeline_buckets[bucket][emo] += 1
+            timeline_buckets[bucket_time(bucket, time_range)][emo] += count
+        if confidence_count:
+            confidence_sums[emo] += confidence_sum
+            confidence_counts[emo] += confidence_count
+
+    total = sum(emotion_counts.values())
+
+    pie_data = [{'name': emo, 'value': count} for emo, count in emotion_counts.items()]
+    pie_percentage_data = [
+        {'name': emo, 'value': count, 'percentage': round(count / total * 100, 2)}
+        for emo, count in emotion_counts.items()
+    ] if total > 0 else []
+
+    most_frequent_emotion = max(emotion_counts, key=emotion_counts.get) if emotion_counts else None
 
     timeline_data = [{'time': time_label, **timeline_buckets[time_label]} for time_label in sorted(timeline_buckets)]
 
     # Previous period for trend comparison (skip for overall)
     trend = {}
     if time_range != 'overall' and delta is not None:
-        previous_since = since - delta
-        previous_until = since
-
-        previous_logs = DetectionLog.query.filter(
-            DetectionLog.timestamp >= previous_since,
-            DetectionLog.timestamp < previous_until
-        ).all()
-
         previous_emotion_counts = defaultdict(int)
-        for log in previous_logs:
-            emo = log.emotion.upper()
-            previous_emotion_counts[emo] += 1
+        for _, emotion, count, _, _ in detection_counts(start=since_naive - delta, end=since_naive):
+            previous_emotion_counts[emotion.upper()] += count
 
         for emo in emotions:
             current = emotion_counts.get(emo, 0)
@@ -260,16 +269,6 @@ def get_detection_analytics():
         peak_times[emo] = peak_time
 
     # Average confidence (intensity) per emotion
-    confidence_sums = defaultdict(float)
-    confidence_counts = defaultdict(int)
-
-    for log in logs:
-        if log.confidence is None:
-            continue
-        emo = log.emotion.upper()
-        confidence_sums[emo] += log.confidence
-        confidence_counts[emo] += 1
-
     avg_intensity = [
         {
             "name": emo,
@@ -278,15 +277,18 @@ def get_detection_analytics():
         for emo in confidence_counts
     ]
 
-    # Additional metadata for overall stats
+    # Additional metadata for overall stats; first and last come straight off the timestamp index
     date_range = {}
-    if logs:
-        first_log = min(logs, key=lambda x: x.timestamp)
-        last_log = max(logs, key=lambda x: x.timestamp)
+    if total:
+        in_range = db.session.query(DetectionLog.timestamp)
+        if since_naive is not None:
+            in_range = in_range.filter(DetectionLog.timestamp >= since_naive)
+        first_timestamp = in_range.order_by(DetectionLog.timestamp.asc()).limit(1).scalar()
+        last_timestamp = in_range.order_by(DetectionLog.timestamp.desc()).limit(1).scalar()
         date_range = {
-            'start_date': first_log.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-            'end_date': last_log.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-            'total_days': (last_log.timestamp - first_log.timestamp).days + 1
+            'start_date': first_timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+            'end_date': last_timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+            'total_days': (last_timestamp - first_timestamp).days + 1
         }
 
     response_data = {
@@ -305,15 +307,17 @@ def get_detection_analytics():
     if time_range == 'overall':
         response_data['date_range'] = date_range
 
-    return jsonify(response_data)
+    return response_data
 
 
 @camera_bp.route('/api/cameras/<int:camera_id>', methods=['GET'])
 def get_camera(camera_id):
-    camera = Camera.query.get(camera_id)
-    if not camera:
+    registry = get_camera_registry()
+    registry.reload(max_age=CAMERA_LIST_MAX_AGE)
+    info = registry.get(camera_id)
+    if not info:
         return jsonify({'error': 'Camera not found'}), 404
-    return jsonify(camera.to_dict()), 200
+    return jsonify(info.record), 200
 
 
 @camera_bp.route('/api/cameras/add', methods=['POST'])
@@ -333,6 +337,7 @@ def create_camera():
         )
         db.session.add(camera)
         db.session.commit()
+        get_camera_registry().upsert(camera)
 
         return jsonify(camera.to_dict()), 201
 
@@ -347,21 +352,22 @@ def delete_camera(camera_id):
     if not camera:
         return jsonify({'error': 'Camera not found'}), 404
 
-    # Notify emotion detection service to stop the camera detector
-    try:
-        # Replace this URL if your emotion service runs on a different host/port
-        response = requests.post(
-            f'http://{ipaddress}/camera_status_update',
-            json={'camera_id': camera_id, 'status': 'Inactive'},
-            timeout=3
-        )
-        if response.status_code != 200:
-            print(f"[WARN] Failed to notify emotion detection service: {response.text}")
-    except Exception as e:
-        print(f"[ERROR] Could not reach emotion detection service: {e}")
+    # Notify every emotion node to stop the camera detector (whichever one runs it)
+    for service_url in emotion_service_urls():
+        try:
+            response = requests.post(
+                f'{service_url}/camera_status_update',
+                json={'camera_id': camera_id, 'status': 'Inactive'},
+                timeout=3
+            )
+            if response.status_code != 200:
+                print(f"[WARN] Failed to notify emotion detection service: {response.text}")
+        except Exception as e:
+            print(f"[ERROR] Could not reach emotion detection service: {e}")
 
     db.session.delete(camera)
     db.session.commit()
+    get_camera_registry().remove(camera_id)
 
     return jsonify({'message': 'Camera deleted successfully'}), 200
 
@@ -379,6 +385,22 @@ def update_camera_status(camera_id):
         return jsonify({'error': 'Invalid status'}), 400
 
     db.session.commit()
+    get_camera_registry().upsert(camera)
+
+    # The emotion nodes keep their own camera registry; tell them like update_camera does
+    if camera.status == CameraStatus.Active:
+        service_urls = [emotion_service_url_for(camera_id)]
+    else:
+        service_urls = emotion_service_urls()
+    for service_url in service_urls:
+        try:
+            requests.post(f"{service_url}/camera_status_update", json={
+                "camera_id": camera_id,
+                "status": camera.status.name
+            }, timeout=3)
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Failed to notify emotion_worker_service: {e}")
+
     return jsonify({'message': f'Status updated to {camera.status.value}'}), 200
 
 
@@ -430,16 +452,22 @@ def update_camera(camera_id):
     except Exception:
         db.session.rollback()
         return jsonify({'error': 'Failed to update camera'}), 500
+    get_camera_registry().upsert(camera)
 
-    # Notify emotion worker service
-    try:
-        requests.post(f"http://{ipaddress}:5001/camera_status_update", json={
-            "camera_id": camera_id,
-            "status": camera.status.name  # "Active" or "Inactive"
-        })
-        print(f"📡 Notified emotion_worker_service of status change for camera {camera_id}")
-    except requests.exceptions.RequestException as e:
-        print(f"⚠️ Failed to notify emotion_worker_service: {e}")
+    # Notify the owning emotion node on activation, every node on deactivation
+    if camera.status == CameraStatus.Active:
+        service_urls = [emotion_service_url_for(camera_id)]
+    else:
+        service_urls = emotion_service_urls()
+    for service_url in service_urls:
+        try:
+            requests.post(f"{service_url}/camera_status_update", json={
+                "camera_id": camera_id,
+                "status": camera.status.name  # "Active" or "Inactive"
+            })
+            print(f"📡 Notified emotion_worker_service of status change for camera {camera_id}")
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Failed to notify emotion_worker_service: {e}")
 
     return jsonify(camera.to_dict()), 200
 
@@ -741,6 +769,8 @@ def delete_logs_by_camera(camera_id):
 
         # Delete logs from database
         deleted_count = DetectionLog.query.filter_by(camera_id=camera_id).delete()
+        # A bulk delete skips the ORM flush, so recompute the rollups it touched
+        rebuild_rollups(db.session.connection(), camera_id=camera_id)
         db.session.commit()
 
         # Delete associated image files
@@ -784,6 +814,7 @@ def clear_all_detection_logs():
 
         # Delete all logs
         deleted_count = DetectionLog.query.delete()
+        rebuild_rollups(db.session.connection())
         db.session.commit()
 
         # Delete all associated image files
@@ -839,6 +870,7 @@ def cleanup_old_detection_logs():
 
         # Delete old logs
         deleted_count = DetectionLog.query.filter(DetectionLog.timestamp < cutoff_date).delete()
+        rebuild_rollups(db.session.connection(), end=cutoff_date)
         db.session.commit()
 
         # Delete associated image files
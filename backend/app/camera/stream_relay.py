@@ -0,0 +1,220 @@
+import re
+import threading
+import time
+
+import requests
+
+IDLE_TIMEOUT = 10.0  # seconds without subscribers before the upstream connection is closed
+CONNECT_TIMEOUT = 5.0
+READ_SIZE = 64 * 1024
+MAX_BUFFER = 8 * 1024 * 1024  # an upstream that never sends a boundary is dropped past this
+
+CONTENT_LENGTH = re.compile(rb'content-length:\s*(\d+)', re.IGNORECASE)
+
+
+class MJPEGParser:
+    """
+    Splits a multipart/x-mixed-replace byte stream into whole parts
+    (boundary line, headers and JPEG). A part is complete as soon as its
+    Content-Length is satisfied, or else when the next boundary arrives.
+    """
+
+    def __init__(self, boundary=b'frame'):
+        self.marker = b'--' + boundary
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Add bytes from upstream; returns the list of parts completed by them."""
+        self.buffer += data
+        parts = []
+        while True:
+            start = self.buffer.find(self.marker)
+            if start < 0:
+                # Keep a possible partial boundary at the end
+                del self.buffer[:max(0, len(self.buffer) - len(self.marker))]
+                return parts
+            if start:
+                del self.buffer[:start]
+
+            headers_end = self.buffer.find(b'\r\n\r\n', len(self.marker))
+            if headers_end < 0:
+                return parts
+            body_start = headers_end + 4
+            match = CONTENT_LENGTH.search(self.buffer, 0, headers_end)
+            if match:
+                end = body_start + int(match.group(1)) + 2  # body and its trailing CRLF
+                if len(self.buffer) < end:
+                    return parts
+            else:
+                end = self.buffer.find(self.marker, body_start)
+                if end < 0:
+                    if len(self.buffer) > MAX_BUFFER:
+                        raise ValueError("MJPEG part exceeds the relay buffer without a boundary")
+                    return parts
+            parts.append(bytes(self.buffer[:end]))
+            del self.buffer[:end]
+
+
+class StreamRelay:
+    """
+    The single upstream connection for one camera feed (camera and stream
+    profile). A reader thread parses JPEG parts once and publishes the
+    latest one; every local viewer yields the same bytes object. New
+    viewers start from the latest part right away, and the upstream is
+    closed once nobody has been subscribed for IDLE_TIMEOUT.
+    """
+
+    def __init__(self, key, url, params=None, on_close=None, idle_timeout=IDLE_TIMEOUT):
+        self.key = key
+        self.url = url
+        self.params = params or {}
+        self.on_close = on_close
+        self.idle_timeout = idle_timeout
+
+        self._cond = threading.Condition()
+        self._part = None
+        self._seq = 0
+        self.subscribers = 0
+        self._idle_since = time.monotonic()
+        self.closed = False
+        self.error = None
+
+        self.parts_received = 0
+        self.parts_delivered = 0
+        self.bytes_received = 0
+        self.started_at = time.time()
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            with requests.get(self.url, params=self.params, stream=True,
+                              timeout=(CONNECT_TIMEOUT, self.idle_timeout)) as response:
+                response.raise_for_status()
+                boundary = re.search(r'boundary=([^;\s]+)', response.headers.get('Content-Type', ''))
+                parser = MJPEGParser(boundary.group(1).strip('"').encode() if boundary else b'frame')
+                # read1 returns whatever has arrived instead of waiting for a full READ_SIZE
+                read = getattr(response.raw, 'read1', None) or response.raw.read
+                while not self._should_close():
+                    data = read(READ_SIZE)
+                    if not data:
+                        break
+                    self.bytes_received += len(data)
+                    for part in parser.feed(data):
+                        self._publish(part)
+        except Exception as e:  # connection errors, read timeouts from urllib3, malformed streams
+            self.error = str(e)
+            print(f"⚠️ Relay upstream for {self.key} failed: {e}")
+        finally:
+            self._close()
+
+    def _should_close(self):
+        # Decided under the same lock as subscribe(), so a viewer never joins a relay that is closing
+        with self._cond:
+            if self.subscribers == 0 and time.monotonic() - self._idle_since > self.idle_timeout:
+                self.closed = True
+            return self.closed
+
+    def _publish(self, part):
+        with self._cond:
+            self._seq += 1
+            self._part = part
+            self.parts_received += 1
+            self._cond.notify_all()
+
+    def _close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        if self.on_close:
+            self.on_close(self)
+
+    def subscribe(self):
+        """Join the relay; False if it is already closing."""
+        with self._cond:
+            if self.closed:
+                return False
+            self.subscribers += 1
+            return True
+
+    def unsubscribe(self):
+        with self._cond:
+            self.subscribers -= 1
+            if self.subscribers == 0:
+                self._idle_since = time.monotonic()
+
+    def next_part(self, last_seq, timeout=5.0):
+        """(seq, part) newer than last_seq, (last_seq, None) on timeout, None once the upstream is gone."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq != last_seq or self.closed, timeout):
+                return last_seq, None
+            if self._seq == last_seq:
+                return None
+            self.parts_delivered += 1
+            return self._seq, self._part
+
+    def stream(self):
+        """Generator of whole MJPEG parts for a viewer that has subscribed; unsubscribes when it ends."""
+        try:
+            last_seq = 0
+            while True:
+                result = self.next_part(last_seq)
+                if result is None:
+                    return
+                last_seq, part = result
+                if part is not None:
+                    yield part
+        finally:
+            self.unsubscribe()
+
+    def get_stats(self):
+        return {
+            'url': self.url,
+            'params': self.params,
+            'subscribers': self.subscribers,
+            'parts_received': self.parts_received,
+            'parts_delivered': self.parts_delivered,
+            'bytes_received': self.bytes_received,
+            'uptime_s': round(time.time() - self.started_at, 1),
+        }
+
+
+class RelayHub:
+    """The live relays of this backend process, one per (camera, stream profile)."""
+
+    def __init__(self, idle_timeout=IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._relays = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, camera_id, url, params=None):
+        """A relay for the camera feed with this viewer subscribed, opening the upstream if needed."""
+        key = (camera_id, tuple(sorted((params or {}).items())))
+        with self._lock:
+            relay = self._relays.get(key)
+            # A camera that moved to another node gets a fresh relay; the old one idles out
+            if relay is None or relay.url != url or not relay.subscribe():
+                relay = StreamRelay(key, url, params, on_close=self._forget, idle_timeout=self.idle_timeout)
+                relay.subscribe()
+                self._relays[key] = relay
+                print(f"📡 Relay opened for camera {camera_id} ({url})")
+            return relay
+
+    def _forget(self, relay):
+        with self._lock:
+            if self._relays.get(relay.key) is relay:
+                del self._relays[relay.key]
+        print(f"📴 Relay closed for camera {relay.key[0]}")
+
+    def get_stats(self):
+        with self._lock:
+            relays = list(self._relays.values())
+        return [dict(relay.get_stats(), camera_id=relay.key[0]) for relay in relays]
+
+
+_hub = RelayHub()
+
+
+def get_relay_hub():
+    return _hub
@@ -0,0 +1,205 @@
+import bisect
+import hashlib
+import math
+import threading
+import time
+
+from camera_registry import get_camera_registry
+from ip import ipaddress
+from models import CameraStatus
+
+DEFAULT_EMOTION_SERVICE_URL = f"http://{ipaddress}:5001"  # used while no node has registered
+NODE_TTL = 15.0  # seconds without a heartbeat before a node is dropped
+VIRTUAL_NODES = 64  # ring points per node
+LOAD_FACTOR = 1.25  # no node gets more than ceil(LOAD_FACTOR * cameras / nodes) cameras
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Consistent hash ring with virtual nodes and bounded loads: a camera goes
+    to the first node clockwise from its hash that still has room, so adding
+    or losing a node only moves the cameras that have to move.
+    """
+
+    def __init__(self, vnodes=VIRTUAL_NODES):
+        self.vnodes = vnodes
+        self.nodes = set()
+        self._points = []
+        self._owners = []
+
+    def add(self, node_id):
+        if node_id not in self.nodes:
+            self.nodes.add(node_id)
+            self._rebuild()
+
+    def remove(self, node_id):
+        if node_id in self.nodes:
+            self.nodes.discard(node_id)
+            self._rebuild()
+
+    def _rebuild(self):
+        points = sorted((_hash(f"{node_id}#{i}"), node_id) for node_id in self.nodes for i in range(self.vnodes))
+        self._points = [point for point, _ in points]
+        self._owners = [node_id for _, node_id in points]
+
+    def walk(self, key):
+        """Distinct nodes in ring order starting at the key's position."""
+        if not self._points:
+            return
+        start = bisect.bisect(self._points, _hash(str(key)))
+        seen = set()
+        for offset in range(len(self._points)):
+            node_id = self._owners[(start + offset) % len(self._points)]
+            if node_id not in seen:
+                seen.add(node_id)
+                yield node_id
+                if len(seen) == len(self.nodes):
+                    return
+
+    def lookup(self, key):
+        return next(self.walk(key), None)
+
+    def assign(self, keys, load_factor=LOAD_FACTOR):
+        """Map every key to a node, skipping nodes that already hold their bounded share."""
+        if not self.nodes:
+            return {}
+        keys = sorted(keys)
+        capacity = max(1, math.ceil(load_factor * len(keys) / len(self.nodes)))
+        loads = dict.fromkeys(self.nodes, 0)
+        assignment = {}
+        for key in keys:
+            for node_id in self.walk(key):
+                if loads[node_id] < capacity:
+                    assignment[key] = node_id
+                    loads[node_id] += 1
+                    break
+        return assignment
+
+
+class NodeInfo:
+    def __init__(self, node_id, url):
+        self.node_id = node_id
+        self.url = url.rstrip('/')
+        self.registered_at = time.time()
+        self.last_seen = self.registered_at
+        self.running = []  # cameras the node reported running in its last heartbeat
+
+    def to_dict(self):
+        return {
+            'node_id': self.node_id,
+            'url': self.url,
+            'registered_at': self.registered_at,
+            'last_seen': self.last_seen,
+            'running': self.running,
+        }
+
+
+class NodeRegistry:
+    """
+    Emotion service nodes that registered with the backend. Nodes stay
+    registered while they keep sending heartbeats; once a node misses its
+    TTL it is dropped and its cameras are redistributed over the ring.
+    The assignment is cached until the node set or the camera set changes.
+    """
+
+    def __init__(self, ttl=NODE_TTL, vnodes=VIRTUAL_NODES, load_factor=LOAD_FACTOR):
+        self.ttl = ttl
+        self.load_factor = load_factor
+        self.ring = HashRing(vnodes)
+        self._nodes = {}
+        self._lock = threading.Lock()
+        self._version = 0  # bumped whenever the ring's node set changes
+        self._assignment_key = None
+        self._assignment = {}
+
+    def register(self, node_id, url):
+        with self._lock:
+            node = self._nodes.get(node_id)
+            if node is None or node.url != url.rstrip('/'):
+                node = NodeInfo(node_id, url)
+                self._nodes[node_id] = node
+                self.ring.add(node_id)
+                self._version += 1
+                print(f"🛰️ Emotion node registered: {node_id} at {node.url}")
+            node.last_seen = time.time()
+            return node
+
+    def heartbeat(self, node_id, running=None):
+        """Refresh a node's lease; False if the node is unknown (expired) and has to register again."""
+        with self._lock:
+            node = self._nodes.get(node_id)
+            if node is None:
+                return False
+            node.last_seen = time.time()
+            if running is not None:
+                node.running = sorted(running)
+            return True
+
+    def unregister(self, node_id):
+        with self._lock:
+            if self._nodes.pop(node_id, None) is not None:
+                self.ring.remove(node_id)
+                self._version += 1
+                print(f"🛰️ Emotion node unregistered: {node_id}")
+
+    def prune(self):
+        now = time.time()
+        with self._lock:
+            for node_id, node in list(self._nodes.items()):
+                if now - node.last_seen > self.ttl:
+                    del self._nodes[node_id]
+                    self.ring.remove(node_id)
+                    self._version += 1
+                    print(f"⚠️ Emotion node {node_id} missed its heartbeat for {self.ttl:.0f}s, dropped")
+
+    def nodes(self):
+        self.prune()
+        with self._lock:
+            return list(self._nodes.values())
+
+    def get(self, node_id):
+        with self._lock:
+            return self._nodes.get(node_id)
+
+    def assignments(self, camera_ids):
+        """{camera_id: node_id} for the given cameras over the live nodes; treat it as read-only."""
+        self.prune()
+        camera_ids = frozenset(camera_ids)
+        with self._lock:
+            key = (self._version, camera_ids)
+            if key != self._assignment_key:
+                self._assignment = self.ring.assign(camera_ids, self.load_factor)
+                self._assignment_key = key
+            return self._assignment
+
+
+_registry = NodeRegistry()
+
+
+def get_node_registry():
+    return _registry
+
+
+def active_camera_ids():
+    """Active camera ids from the camera registry snapshot, re-read from the DB at most every max_age."""
+    registry = get_camera_registry()
+    registry.reload(max_age=registry.max_age)
+    return registry.ids_with_status(CameraStatus.Active)
+
+
+def emotion_service_url(camera_id):
+    """Base URL of the emotion node that owns a camera, or the single default service if none registered."""
+    registry = get_node_registry()
+    owner_id = registry.assignments(active_camera_ids()).get(camera_id)
+    node = registry.get(owner_id) if owner_id else None
+    return node.url if node else DEFAULT_EMOTION_SERVICE_URL
+
+
+def emotion_service_urls():
+    """Base URLs of every live emotion node (or the default service), e.g. to tell all of them a camera stopped."""
+    nodes = get_node_registry().nodes()
+    return [node.url for node in nodes] if nodes else [DEFAULT_EMOTION_SERVICE_URL]
@@ -0,0 +1,58 @@
+from flask import Blueprint, jsonify, request
+
+from app.nodes.registry import get_node_registry, active_camera_ids
+
+nodes_bp = Blueprint('nodes', __name__)
+
+
+def _assigned_to(node_id):
+    assignments = get_node_registry().assignments(active_camera_ids())
+    return sorted(cam_id for cam_id, owner in assignments.items() if owner == node_id)
+
+
+@nodes_bp.route('/register', methods=['POST'])
+def register_node():
+    data = request.get_json() or {}
+    node_id = data.get('node_id')
+    url = data.get('url')
+    if not node_id or not url:
+        return jsonify({'error': 'node_id and url are required'}), 400
+
+    registry = get_node_registry()
+    registry.register(node_id, url)
+    return jsonify({'node_id': node_id, 'ttl': registry.ttl, 'cameras': _assigned_to(node_id)}), 200
+
+
+@nodes_bp.route('/heartbeat', methods=['POST'])
+def node_heartbeat():
+    data = request.get_json() or {}
+    node_id = data.get('node_id')
+    if not node_id:
+        return jsonify({'error': 'node_id is required'}), 400
+
+    if not get_node_registry().heartbeat(node_id, data.get('running')):
+        # Expired or the backend restarted; the node registers again
+        return jsonify({'error': 'Unknown node, register again'}), 404
+    return jsonify({'node_id': node_id, 'cameras': _assigned_to(node_id)}), 200
+
+
+@nodes_bp.route('/unregister', methods=['POST'])
+def unregister_node():
+    data = request.get_json() or {}
+    node_id = data.get('node_id')
+    if not node_id:
+        return jsonify({'error': 'node_id is required'}), 400
+    get_node_registry().unregister(node_id)
+    return jsonify({'message': f'Node {node_id} unregistered'}), 200
+
+
+@nodes_bp.route('', methods=['GET'])
+def list_nodes():
+    registry = get_node_registry()
+    assignments = registry.assignments(active_camera_ids())
+    nodes = []
+    for node in registry.nodes():
+        info = node.to_dict()
+        info['assigned'] = sorted(cam_id for cam_id, owner in assignments.items() if owner == node.node_id)
+        nodes.append(info)
+    return jsonify({'nodes': nodes, 'unassigned': sorted(set(active_camera_ids()) - set(assignments))}), 200
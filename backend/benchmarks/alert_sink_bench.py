@@ -0,0 +1,76 @@
+"""
+Benchmark: how long a detection thread is held up per alert, the old
+synchronous save_alert (imwrite, camera lookup, one-row insert and commit)
+versus AlertSink.submit(), and how long the sink then takes to get the
+rows committed. Uses a throwaway SQLite database and alerts directory.
+
+Run from the backend/ directory:
+    python -m benchmarks.alert_sink_bench [alerts]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+from flask import Flask
+
+from emotion_detection_service.alert_sink import IST, AlertSink
+from extensions import db
+from models import Camera, CameraStatus, DetectionLog
+
+
+def sync_save_alert(app, alerts_dir, cam_id, face_img, emotion, confidence):
+    """The detector-thread path this replaces."""
+    now_ist = datetime.now(IST)
+    filename = f"alert_{emotion}_{now_ist.strftime('%Y%m%d_%H%M%S')}.jpg"
+    cv2.imwrite(os.path.join(alerts_dir, filename), face_img)
+    with app.app_context():
+        camera = db.session.get(Camera, cam_id)
+        db.session.add(DetectionLog(camera_id=cam_id, camera_label=camera.label if camera else "Unknown",
+                                    timestamp=now_ist, emotion=emotion, confidence=confidence,
+                                    image_path=f"/static/alerts/{filename}"))
+        db.session.commit()
+
+
+def main():
+    alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workdir = tempfile.mkdtemp()
+    alerts_dir = os.path.join(workdir, 'alerts')
+    os.makedirs(alerts_dir)
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{workdir}/bench.db"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Camera(label='Bench', ip='127.0.0.1', src='bench', status=CameraStatus.Active))
+        db.session.commit()
+
+    face = np.random.default_rng(0).integers(0, 255, (160, 160, 3), dtype=np.uint8)
+
+    start = time.perf_counter()
+    for _ in range(alerts):
+        sync_save_alert(app, alerts_dir, 1, face, 'anger', 0.9)
+    sync_ms = (time.perf_counter() - start) / alerts * 1000
+
+    sink = AlertSink(app, alerts_dir=alerts_dir, queue_size=alerts)
+    start = time.perf_counter()
+    for _ in range(alerts):
+        sink.submit(1, face, 'anger', 0.9)
+    submit_ms = (time.perf_counter() - start) / alerts * 1000
+    sink.stop()
+    stats = sink.get_stats()
+
+    print(f"{alerts} alerts")
+    print(f"  synchronous save_alert: {sync_ms:.2f} ms per alert on the detection thread")
+    print(f"  AlertSink.submit:       {submit_ms:.3f} ms per alert on the detection thread")
+    print(f"  sink: {stats['rows_committed']} rows in {stats['batches_committed']} transactions, "
+          f"{stats['alerts_dropped']} dropped, flush latency mean {stats['flush_latency_ms']['mean']:.0f} ms "
+          f"max {stats['flush_latency_ms']['max']:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark: JPEG encoding cost as the number of viewers of one camera grows.
+
+A synthetic camera publishes 640x360 frames at 25 fps into a FrameRing.
+N viewer threads stream it the way the Flask /stream generators do, either
+each encoding every frame itself (the old path) or through one shared
+FrameBroadcaster. Reports encodes per second and the process CPU used.
+
+Run from the backend/ directory:
+    python -m benchmarks.broadcast_bench [viewers ...]
+"""
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from emotion_detection_service.broadcaster import FrameBroadcaster
+from emotion_detection_service.frame_ring import FrameRing
+
+DURATION = 5.0
+FPS = 25
+
+
+def publish(ring, stop):
+    ys, xs = np.mgrid[0:360, 0:640]
+    base = np.dstack([(xs // 3) % 256, (ys // 2) % 256, ((xs + ys) // 4) % 256]).astype(np.uint8)
+    base[100:260, 200:440] = (40, 160, 220)
+    tick = 0
+    while not stop.is_set():
+        slot = ring.acquire_write()
+        if slot is not None:
+            index, buffer = slot
+            if buffer is None:
+                buffer = np.empty_like(base)
+            np.copyto(buffer, np.roll(base, tick, axis=1))
+            ring.commit(index, buffer)
+        tick += 4
+        time.sleep(1.0 / FPS)
+
+
+def own_encoder_viewer(ring, stop, counts, index):
+    last_seq = None
+    while not stop.is_set():
+        lease = ring.lease_latest()
+        if lease is None or lease.seq == last_seq:
+            if lease is not None:
+                lease.release()
+            time.sleep(0.02)
+            continue
+        with lease:
+            cv2.imencode('.jpg', lease.frame)
+            last_seq = lease.seq
+        counts[index] += 1
+
+
+def broadcast_viewer(broadcaster, stop, counts, index):
+    last_seq = None
+    while not stop.is_set():
+        frame = broadcaster.next_frame(last_seq, timeout=0.5)
+        if frame is not None:
+            last_seq = frame.seq
+            counts[index] += 1
+
+
+def run(viewers, shared):
+    ring = FrameRing(6)
+    stop = threading.Event()
+    publisher = threading.Thread(target=publish, args=(ring, stop))
+    publisher.start()
+    time.sleep(0.2)
+
+    counts = [0] * viewers
+    broadcaster = FrameBroadcaster(1, lambda cam_id: ring.lease_latest(),
+                                   lambda cam_id, last_seq, timeout: ring.wait_newer(last_seq, timeout))
+    if shared:
+        threads = [threading.Thread(target=broadcast_viewer, args=(broadcaster, stop, counts, i))
+                   for i in range(viewers)]
+    else:
+        threads = [threading.Thread(target=own_encoder_viewer, args=(ring, stop, counts, i))
+                   for i in range(viewers)]
+
+    cpu_start = time.process_time()
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads + [publisher]:
+        thread.join()
+    cpu = time.process_time() - cpu_start
+
+    encodes = broadcaster.frames_encoded if shared else sum(counts)
+    return sum(counts) / DURATION / viewers, encodes / DURATION, cpu / DURATION * 100
+
+
+def main():
+    viewer_counts = [int(arg) for arg in sys.argv[1:]] or [1, 5, 20]
+    print(f"{'viewers':>7} {'mode':>10} {'fps/viewer':>10} {'encodes/s':>10} {'cpu %':>7}")
+    for viewers in viewer_counts:
+        for shared in (False, True):
+            fps, encodes, cpu = run(viewers, shared)
+            mode = 'broadcast' if shared else 'per-viewer'
+            print(f"{viewers:>7} {mode:>10} {fps:>10.1f} {encodes:>10.1f} {cpu:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
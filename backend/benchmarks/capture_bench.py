@@ -0,0 +1,70 @@
+"""
+Micro-benchmark: CPU cost per frame of full-resolution OpenCV decoding
+versus the FFmpeg pipe backend decoding at analysis resolution.
+
+Both read the same local file looped as a fake live stream for a fixed
+wall-clock time. CPU time includes the ffmpeg child process.
+
+Run from the backend/ directory:
+    python -m benchmarks.capture_bench path/to/video.mp4 [WxH]
+"""
+import sys
+import time
+
+import cv2
+import numpy as np
+import psutil
+
+from emotion_detection_service.capture import FFmpegCapture
+from emotion_detection_service.preprocessing import DETECTOR_SIZE
+
+DURATION = 5.0
+
+
+def cpu_seconds(process):
+    total = 0.0
+    for proc in [process] + process.children(recursive=True):
+        try:
+            times = proc.cpu_times()
+        except psutil.NoSuchProcess:
+            continue
+        total += times.user + times.system
+    return total
+
+
+def run(name, capture, loop_file=None):
+    me = psutil.Process()
+    detector_input = np.empty((DETECTOR_SIZE[1], DETECTOR_SIZE[0], 3), dtype=np.uint8)
+    frame = None
+    frames = 0
+    cpu_start = cpu_seconds(me)
+    start = time.time()
+    while time.time() - start < DURATION:
+        ret, frame = capture.read(frame)
+        if not ret:
+            if loop_file is None:
+                break
+            capture.set(cv2.CAP_PROP_POS_FRAMES, 0)  # OpenCV has no looping of its own
+            continue
+        cv2.resize(frame, DETECTOR_SIZE, dst=detector_input, interpolation=cv2.INTER_LINEAR)
+        frames += 1
+    cpu = cpu_seconds(me) - cpu_start
+    capture.release()
+    shape = f"{frame.shape[1]}x{frame.shape[0]}" if frame is not None else "-"
+    print(f"  {name:<8} {shape:>10}  {frames:>5} frames  {1000 * cpu / max(frames, 1):7.2f} ms CPU/frame")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    path = sys.argv[1]
+    size = tuple(int(part) for part in sys.argv[2].split('x')) if len(sys.argv) > 2 else (640, 360)
+
+    print(f"{path}, {DURATION:.0f}s each (OpenCV unthrottled, ffmpeg paced at the file's frame rate)")
+    run('opencv', cv2.VideoCapture(path, cv2.CAP_FFMPEG), loop_file=path)
+    run('ffmpeg', FFmpegCapture(path, size))
+
+
+if __name__ == '__main__':
+    main()
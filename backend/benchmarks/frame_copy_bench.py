@@ -0,0 +1,171 @@
+"""
+Micro-benchmark: frame copies between grabber, detector and viewers before
+and after FrameRing.
+
+The legacy path copies every grabbed frame into the handoff slot, again when
+the detector picks it up, again to publish the annotated frame and once more
+per viewer read. The ring path decodes into a ring slot, leases it read-only
+to the detector, makes one copy for the overlays and leases that to viewers.
+Decoding is simulated by writing a source frame into the target buffer, the
+same way capture.read(buffer) fills it.
+
+Each mode runs in its own interpreter so peak RSS is not shared.
+
+Run from the backend/ directory:
+    python -m benchmarks.frame_copy_bench
+"""
+import json
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from emotion_detection_service.frame_ring import FrameRing
+from emotion_detection_service.metrics import process_memory
+
+FRAME_SHAPE = (1080, 1920, 3)
+DURATION = 5.0
+VIEWERS = 3
+GRAB_FPS = 30
+
+
+class CopyCounter:
+    def __init__(self):
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, nbytes):
+        with self._lock:
+            self.bytes += nbytes
+
+
+def run_legacy(source, stop):
+    copied = CopyCounter()
+    slot_lock = threading.Lock()
+    slot = {'frame': None, 'seq': 0}
+    processed_lock = threading.Lock()
+    processed = {'frame': None}
+
+    def grabber():
+        while not stop.is_set():
+            frame = source.copy()  # capture.read() allocates a fresh frame
+            copied.add(frame.nbytes)
+            with slot_lock:
+                slot['frame'] = frame.copy()
+                slot['seq'] += 1
+            copied.add(frame.nbytes)
+            time.sleep(1.0 / GRAB_FPS)
+
+    def detector():
+        last_seq = 0
+        while not stop.is_set():
+            with slot_lock:
+                frame, seq = slot['frame'], slot['seq']
+            if frame is None or seq == last_seq:
+                time.sleep(0.001)
+                continue
+            last_seq = seq
+            frame = frame.copy()
+            copied.add(frame.nbytes)
+            frame[10:20, 10:20] = 255  # overlays
+            with processed_lock:
+                processed['frame'] = frame.copy()
+            copied.add(frame.nbytes)
+
+    def viewer():
+        while not stop.is_set():
+            with processed_lock:
+                frame = processed['frame'].copy() if processed['frame'] is not None else None
+            if frame is not None:
+                copied.add(frame.nbytes)
+            time.sleep(1.0 / GRAB_FPS)
+
+    return copied, [grabber, detector] + [viewer] * VIEWERS
+
+
+def run_ring(source, stop):
+    copied = CopyCounter()
+    raw_ring = FrameRing(slots=4)
+    processed_ring = FrameRing(slots=6)
+
+    def grabber():
+        while not stop.is_set():
+            slot = raw_ring.acquire_write()
+            if slot is not None:
+                index, buffer = slot
+                if buffer is None:
+                    buffer = np.empty_like(source)
+                np.copyto(buffer, source)  # stands in for capture.read(buffer)
+                copied.add(buffer.nbytes)
+                raw_ring.commit(index, buffer)
+            time.sleep(1.0 / GRAB_FPS)
+        raw_ring.close()
+
+    def detector():
+        last_seq = 0
+        while not stop.is_set():
+            lease = raw_ring.wait_newer(last_seq, timeout=0.1)
+            if lease is None:
+                continue
+            with lease:
+                last_seq = lease.seq
+                slot = processed_ring.acquire_write()
+                if slot is None:
+                    continue
+                index, buffer = slot
+                if buffer is None:
+                    buffer = np.empty_like(lease.frame)
+                np.copyto(buffer, lease.frame)
+                copied.add(buffer.nbytes)
+                buffer[10:20, 10:20] = 255  # overlays
+                processed_ring.commit(index, buffer, lease.timestamp)
+
+    def viewer():
+        while not stop.is_set():
+            lease = processed_ring.lease_latest()
+            if lease is not None:
+                with lease:
+                    lease.frame.sum(dtype=np.uint64)  # stands in for imencode reading the frame
+            time.sleep(1.0 / GRAB_FPS)
+
+    return copied, [grabber, detector] + [viewer] * VIEWERS
+
+
+def measure(mode):
+    source = np.random.randint(0, 256, FRAME_SHAPE, dtype=np.uint8)
+    stop = threading.Event()
+    copied, targets = (run_legacy if mode == 'legacy' else run_ring)(source, stop)
+
+    threads = [threading.Thread(target=target, daemon=True) for target in targets]
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'mode': mode,
+        'copied_mb_per_sec': round(copied.bytes / DURATION / 1e6, 1),
+        'peak_rss_mb': round(process_memory()['peak_rss_bytes'] / 1e6, 1),
+    }
+
+
+def main():
+    if len(sys.argv) > 1:
+        print(json.dumps(measure(sys.argv[1])))
+        return
+
+    print(f"{FRAME_SHAPE[1]}x{FRAME_SHAPE[0]} frames, {GRAB_FPS} fps grab, {VIEWERS} viewers, {DURATION:.0f}s per mode")
+    for mode in ('legacy', 'ring'):
+        out = subprocess.run([sys.executable, '-m', 'benchmarks.frame_copy_bench', mode],
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"  {result['mode']:<7} copied {result['copied_mb_per_sec']:>8.1f} MB/s   "
+              f"peak RSS {result['peak_rss_mb']:>7.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Checks the NumPy uniform LBP against scikit-image on synthetic crops and
+times both.
+
+Run from the backend/ directory:
+    python -m benchmarks.lbp_equivalence
+"""
+import time
+
+import numpy as np
+from skimage.feature import local_binary_pattern
+
+from emotion_detection_service.lbp import texture_score, texture_scores, uniform_lbp
+
+CORPUS_SIZE = 200
+
+
+def skimage_texture_score(gray):
+    lbp = local_binary_pattern(gray, 8, 1, method='uniform')
+    hist, _ = np.histogram(lbp, bins=59, density=True)
+    return float(np.std(hist))
+
+
+def synthetic_corpus(rng):
+    crops = []
+    for i in range(CORPUS_SIZE):
+        h, w = rng.integers(8, 160, 2)
+        kind = i % 5
+        if kind == 0:
+            crop = rng.integers(0, 256, (h, w))
+        elif kind == 1:
+            crop = np.full((h, w), rng.integers(0, 256))  # flat
+        elif kind == 2:
+            crop = np.add.outer(np.arange(h), np.arange(w)) % 256  # gradient
+        elif kind == 3:
+            crop = rng.integers(0, 4, (h, w)) * 60  # few levels, many ties
+        else:
+            crop = (rng.normal(128, 30, (h, w))).clip(0, 255)
+        crops.append(crop.astype(np.uint8))
+    # A batch of equally sized crops for texture_scores()
+    crops.extend(rng.integers(0, 256, (20, 96, 96)).astype(np.uint8))
+    return crops
+
+
+def main():
+    rng = np.random.default_rng(0)
+    crops = synthetic_corpus(rng)
+
+    for crop in crops:
+        expected = local_binary_pattern(crop, 8, 1, method='uniform')
+        actual = uniform_lbp(crop)
+        assert np.array_equal(expected, actual), f"LBP mismatch on {crop.shape} crop"
+        assert skimage_texture_score(crop) == texture_score(crop), f"score mismatch on {crop.shape} crop"
+
+    batched = texture_scores(crops)
+    assert batched == [skimage_texture_score(crop) for crop in crops], "batched scores differ"
+    print(f"{len(crops)} crops: codes and texture scores identical to scikit-image")
+
+    work = [rng.integers(0, 256, (96, 96)).astype(np.uint8) for _ in range(200)]
+    for name, fn in [('skimage', lambda: [skimage_texture_score(c) for c in work]),
+                     ('numpy', lambda: [texture_score(c) for c in work]),
+                     ('numpy batched', lambda: texture_scores(work))]:
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        print(f"{name:>14}: {elapsed / len(work) * 1e6:8.1f} us per 96x96 crop")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark: aggregate analysed fps for N cameras in one process (threads)
+versus the multi-process pipeline (capture processes + analysis processes
+over shared memory).
+
+The per-frame work stands in for the analysis without needing the model:
+motion gate, face validation of a few crops and drawing the overlays, i.e.
+the OpenCV/NumPy/Python part that contends on the GIL in threads mode.
+Every camera reads the same local file, looped as a live stream.
+
+Run from the backend/ directory:
+    python -m benchmarks.pipeline_scaling_bench path/to/video.mp4 [cameras]
+"""
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from emotion_detection_service import process_pipeline as pp
+from emotion_detection_service.capture import FramePacer, open_capture
+from emotion_detection_service.face_validator import FaceValidator
+from emotion_detection_service.motion_gate import MotionGate
+
+DURATION = 10.0
+FRAME_SIZE = pp.PIPELINE_FRAME_SIZE
+
+
+class StandInAnalyzer:
+    def __init__(self):
+        self.gate = MotionGate()
+        self.validator = FaceValidator()
+
+    def process_frame(self, frame):
+        self.gate.update(frame)
+        self.validator.reset()
+        h, w = frame.shape[:2]
+        boxes = [(w // 4 + i * 40, h // 4, 120, 140) for i in range(3)]
+        for x, y, bw, bh in boxes:
+            self.validator.validate(frame[y:y + bh, x:x + bw])
+        return [(box, 'neutral(0.90)') for box in boxes]
+
+    def draw(self, frame, annotations):
+        for (x, y, w, h), label in annotations:
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2, cv2.LINE_AA)
+            cv2.putText(frame, label, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2, cv2.LINE_AA)
+
+
+def run_threads(path, cameras):
+    counts = [0] * cameras
+    stop = threading.Event()
+
+    def camera(index):
+        capture = open_capture(path)
+        pacer = FramePacer(capture, path)
+        analyzer = StandInAnalyzer()
+        frame = None
+        while not stop.is_set():
+            if not capture.grab():
+                capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+            ret, frame = capture.retrieve(frame)
+            if not ret:
+                continue
+            small = cv2.resize(frame, FRAME_SIZE)
+            annotations = analyzer.process_frame(small)
+            analyzer.draw(small.copy(), annotations)
+            counts[index] += 1
+            pacer.wait()
+        capture.release()
+
+    threads = [threading.Thread(target=camera, args=(i,), daemon=True) for i in range(cameras)]
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts)
+
+
+def analysis_process(channels, counts, stop_event):
+    def serve(index, channel):
+        analyzer = StandInAnalyzer()
+        while not stop_event.is_set():
+            try:
+                slot, _ = channel.work_queue.get(timeout=0.5)
+            except Exception:
+                continue
+            frame = channel.raw_ring.frame(slot)
+            annotations = analyzer.process_frame(frame)
+            out = channel.processed_ring.acquire_write()
+            if out is not None:
+                buffer = channel.processed_ring.frame(out)
+                np.copyto(buffer, frame)
+                analyzer.draw(buffer, annotations)
+                channel.processed_ring.commit(out)
+            channel.raw_ring.release(slot)
+            counts[index] += 1
+
+    threads = [threading.Thread(target=serve, args=(channel.index, channel), daemon=True) for channel in channels]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_processes(path, cameras, workers):
+    width, height = FRAME_SIZE
+    channels = [pp.CameraChannel(i, (height, width, 3)) for i in range(cameras)]
+    counts = pp._ctx.Array('q', cameras, lock=False)
+    stop_event = pp._ctx.Event()
+
+    analysers = [pp._ctx.Process(target=analysis_process, args=(channels[k::workers], counts, stop_event), daemon=True)
+                 for k in range(workers)]
+    captures = [pp._ctx.Process(target=pp.run_capture, args=(channel, channel.index, path), daemon=True)
+                for channel in channels]
+    for process in analysers + captures:
+        process.start()
+
+    # Spawning and importing takes a while; start measuring once every camera is flowing
+    deadline = time.time() + 120
+    while time.time() < deadline and not all(counts):
+        time.sleep(0.5)
+    start = sum(counts)
+    time.sleep(DURATION)
+    total = sum(counts) - start
+
+    for channel in channels:
+        channel.stop_event.set()
+    stop_event.set()
+    for process in captures + analysers:
+        process.join(timeout=10)
+    for channel in channels:
+        channel.close()
+    return total
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    path = os.path.abspath(sys.argv[1])
+    cameras = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    workers = pp.default_inference_workers()
+
+    print(f"{cameras} cameras, {os.cpu_count()} cores, {DURATION:.0f}s per mode")
+    print(f"  threads:                   {run_threads(path, cameras) / DURATION:7.1f} fps aggregate")
+    print(f"  processes ({workers} analysers):   {run_processes(path, cameras, workers) / DURATION:7.1f} fps aggregate")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmark: backend camera_feed relaying, old per-viewer proxy versus the
+shared StreamRelay.
+
+A stub upstream (a subprocess, so its CPU is not counted) serves a 25 fps
+MJPEG stream of ~40 KB parts like the emotion service does. N viewers then
+consume it for a while through
+
+  proxy  - one requests.get(stream=True) per viewer, iter_content(1024),
+           as camera_feed did before
+  relay  - app.camera.stream_relay, one upstream and whole parts per viewer
+
+and the benchmark reports the CPU used per viewer, the number of upstream
+connections the stub saw, and time to first frame for a viewer that joins
+while the others are already watching.
+
+Run from the backend/ directory:
+    python -m benchmarks.relay_bench [viewers ...]
+"""
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+import requests
+
+from app.camera.stream_relay import RelayHub
+
+PORT = 5903
+FPS = 25
+DURATION = 5.0
+
+
+def make_jpeg():
+    ys, xs = np.mgrid[0:720, 0:1280]
+    image = np.dstack([(xs // 5) % 256, (ys // 3) % 256, ((xs * ys) // 4096) % 256]).astype(np.uint8)
+    return cv2.imencode('.jpg', image)[1].tobytes()
+
+
+class StubUpstream(BaseHTTPRequestHandler):
+    connections = 0
+    jpeg = None
+
+    def do_GET(self):
+        if self.path.startswith('/connections'):
+            body = str(StubUpstream.connections).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        StubUpstream.connections += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
+        self.end_headers()
+        part = (b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: ' + str(len(self.jpeg)).encode()
+                + b'\r\n\r\n' + self.jpeg + b'\r\n')
+        try:
+            while True:
+                self.wfile.write(part)
+                time.sleep(1.0 / FPS)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def run_upstream():
+    StubUpstream.jpeg = make_jpeg()
+    ThreadingHTTPServer(('127.0.0.1', PORT), StubUpstream).serve_forever()
+
+
+def upstream_connections():
+    return int(requests.get(f"http://127.0.0.1:{PORT}/connections", timeout=5).text)
+
+
+def proxy_viewer(url, stop, first_frame):
+    start = time.monotonic()
+    with requests.get(url, stream=True, timeout=5) as response:
+        for chunk in response.iter_content(chunk_size=1024):
+            if first_frame is not None and b'\xff\xd9' in chunk:
+                first_frame.append(time.monotonic() - start)
+                first_frame = None
+            if stop.is_set():
+                return
+
+
+def relay_viewer(hub, url, stop, first_frame):
+    start = time.monotonic()
+    relay = hub.subscribe(1, url)
+    stream = relay.stream()
+    try:
+        for _ in stream:
+            if first_frame is not None:
+                first_frame.append(time.monotonic() - start)
+                first_frame = None
+            if stop.is_set():
+                return
+    finally:
+        stream.close()
+
+
+def run(viewers, mode):
+    url = f"http://127.0.0.1:{PORT}/stream/1"
+    hub = RelayHub(idle_timeout=1.0)
+    stop = threading.Event()
+    before = upstream_connections()
+
+    def start_viewer(first_frame=None):
+        if mode == 'proxy':
+            target, args = proxy_viewer, (url, stop, first_frame)
+        else:
+            target, args = relay_viewer, (hub, url, stop, first_frame)
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        return thread
+
+    threads = [start_viewer() for _ in range(viewers - 1)]
+    time.sleep(0.5)
+    cpu_start = time.process_time()
+    first_frame = []
+    threads.append(start_viewer(first_frame))
+    time.sleep(DURATION)
+    cpu = time.process_time() - cpu_start
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    connections = upstream_connections() - before
+    time.sleep(1.5)  # let the relay idle out before the next run
+    return cpu / DURATION * 100 / viewers, connections, first_frame[0] * 1000 if first_frame else float('nan')
+
+
+def main():
+    viewer_counts = [int(arg) for arg in sys.argv[1:]] or [1, 10, 50]
+    upstream = subprocess.Popen([sys.executable, '-c', 'from benchmarks.relay_bench import run_upstream; run_upstream()'])
+    try:
+        for _ in range(50):
+            try:
+                upstream_connections()
+                break
+            except requests.RequestException:
+                time.sleep(0.1)
+        print(f"{'viewers':>7} {'mode':>6} {'cpu %/viewer':>12} {'upstreams':>9} {'first frame ms':>14}")
+        for viewers in viewer_counts:
+            for mode in ('proxy', 'relay'):
+                cpu, connections, first_ms = run(viewers, mode)
+                print(f"{viewers:>7} {mode:>6} {cpu:>12.2f} {connections:>9} {first_ms:>14.1f}")
+    finally:
+        upstream.terminate()
+
+
+if __name__ == '__main__':
+    main()
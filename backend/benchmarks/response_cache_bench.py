@@ -0,0 +1,124 @@
+"""
+Benchmark: twenty dashboards polling /api/detection-logs?range=weekly
+together, every request computing its own result versus cached_json()
+(TTL, request coalescing and ETag revalidation).
+
+The route is rebuilt here on the same query and formatting as
+get_detection_logs, over a table filled like benchmarks.storage_bench. Each
+round, every dashboard sends one request, like a 5 s poll; halfway through
+a batch of new logs is committed, which must invalidate the cache.
+
+Run from the backend/ directory:
+    python -m benchmarks.response_cache_bench [rows] [dashboards]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from flask import Flask, jsonify
+
+from app.camera.response_cache import cached_json, get_response_cache
+from benchmarks.storage_bench import NOW, load
+from extensions import db
+from models import DetectionLog
+from storage import configure_engine, migrate
+
+ROUNDS = 6
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    db.init_app(app)
+    computations = []
+
+    def load_logs():
+        computations.append(1)
+        logs = DetectionLog.query.filter(
+            DetectionLog.timestamp >= NOW - timedelta(days=7)
+        ).order_by(DetectionLog.timestamp.desc()).all()
+        return [{
+            'id': log.id,
+            'camera_label': log.camera_label,
+            'emotion': log.emotion,
+            'timestamp': log.timestamp.strftime('%b %d, %Y, %I:%M %p'),
+            'image_url': f"/{log.image_path}" if log.image_path else None,
+        } for log in logs]
+
+    @app.route('/uncached')
+    def uncached():
+        return jsonify(load_logs())
+
+    @app.route('/cached')
+    def cached():
+        return cached_json('detection-logs', load_logs)
+
+    return app, computations
+
+
+def poll(app, url, dashboards):
+    """One round: every dashboard requests at once, revalidating with its last ETag."""
+    client = app.test_client()
+    etags = [None] * dashboards
+    latencies = []
+    sent = [0]
+    lock = threading.Lock()
+
+    def dashboard(index):
+        headers = {'If-None-Match': etags[index]} if etags[index] else {}
+        start = time.perf_counter()
+        response = client.get(url + '?range=weekly', headers=headers)
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            sent[0] += len(response.data)
+        etags[index] = response.headers.get('ETag')
+
+    for round_index in range(ROUNDS):
+        if round_index == ROUNDS // 2:
+            with app.app_context():
+                db.session.add_all([DetectionLog(camera_id=1, camera_label='Camera 1', emotion='fear',
+                                                 timestamp=NOW, confidence=0.5) for _ in range(50)])
+                db.session.commit()
+        threads = [threading.Thread(target=dashboard, args=(i,)) for i in range(dashboards)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return latencies, sent[0]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    dashboards = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'bench.db')
+    load(path, rows)
+    app, computations = make_app(path)
+    with app.app_context():
+        configure_engine(db.engine)
+        migrate(db.engine)
+    get_response_cache().ttl = 60.0  # rounds run back to back; only the insert may invalidate
+
+    print(f"{rows} rows, {dashboards} dashboards x {ROUNDS} polls, one insert batch halfway")
+    print(f"{'mode':>9} {'computations':>12} {'wall s':>7} {'p50 ms':>8} {'max ms':>8} {'MB sent':>8}")
+    for mode in ('uncached', 'cached'):
+        computations.clear()
+        start = time.perf_counter()
+        latencies, sent = poll(app, f"/{mode}", dashboards)
+        wall = time.perf_counter() - start
+        print(f"{mode:>9} {len(computations):>12} {wall:>7.1f} {statistics.median(latencies):>8.1f} "
+              f"{max(latencies):>8.1f} {sent / 1e6:>8.1f}")
+    print(get_response_cache().get_stats())
+
+    for name in os.listdir(workdir):
+        os.remove(os.path.join(workdir, name))
+    os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: detection analytics over a growing history, the ORM loads the
+endpoint used to do (every log of the range and of the previous period as
+DetectionLog objects) versus rollups.detection_counts(), plus what the
+flush hook adds to a 50-row alert batch commit.
+
+The database is filled like benchmarks.storage_bench (180 days, 10 cameras,
+7 emotions) and then migrated, which builds the rollups from the raw logs.
+
+Run from the backend/ directory:
+    python -m benchmarks.rollup_bench [rows ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import rollups
+from benchmarks.storage_bench import NOW, load
+from extensions import db
+from models import DetectionLog
+from storage import configure_engine, migrate
+
+RANGES = {'1hr': timedelta(hours=1), 'today': timedelta(hours=24), 'overall': None}
+RUNS = 3
+
+
+def orm_analytics(since, delta):
+    query = DetectionLog.query
+    if since is not None:
+        query = query.filter(DetectionLog.timestamp >= since)
+    logs = query.order_by(DetectionLog.timestamp.asc()).all()
+    if delta is not None:
+        DetectionLog.query.filter(DetectionLog.timestamp >= since - delta, DetectionLog.timestamp < since).all()
+    return len(logs)
+
+
+def rollup_analytics(since, delta, coarsest):
+    rows = rollups.detection_counts(start=since, coarsest=coarsest)
+    if delta is not None:
+        rollups.detection_counts(start=since - delta, end=since)
+    return sum(row[2] for row in rows)
+
+
+def best_ms(fn, *args):
+    times = []
+    for _ in range(RUNS):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times), result
+
+
+def commit_ms(batches=40):
+    start = time.perf_counter()
+    for _ in range(batches):
+        db.session.add_all([DetectionLog(camera_id=3, camera_label='Camera 3', emotion='anger', timestamp=NOW,
+                                         confidence=0.9) for _ in range(50)])
+        db.session.commit()
+    return (time.perf_counter() - start) / batches * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    print(f"{'rows':>10} {'range':>8} {'orm ms':>10} {'rollups ms':>10} {'logs':>9}")
+    for rows in sizes:
+        workdir = tempfile.mkdtemp()
+        path = os.path.join(workdir, 'bench.db')
+        load(path, rows)
+
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+        db.init_app(app)
+        with app.app_context():
+            configure_engine(db.engine)
+            migrate(db.engine)
+            for name, delta in RANGES.items():
+                since = NOW - delta if delta is not None else None
+                coarsest = {'overall': 'day', 'today': 'hour'}.get(name, 'minute')
+                orm_ms, orm_count = best_ms(orm_analytics, since, delta)
+                rollup_ms, rollup_count = best_ms(rollup_analytics, since, delta, coarsest)
+                assert orm_count == rollup_count, (name, orm_count, rollup_count)
+                print(f"{rows:>10} {name:>8} {orm_ms:>10.1f} {rollup_ms:>10.2f} {orm_count:>9}")
+
+            with_hook = commit_ms()
+            event.remove(Session, 'after_flush', rollups._update_rollups)
+            without_hook = commit_ms()
+            event.listen(Session, 'after_flush', rollups._update_rollups)
+            print(f"{'':>10} 50-row commit: {without_hook:.2f} ms without rollups, {with_hook:.2f} ms with")
+            db.session.remove()
+            db.engine.dispose()
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Benchmark: detection_logs query latency with the old storage setup (default
+rollback journal, no indexes besides the primary key) versus storage.py
+(WAL pragmas and the migration 1 indexes), at several table sizes.
+
+Rows are spread over 180 days, 10 cameras and 7 emotions. The queries are
+the shapes the backend runs: the analytics window and its previous period,
+the weekly log list, the latest detections of one camera and one emotion's
+count for today. The last column is the p99 latency of the camera query
+while another connection commits a 50-row batch every 100 ms, the way the
+alert sink does.
+
+Run from the backend/ directory:
+    python -m benchmarks.storage_bench [rows ...]
+"""
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+from storage import configure_engine, migrate
+
+DAYS = 180
+CAMERAS = 10
+EMOTIONS = ['happiness', 'surprise', 'sadness', 'anger', 'disgust', 'fear', 'neutral']
+CHUNK = 200_000
+RUNS = 5
+NOW = datetime(2026, 1, 1)
+
+# The table as db.create_all() made it before the indexes were added
+OLD_SCHEMA = """
+CREATE TABLE detection_logs (
+    id INTEGER NOT NULL PRIMARY KEY,
+    camera_id INTEGER NOT NULL,
+    camera_label VARCHAR(100) NOT NULL,
+    emotion VARCHAR(50) NOT NULL,
+    confidence FLOAT,
+    image_path VARCHAR(255),
+    timestamp DATETIME NOT NULL
+)
+"""
+
+QUERIES = [
+    ('analytics 1hr', "SELECT * FROM detection_logs WHERE timestamp >= :since ORDER BY timestamp ASC",
+     {'since': NOW - timedelta(hours=1)}),
+    ('previous 1hr', "SELECT * FROM detection_logs WHERE timestamp >= :start AND timestamp < :end",
+     {'start': NOW - timedelta(hours=2), 'end': NOW - timedelta(hours=1)}),
+    ('logs weekly', "SELECT * FROM detection_logs WHERE timestamp >= :since ORDER BY timestamp DESC",
+     {'since': NOW - timedelta(days=7)}),
+    ('camera latest', "SELECT * FROM detection_logs WHERE camera_id = :camera AND timestamp >= :since "
+                      "ORDER BY timestamp DESC LIMIT 100", {'camera': 3, 'since': NOW - timedelta(hours=1)}),
+    ('emotion today', "SELECT count(*) FROM detection_logs WHERE emotion = :emotion AND timestamp >= :since",
+     {'emotion': 'anger', 'since': NOW - timedelta(hours=24)}),
+]
+
+
+def load(path, rows):
+    rng = random.Random(0)
+    span = DAYS * 86400
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(OLD_SCHEMA)
+    start = NOW - timedelta(seconds=span)
+    for offset in range(0, rows, CHUNK):
+        batch = []
+        for _ in range(min(CHUNK, rows - offset)):
+            camera = rng.randrange(CAMERAS) + 1
+            emotion = EMOTIONS[rng.randrange(len(EMOTIONS))]
+            ts = start + timedelta(seconds=rng.random() * span)
+            batch.append((camera, f"Camera {camera}", emotion, rng.random(),
+                          f"/static/alerts/alert_{emotion}.jpg", ts.strftime('%Y-%m-%d %H:%M:%S.%f')))
+        conn.executemany("INSERT INTO detection_logs (camera_id, camera_label, emotion, confidence, image_path, "
+                         "timestamp) VALUES (?, ?, ?, ?, ?, ?)", batch)
+        conn.commit()
+    conn.close()
+
+
+def median_ms(engine, sql, params):
+    times = []
+    with engine.connect() as conn:
+        conn.execute(text(sql), params).all()  # warm the page cache
+        for _ in range(RUNS):
+            start = time.perf_counter()
+            conn.execute(text(sql), params).all()
+            times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def p99_under_writes(engine, duration=3.0):
+    stop = threading.Event()
+
+    def writer():
+        ts = NOW.strftime('%Y-%m-%d %H:%M:%S.%f')
+        rows = [{'c': 3, 'l': 'Camera 3', 'e': 'anger', 'p': 0.9, 'i': '/static/alerts/a.jpg', 't': ts}] * 50
+        while not stop.is_set():
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO detection_logs (camera_id, camera_label, emotion, confidence, "
+                                  "image_path, timestamp) VALUES (:c, :l, :e, :p, :i, :t)"), rows)
+            time.sleep(0.1)
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    _, sql, params = QUERIES[3]
+    times = []
+    deadline = time.monotonic() + duration
+    with engine.connect() as conn:
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            conn.execute(text(sql), params).all()
+            conn.commit()  # end the read transaction, as a request does
+            times.append((time.perf_counter() - start) * 1000)
+    stop.set()
+    thread.join()
+    return sorted(times)[int(len(times) * 0.99)]
+
+
+def measure(path, configured):
+    engine = create_engine(f"sqlite:///{path}")
+    if configured:
+        configure_engine(engine)
+    results = [median_ms(engine, sql, params) for _, sql, params in QUERIES]
+    results.append(p99_under_writes(engine))
+    engine.dispose()
+    return results
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000_000, 5_000_000, 10_000_000]
+    names = [name for name, _, _ in QUERIES] + ['camera p99 w/ writes']
+    print(f"{'rows':>10} {'setup':>8} " + ' '.join(f"{name:>14}" for name in names) + "   (ms)")
+    for rows in sizes:
+        workdir = tempfile.mkdtemp()
+        path = os.path.join(workdir, 'bench.db')
+        start = time.perf_counter()
+        load(path, rows)
+        load_s = time.perf_counter() - start
+
+        before = measure(path, configured=False)
+
+        engine = create_engine(f"sqlite:///{path}")
+        configure_engine(engine)
+        start = time.perf_counter()
+        migrate(engine)
+        migrate_s = time.perf_counter() - start
+        engine.dispose()
+        after = measure(path, configured=True)
+
+        for setup, results in (('old', before), ('storage', after)):
+            print(f"{rows:>10} {setup:>8} " + ' '.join(f"{value:>14.2f}" for value in results))
+        print(f"{'':>10} load {load_s:.0f}s, migration {migrate_s:.0f}s, "
+              f"file {os.path.getsize(path) / 1e6:.0f} MB")
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark: many MJPEG viewers on the asyncio stream server.
+
+A synthetic camera publishes 640x360 frames at 25 fps into a FrameRing the
+way the detector publishes processed frames; N viewers connect to
+/stream/<cam_id> and count the parts they receive. Reports per-viewer fps,
+JPEG encodes, CPU time and the process thread count, which should stay flat
+however many viewers are connected.
+
+Run from the backend/ directory:
+    python -m benchmarks.stream_viewers_bench [viewers] [cameras]
+"""
+import asyncio
+import sys
+import threading
+import time
+
+import numpy as np
+
+from emotion_detection_service.broadcaster import BroadcastHub
+from emotion_detection_service.frame_ring import FrameRing
+from emotion_detection_service.stream_server import MJPEGStreamServer
+
+DURATION = 10.0
+FPS = 25
+PORT = 5902
+
+
+class SyntheticManager:
+    def __init__(self, cameras):
+        self.rings = {cam_id: FrameRing(6) for cam_id in range(1, cameras + 1)}
+        self.broadcasts = BroadcastHub(self.lease_frame, self.wait_frame)
+        self.running = True
+        self.thread = threading.Thread(target=self._publish, daemon=True)
+        self.thread.start()
+
+    def _publish(self):
+        # A smooth scene with some edges compresses like a camera image, unlike noise
+        ys, xs = np.mgrid[0:360, 0:640]
+        base = np.dstack([(xs // 3) % 256, (ys // 2) % 256, ((xs + ys) // 4) % 256]).astype(np.uint8)
+        base[100:260, 200:440] = (40, 160, 220)
+        tick = 0
+        while self.running:
+            for ring in self.rings.values():
+                slot = ring.acquire_write()
+                if slot is None:
+                    continue
+                index, buffer = slot
+                if buffer is None:
+                    buffer = np.empty_like(base)
+                np.copyto(buffer, np.roll(base, tick, axis=1))
+                ring.commit(index, buffer)
+            tick += 4
+            time.sleep(1.0 / FPS)
+
+    def lease_frame(self, cam_id):
+        ring = self.rings.get(cam_id)
+        return ring.lease_latest() if ring else None
+
+    def wait_frame(self, cam_id, last_seq, timeout):
+        return self.rings[cam_id].wait_newer(last_seq, timeout)
+
+    def broadcaster(self, cam_id, quality=None, max_width=None):
+        return self.broadcasts.get(cam_id, quality, max_width)
+
+
+async def viewer(cam_id, counts, index, deadline):
+    reader, writer = await asyncio.open_connection('127.0.0.1', PORT)
+    writer.write(f"GET /stream/{cam_id} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    tail = b''
+    while time.monotonic() < deadline:
+        try:
+            chunk = await asyncio.wait_for(reader.read(65536), timeout=deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            break
+        if not chunk:
+            break
+        data = tail + chunk
+        counts[index] += data.count(b'--frame\r\n')
+        # Carry over less than one boundary, so one split across chunks is found but none is counted twice
+        tail = data[-8:]
+    writer.close()
+
+
+async def run_viewers(viewers, cameras):
+    counts = [0] * viewers
+    deadline = time.monotonic() + DURATION
+    tasks = asyncio.gather(*(viewer(i % cameras + 1, counts, i, deadline) for i in range(viewers)))
+    await asyncio.sleep(DURATION / 2)
+    threads = threading.active_count()
+    await tasks
+    return counts, threads
+
+
+def main():
+    viewers = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    cameras = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    manager = SyntheticManager(cameras)
+    server = MJPEGStreamServer(manager, host='127.0.0.1', port=PORT)
+    server.start()
+
+    cpu_start = time.process_time()
+    counts, threads = asyncio.run(run_viewers(viewers, cameras))
+    cpu = time.process_time() - cpu_start
+    encoded = sum(stats['frames_encoded'] for stats in manager.broadcasts.get_stats().values())
+
+    server.stop()
+    manager.running = False
+
+    rates = sorted(count / DURATION for count in counts)
+    print(f"{viewers} viewers on {cameras} cameras for {DURATION:.0f}s (source {FPS} fps)")
+    print(f"  per-viewer fps: min {rates[0]:.1f}  median {rates[len(rates) // 2]:.1f}  max {rates[-1]:.1f}")
+    print(f"  JPEG encodes: {encoded} ({encoded / DURATION / cameras:.1f}/s per camera)")
+    print(f"  CPU: {cpu:.1f}s for {DURATION:.0f}s wall (includes the viewers themselves)")
+    print(f"  threads in process: {threads}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import namedtuple
+
+from models import Camera
+
+RESYNC_INTERVAL = 300.0  # seconds before a full reload picks up changes made outside any route
+
+# record is camera.to_dict() as of the version, so routes can serve it without a query
+CameraInfo = namedtuple('CameraInfo', ['id', 'label', 'src', 'status', 'version', 'record'])
+
+
+class CameraRegistry:
+    """
+    In-process cache of camera metadata (id -> label, src, status), loaded
+    from the DB once and then kept current by the code paths that change
+    cameras. Every write bumps a version counter and stamps the entry with
+    it; a load only applies rows to entries that have not been written
+    since the load started, so a slow reload never overwrites a newer
+    upsert, status change or removal with the row it read before them.
+
+    Loads need an app context; reads from the cache do not.
+    """
+
+    def __init__(self, max_age=RESYNC_INTERVAL):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._removed = {}  # cam_id -> version of the removal, so an older load does not bring it back
+        self._version = 0
+        self._loaded_at = None
+
+        self.loads = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _info(camera, version):
+        return CameraInfo(camera.id, camera.label, camera.src, camera.status, version, camera.to_dict())
+
+    def _apply(self, cameras, since, cam_ids=None):
+        """Store rows read after version `since`; cam_ids limits which missing ids count as deleted."""
+        with self._lock:
+            found = set()
+            for camera in cameras:
+                found.add(camera.id)
+                current = self._entries.get(camera.id)
+                if (current and current.version > since) or self._removed.get(camera.id, 0) > since:
+                    continue
+                self._version += 1
+                self._entries[camera.id] = self._info(camera, self._version)
+                self._removed.pop(camera.id, None)
+            checked = set(self._entries) if cam_ids is None else set(cam_ids)
+            for cam_id in checked - found:
+                current = self._entries.get(cam_id)
+                if current and current.version <= since:
+                    del self._entries[cam_id]
+            if cam_ids is None:
+                self._removed = {cam_id: v for cam_id, v in self._removed.items() if v > since}
+
+    def reload(self, max_age=None):
+        """Load every camera in one query; with max_age, only if the cache is older than that."""
+        if max_age is not None and self._loaded_at is not None and time.monotonic() - self._loaded_at < max_age:
+            return False
+        since = self._version
+        cameras = Camera.query.all()
+        self._apply(cameras, since)
+        self._loaded_at = time.monotonic()
+        self.loads += 1
+        return True
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None:
+            self.reload()
+
+    def refresh(self, cam_id):
+        """Re-read one camera after another process changed it; returns its entry or None."""
+        since = self._version
+        camera = Camera.query.get(cam_id)
+        self._apply([camera] if camera else [], since, cam_ids=[cam_id])
+        return self.get(cam_id)
+
+    def get(self, cam_id):
+        self._ensure_loaded()
+        info = self._entries.get(cam_id)
+        if info is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return info
+
+    def lookup(self, cam_ids):
+        """Entries for several cameras; unknown ids are fetched together in one query."""
+        self.reload(max_age=self.max_age)
+        cam_ids = set(cam_ids)
+        found = {cam_id: self._entries[cam_id] for cam_id in cam_ids if cam_id in self._entries}
+        missing = cam_ids - set(found)
+        self.hits += len(found)
+        if missing:
+            self.misses += len(missing)
+            since = self._version
+            self._apply(Camera.query.filter(Camera.id.in_(missing)).all(), since, cam_ids=missing)
+            found.update({cam_id: self._entries[cam_id] for cam_id in missing if cam_id in self._entries})
+        return found
+
+    def label(self, cam_id, default="Unknown"):
+        info = self.get(cam_id)
+        return info.label if info else default
+
+    def all(self):
+        self._ensure_loaded()
+        return sorted(self._entries.values(), key=lambda info: info.id)
+
+    def ids_with_status(self, *statuses):
+        self._ensure_loaded()
+        return {info.id for info in list(self._entries.values()) if info.status in statuses}
+
+    def upsert(self, camera):
+        """Record a Camera row this process has just committed."""
+        info = self._info(camera, 0)
+        with self._lock:
+            self._version += 1
+            self._entries[camera.id] = info._replace(version=self._version)
+            self._removed.pop(camera.id, None)
+
+    def set_status(self, cam_id, status):
+        """Record a status change without re-reading the row."""
+        with self._lock:
+            current = self._entries.get(cam_id)
+            if current is None:
+                return
+            self._version += 1
+            record = dict(current.record, status=status.value)
+            self._entries[cam_id] = current._replace(status=status, version=self._version, record=record)
+
+    def remove(self, cam_id):
+        with self._lock:
+            self._version += 1
+            self._entries.pop(cam_id, None)
+            self._removed[cam_id] = self._version
+
+    def get_stats(self):
+        return {
+            'cameras': len(self._entries),
+            'version': self._version,
+            'loads': self.loads,
+            'hits': self.hits,
+            'misses': self.misses,
+            'loaded_age_s': round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+        }
+
+
+_registry = CameraRegistry()
+
+
+def get_camera_registry():
+    return _registry
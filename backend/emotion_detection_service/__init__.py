@@ -1,6 +1,7 @@
 import os
 import logging
 from flask import Flask
+from storage import init_storage
 from extensions import db  # assuming extensions.py is in the project root or accessible
 
 # Configure logging
@@ -28,6 +29,8 @@ def create_app():
 
     # Initialize extensions
     db.init_app(app)
+    with app.app_context():
+        init_storage()
     logger.debug("Database initialized.")
 
     try:
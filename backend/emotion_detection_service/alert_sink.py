@@ -0,0 +1,205 @@
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import cv2
+
+from emotion_detection_service.metrics import Histogram
+from camera_registry import get_camera_registry
+from extensions import db
+from models import DetectionLog
+
+# Configure logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+if not logger.handlers:  # Avoid duplicate logs
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)
+    formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+IST = ZoneInfo("Asia/Kolkata")  # Indian Standard Time
+
+DROP_NEWEST = 'newest'  # a full queue rejects the incoming alert
+DROP_OLDEST = 'oldest'  # a full queue discards its oldest alert to make room
+FLUSH_LATENCY_MS_BUCKETS = [10, 50, 100, 250, 500, 1000, 2500, 5000]
+BATCH_SIZE_BUCKETS = [1, 2, 5, 10, 25, 50, 100]
+
+
+class PendingAlert:
+    def __init__(self, cam_id, face_img, emotion, confidence):
+        self.cam_id = cam_id
+        self.face_img = face_img
+        self.emotion = emotion
+        self.confidence = confidence
+        self.timestamp = datetime.now(IST)
+        self.enqueued_at = time.monotonic()
+        self.image_path = None
+
+
+class AlertSink:
+    """
+    Takes alerts off the detection threads. submit() copies the face crop
+    into a bounded queue and returns at once; a small pool of writer
+    threads encodes the JPEGs to static/alerts, and one DB writer inserts
+    the DetectionLog rows in batches, one transaction per batch_size rows
+    or per flush_interval_ms, whichever comes first. When the queue is
+    full, drop_policy decides which alert is lost; drops are counted.
+    """
+
+    def __init__(self, app, alerts_dir='static/alerts', queue_size=256, image_workers=2, batch_size=50,
+                 flush_interval_ms=500, drop_policy=DROP_NEWEST):
+        self.app = app
+        self.alerts_dir = os.path.abspath(alerts_dir)
+        os.makedirs(self.alerts_dir, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.drop_policy = drop_policy
+
+        self.image_queue = queue.Queue(maxsize=queue_size)
+        self.db_queue = queue.Queue()
+        self._queue_lock = threading.Lock()  # makes drop-oldest's get+put atomic against other producers
+
+        self.alerts_submitted = 0
+        self.alerts_dropped = 0
+        self.images_written = 0
+        self.image_failures = 0
+        self.rows_committed = 0
+        self.rows_failed = 0
+        self.batches_committed = 0
+        self.flush_latency_hist = Histogram(FLUSH_LATENCY_MS_BUCKETS)
+        self.batch_size_hist = Histogram(BATCH_SIZE_BUCKETS)
+
+        self.image_threads = [threading.Thread(target=self._image_writer, name=f'alert-image-{i}', daemon=True)
+                              for i in range(image_workers)]
+        self.db_thread = threading.Thread(target=self._db_writer, name='alert-db', daemon=True)
+        for thread in self.image_threads + [self.db_thread]:
+            thread.start()
+
+    def submit(self, cam_id, face_img, emotion, confidence):
+        """Queue an alert; never blocks. Returns False if the alert was dropped."""
+        # The crop is a view into a frame slot that will be reused, so the sink keeps its own copy
+        alert = PendingAlert(cam_id, face_img.copy(), emotion, confidence)
+        with self._queue_lock:
+            self.alerts_submitted += 1
+            try:
+                self.image_queue.put_nowait(alert)
+                return True
+            except queue.Full:
+                self.alerts_dropped += 1
+                if self.drop_policy != DROP_OLDEST:
+                    logger.warning(f"Alert queue full, dropped {emotion} alert of camera {cam_id}")
+                    return False
+            try:
+                dropped = self.image_queue.get_nowait()
+                logger.warning(f"Alert queue full, dropped {dropped.emotion} alert of camera {dropped.cam_id}")
+            except queue.Empty:
+                pass
+            self.image_queue.put_nowait(alert)
+            return True
+
+    def _image_writer(self):
+        while True:
+            alert = self.image_queue.get()
+            if alert is None:
+                return
+            filename = f"alert_{alert.emotion}_{alert.timestamp.strftime('%Y%m%d_%H%M%S')}.jpg"
+            filepath = os.path.join(self.alerts_dir, filename)
+            try:
+                if not cv2.imwrite(filepath, alert.face_img):
+                    raise OSError("imwrite returned False")
+                self.images_written += 1
+                logger.info(f"Alert saved: {filepath}")
+            except Exception as e:
+                # The detection is still logged, as it was when the image write failed before
+                self.image_failures += 1
+                logger.error(f"Failed to write alert image {filepath}: {e}")
+            alert.face_img = None
+            # Store only relative path in DB
+            alert.image_path = f"/static/alerts/{filename}"
+            self.db_queue.put(alert)
+
+    def _db_writer(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                alert = self.db_queue.get(timeout=timeout)
+            except queue.Empty:
+                alert = False  # flush interval elapsed
+            if alert is None:
+                self._commit(batch)
+                return
+            if alert:
+                batch.append(alert)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._commit(batch)
+                batch = []
+                deadline = None
+
+    def _commit(self, batch):
+        if not batch:
+            return
+        with self.app.app_context():
+            try:
+                cameras = get_camera_registry().lookup({alert.cam_id for alert in batch})
+                labels = {cam_id: info.label for cam_id, info in cameras.items()}
+                db.session.add_all([
+                    DetectionLog(
+                        camera_id=alert.cam_id,
+                        camera_label=labels.get(alert.cam_id, "Unknown"),
+                        timestamp=alert.timestamp,
+                        emotion=alert.emotion,
+                        confidence=alert.confidence,
+                        image_path=alert.image_path,  # store relative URL
+                    )
+                    for alert in batch
+                ])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.rows_failed += len(batch)
+                logger.error(f"Failed to log {len(batch)} alerts to DB: {e}")
+                return
+
+        now = time.monotonic()
+        for alert in batch:
+            self.flush_latency_hist.observe((now - alert.enqueued_at) * 1000.0)
+        self.batch_size_hist.observe(len(batch))
+        self.rows_committed += len(batch)
+        self.batches_committed += 1
+        logger.info(f"Logged {len(batch)} alerts to DB.")
+
+    def stop(self):
+        """Write out everything already queued, then stop the writer threads."""
+        for _ in self.image_threads:
+            self.image_queue.put(None)
+        for thread in self.image_threads:
+            thread.join(timeout=10)
+        self.db_queue.put(None)
+        self.db_thread.join(timeout=10)
+
+    def get_stats(self):
+        return {
+            'drop_policy': self.drop_policy,
+            'image_queue_depth': self.image_queue.qsize(),
+            'db_queue_depth': self.db_queue.qsize(),
+            'alerts_submitted': self.alerts_submitted,
+            'alerts_dropped': self.alerts_dropped,
+            'images_written': self.images_written,
+            'image_failures': self.image_failures,
+            'rows_committed': self.rows_committed,
+            'rows_failed': self.rows_failed,
+            'batches_committed': self.batches_committed,
+            'batch_size': self.batch_size_hist.snapshot(),
+            'flush_latency_ms': self.flush_latency_hist.snapshot(),
+        }
@@ -0,0 +1,180 @@
+import collections
+import logging
+import threading
+import time
+
+import cv2
+
+from emotion_detection_service.metrics import Histogram
+from emotion_detection_service.stream_profiles import DEFAULT_QUALITY
+
+# Configure logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+if not logger.handlers:  # Avoid duplicate logs
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)
+    formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+ENCODE_MS_BUCKETS = (2, 5, 10, 20, 50, 100)
+IDLE_TIMEOUT = 30.0  # seconds without a viewer before a profile's broadcaster is dropped
+
+# One encoded frame, shared read-only by every viewer of the camera
+EncodedFrame = collections.namedtuple('EncodedFrame', ['seq', 'timestamp', 'jpeg'])
+
+
+class FrameBroadcaster:
+    """
+    JPEG-encodes each new processed frame of one camera exactly once. The
+    first viewer to ask for a frame the ring has moved past does the encode;
+    every other viewer gets the same bytes object, tagged with the ring's
+    sequence number so it can tell frames it already sent from new ones.
+    Frames wider than max_width are scaled down before encoding.
+
+    Waiting viewers don't poll: one of them blocks on the ring until the
+    next frame is committed, encodes it and wakes the others.
+    """
+
+    def __init__(self, cam_id, lease_source, wait_source, quality=DEFAULT_QUALITY, max_width=None):
+        self.cam_id = cam_id
+        self.lease_source = lease_source  # cam_id -> FrameLease or None, e.g. manager.lease_frame
+        # (cam_id, last_seq, timeout) -> lease on a newer frame or None, e.g. manager.wait_frame
+        self.wait_source = wait_source
+        self.quality = quality
+        self.max_width = max_width
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.last_used = time.monotonic()
+        self._current = None
+        self._encode_lock = threading.Lock()
+        self._cond = threading.Condition()  # notified when _current changes or the ring waiter steps down
+        self._ring_waiter = False
+
+        self.frames_encoded = 0
+        self.frames_served = 0
+        self.encode_ms_hist = Histogram(ENCODE_MS_BUCKETS)
+
+    def latest(self):
+        """The newest encoded frame, encoding the ring's latest frame first if it is new; None before any frame."""
+        self.last_used = time.monotonic()
+        lease = self.lease_source(self.cam_id)
+        if lease is None:
+            return self._current
+        return self._publish(lease)
+
+    def _publish(self, lease):
+        """Encode a leased frame unless it (or a newer one) already is current; always releases the lease."""
+        current = self._current
+        if current is not None and lease.seq == current.seq:
+            lease.release()
+            return current
+
+        with self._encode_lock:
+            # Another viewer may have encoded this frame (or a newer one) while we waited
+            current = self._current
+            if current is not None and lease.seq <= current.seq:
+                lease.release()
+                return current
+            start = time.perf_counter()
+            with lease:
+                frame = lease.frame
+                if self.max_width and frame.shape[1] > self.max_width:
+                    height = round(frame.shape[0] * self.max_width / frame.shape[1])
+                    frame = cv2.resize(frame, (self.max_width, height), interpolation=cv2.INTER_AREA)
+                ok, buffer = cv2.imencode('.jpg', frame, self.params)
+                seq, timestamp = lease.seq, lease.timestamp
+            if not ok:
+                logger.warning(f"JPEG encode failed for camera {self.cam_id}")
+                return current
+            self.encode_ms_hist.observe((time.perf_counter() - start) * 1000)
+            current = self._current = EncodedFrame(seq, timestamp, buffer.tobytes())
+            self.frames_encoded += 1
+        with self._cond:
+            self._cond.notify_all()
+        return current
+
+    def next_frame(self, last_seq, timeout=5.0):
+        """Block until there is a frame other than last_seq; None on timeout."""
+        deadline = time.monotonic() + timeout
+        frame = self.latest()
+        while frame is None or frame.seq == last_seq:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            with self._cond:
+                frame = self._current  # re-read under the condition, so a notify can't slip past us
+                if frame is not None and frame.seq != last_seq:
+                    break
+                if self._ring_waiter:
+                    # Another viewer is blocked on the ring; it notifies once the new frame is encoded
+                    self._cond.wait(remaining)
+                    frame = self._current
+                    continue
+                self._ring_waiter = True
+            try:
+                lease = self.wait_source(self.cam_id, frame.seq if frame is not None else 0, remaining)
+                if lease is not None:
+                    frame = self._publish(lease)
+            finally:
+                with self._cond:
+                    self._ring_waiter = False
+                    self._cond.notify()  # let a waiting viewer take over if this one gives up
+        self.last_used = time.monotonic()
+        self.frames_served += 1
+        return frame
+
+    def get_stats(self):
+        return {
+            'quality': self.quality,
+            'max_width': self.max_width,
+            'frames_encoded': self.frames_encoded,
+            'frames_served': self.frames_served,
+            'encode_ms': self.encode_ms_hist.snapshot(),
+        }
+
+
+class BroadcastHub:
+    """
+    One FrameBroadcaster per camera and encoding (quality, max width),
+    created on first use and dropped once no viewer has asked for it for
+    IDLE_TIMEOUT, so only the profiles somebody is watching get encoded.
+    """
+
+    def __init__(self, lease_source, wait_source):
+        self.lease_source = lease_source
+        self.wait_source = wait_source
+        self._broadcasters = {}
+        self._lock = threading.Lock()
+
+    def get(self, cam_id, quality=None, max_width=None):
+        key = (cam_id, quality or DEFAULT_QUALITY, max_width)
+        with self._lock:
+            broadcaster = self._broadcasters.get(key)
+            if broadcaster is None:
+                self._prune_locked()
+                broadcaster = FrameBroadcaster(cam_id, self.lease_source, self.wait_source, key[1], max_width)
+                self._broadcasters[key] = broadcaster
+            return broadcaster
+
+    def _prune_locked(self):
+        now = time.monotonic()
+        for key, broadcaster in list(self._broadcasters.items()):
+            if now - broadcaster.last_used > IDLE_TIMEOUT:
+                del self._broadcasters[key]
+
+    def discard(self, cam_id):
+        """Forget a removed camera; its ring restarts at seq 0 if it comes back."""
+        with self._lock:
+            for key in [key for key in self._broadcasters if key[0] == cam_id]:
+                del self._broadcasters[key]
+
+    def get_stats(self):
+        with self._lock:
+            items = list(self._broadcasters.items())
+        stats = {}
+        for (cam_id, quality, max_width), broadcaster in items:
+            name = f"{cam_id}@q{quality}" + (f"w{max_width}" if max_width else "")
+            stats[name] = broadcaster.get_stats()
+        return stats
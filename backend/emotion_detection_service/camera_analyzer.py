@@ -0,0 +1,248 @@
+import logging
+from collections import Counter
+
+import cv2
+import numpy as np
+
+from emotion_detection_service.classification_cache import dhash
+from emotion_detection_service.face_validator import FaceValidator
+from emotion_detection_service.metrics import Histogram
+from emotion_detection_service.motion_gate import MotionGate
+from emotion_detection_service.predict import decode_probs
+from emotion_detection_service.preprocessing import FramePreprocessor
+from emotion_detection_service.tracker import FaceTracker
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARN)
+
+if not logger.handlers:  # Avoid duplicate logs
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.DEBUG)
+    formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+CACHE_AGE_MS_BUCKETS = [50, 100, 250, 500, 1000, 2000]
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.8  # balanced for 720p and 1080p
+THICKNESS = 2
+COLOR = (0, 255, 0)  # green overlay (can also use red/yellow for alerts)
+LINE_TYPE = cv2.LINE_AA
+
+
+class CameraAnalyzer:
+    """
+    Everything one camera needs to turn frames into emotions and alerts:
+    motion gating, face detection and tracking, validation, batched
+    classification and the per-track alert logic. It never owns a capture,
+    so the same code runs behind a detector thread or in a worker process.
+    """
+
+    def __init__(self, cam_id, app, inference_scheduler, face_detector, alert_sink):
+        self.cam_id = cam_id
+        self.app = app
+        self.negative_emotions = {'fear', 'anger', 'sadness', 'disgust'}
+        self.sustain_threshold = 0.7  # 70% of last 10 frames
+
+        # Face detection runs on the manager's shared, batched SSD net
+        self.face_detector = face_detector
+        self.detection_timeout = 5.0  # seconds to wait for a batched detection
+        self.face_validator = FaceValidator()
+        self.preprocessor = FramePreprocessor()
+
+        # Per-face tracks carry emotion history and alert state; the detector runs on keyframes only
+        self.tracker = FaceTracker()
+        self.motion_gate = MotionGate()
+        self.frames_processed = 0
+        self.detector_runs = 0
+
+        # Classification skipping via per-track crop signatures
+        self.classifications_requested = 0
+        self.classifications_skipped = 0
+        self.cache_age_hist = Histogram(CACHE_AGE_MS_BUCKETS)
+
+        # Alerts are handed to the shared sink, which writes images and DB rows off this thread
+        self.alert_sink = alert_sink
+
+        self.inference_scheduler = inference_scheduler
+        self.inference_timeout = 5.0  # seconds to wait for a batched prediction
+
+    def is_valid_face(self, face_img, box=None):
+        """
+        Validate if the detected region is actually a face using multiple checks.
+        Passing the (x, y, w, h) box memoises the verdict for the current frame.
+        """
+        return self.face_validator.validate(face_img, key=box)
+
+    def detect_faces(self, frame, conf_threshold=0.7):
+        h, w = frame.shape[:2]
+        logger.debug(f"Input frame dimensions: width={w}, height={h}")
+
+        # Shrink to detector resolution, enhancing only dark or flat scenes
+        detector_input = self.preprocessor.prepare(frame)
+
+        # Batched with the other cameras' pending frames in one forward pass. The preprocessor reuses its
+        # buffer on the next frame, so if we give up waiting the detector must still hold its own copy
+        future = self.face_detector.submit(detector_input.copy())
+        try:
+            detections = future.result(timeout=self.detection_timeout)
+        except Exception as e:
+            future.cancel()  # still queued: drop it rather than let abandoned work pile up
+            logger.error(f"Face detection failed for camera {self.cam_id}: {e}")
+            return []
+
+        faces = []
+        for i, detection in enumerate(detections):
+            confidence = detection[0]
+            logger.debug(f"Detection {i}: confidence={confidence:.4f}")
+
+            # Increase confidence threshold to reduce false positives
+            if confidence > conf_threshold:  # Use higher threshold
+                box = detection[1:5] * np.array([w, h, w, h])
+                (x1, y1, x2, y2) = box.astype("int")
+
+                # Clip to frame boundaries
+                x1, y1 = max(0, x1), max(0, y1)
+                x2, y2 = min(w - 1, x2), min(h - 1, y2)
+
+                # Extract face region for validation
+                face_region = frame[y1:y2, x1:x2]
+
+                # Skip empty regions
+                if face_region.size == 0:
+                    continue
+
+                # Validate if it's actually a face
+                box = (x1, y1, x2 - x1, y2 - y1)
+                if self.is_valid_face(face_region, box):
+                    faces.append(box)
+                    logger.debug(f"Valid face detected with box coordinates: {(x1, y1, x2, y2)}")
+                else:
+                    logger.debug(f"Invalid face rejected at coordinates: {(x1, y1, x2, y2)}")
+
+        logger.info(f"Total valid faces detected: {len(faces)}")
+        return faces
+
+    def save_alert(self, face_img, emotion, confidence):
+        # Image and DB row are written by the sink's threads; analysis carries on right away
+        if self.alert_sink.submit(self.cam_id, face_img, emotion, confidence):
+            logger.info(f"Alert queued: camera {self.cam_id}, {emotion}")
+
+    def process_frame(self, frame):
+        """
+        Run tracking, classification and alerting on one frame without
+        modifying it. Returns the (box, label) overlays to draw.
+        """
+        # Verdicts cached for the previous frame no longer apply
+        self.face_validator.reset()
+        self.frames_processed += 1
+
+        # Static scenes skip detection and validation entirely
+        scene_active = self.motion_gate.update(frame)
+
+        if scene_active and self.tracker.needs_detection():
+            # Keyframe, nobody tracked yet, or a track was lost
+            faces = self.detect_faces(frame)
+            self.detector_runs += 1
+            logger.debug(f"Detected {len(faces)} faces")
+            tracks = self.tracker.update(faces, frame)
+        else:
+            tracks = self.tracker.propagate(frame)
+
+        # Submit every tracked face of this frame before waiting so they can share a batch
+        pending = []
+        for track in tracks:
+            if track.lost:
+                # Flow lost it and no keyframe has found it again (the gate may be closed): the box is stale
+                continue
+            x, y, w, h = track.box
+            face_img = frame[y:y + h, x:x + w]
+
+            # Additional validation before emotion prediction (memoised on keyframes)
+            if face_img.size == 0 or not self.is_valid_face(face_img, track.box):
+                logger.debug("Skipping emotion prediction for invalid face region")
+                continue
+
+            # Reuse the track's last result while its crop has barely changed
+            self.classifications_requested += 1
+            signature = dhash(face_img)
+            cached = track.classification_cache.lookup(signature)
+            if cached is not None:
+                probs, age = cached
+                self.classifications_skipped += 1
+                self.cache_age_hist.observe(age * 1000.0)
+                pending.append((track, face_img, signature, None, probs))
+            else:
+                # The crop is a view into the caller's frame, which may be a leased slot that is released and
+                # reused if we give up waiting below; the scheduler reads its own copy
+                future = self.inference_scheduler.submit(face_img.copy())
+                pending.append((track, face_img, signature, future, None))
+
+        annotations = []
+        for track, face_img, signature, future, probs in pending:
+            if future is not None:
+                try:
+                    probs = future.result(timeout=self.inference_timeout)
+                except Exception as e:
+                    future.cancel()  # still queued: drop it from its batch
+                    logger.error(f"Emotion prediction failed for camera {self.cam_id}: {e}")
+                    continue
+                track.classification_cache.store(signature, probs)
+            emotion, confidence = decode_probs(probs)
+            logger.debug(f"Track {track.track_id}: predicted emotion {emotion} with confidence {confidence:.2f}")
+
+            # Each track keeps its own history so people in view don't pollute each other's ratio
+            # Increase confidence threshold for emotion prediction
+            if confidence >= 0.65:  # Increased from 0.6 to 0.75
+                track.emotion_buffer.append(emotion)
+            else:
+                track.emotion_buffer.append('neutral')  # treat low confidence as neutral
+
+            # Increase sustain threshold to reduce false alarms
+            negative_count = sum(1 for e in track.emotion_buffer if e in self.negative_emotions)
+            ratio = negative_count / len(track.emotion_buffer)
+
+            # Increased threshold from 0.7 to 0.8 (80% of frames must be negative)
+            if ratio >= 0.7:
+                # Pick the most common negative emotion in buffer
+                counter = Counter(e for e in track.emotion_buffer if e in self.negative_emotions)
+
+                if counter:  # Make sure we have negative emotions
+                    most_common_emotion, count = counter.most_common(1)[0]
+
+                    # Additional check: require at least 6 out of 10 frames to be the same negative emotion
+                    if count >= 5 and most_common_emotion != track.last_negative_emotion:
+                        logger.info(
+                            f"Sustained negative emotion detected on track {track.track_id}: "
+                            f"{most_common_emotion} with ratio {ratio:.2f}")
+                        self.save_alert(face_img, most_common_emotion, confidence)
+                        track.last_negative_emotion = most_common_emotion
+            else:
+                track.last_negative_emotion = None
+
+            # Label with the current frame's emotion
+            annotations.append((track.box, f'{emotion}({confidence:.2f})'))
+
+        return annotations
+
+    def draw_annotations(self, frame, annotations):
+        for (x, y, w, h), label in annotations:
+            cv2.rectangle(frame, (x, y), (x + w, y + h), COLOR, THICKNESS, LINE_TYPE)
+            cv2.putText(frame, label, (x, y - 10), FONT, FONT_SCALE, COLOR, THICKNESS, LINE_TYPE)
+
+    def get_stats(self):
+        return {
+            'frames_processed': self.frames_processed,
+            'detector_runs': self.detector_runs,
+            'detector_ratio': round(self.detector_runs / self.frames_processed, 3) if self.frames_processed else 0.0,
+            'active_tracks': len(self.tracker.tracks),
+            'classifications_requested': self.classifications_requested,
+            'classifications_skipped': self.classifications_skipped,
+            'classification_skip_rate': round(self.classifications_skipped / self.classifications_requested, 3)
+            if self.classifications_requested else 0.0,
+            'classification_cache_age_ms': self.cache_age_hist.snapshot(),
+            'preprocessing': self.preprocessor.get_stats(),
+            'motion_gate': self.motion_gate.get_stats(),
+        }
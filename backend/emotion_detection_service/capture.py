@@ -0,0 +1,227 @@
+import logging
+import os
+import select
+import subprocess
+import time
+
+import cv2
+import numpy as np
+
+# Configure logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARN)
+
+if not logger.handlers:  # Avoid duplicate logs
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.DEBUG)
+    formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+FFMPEG_BINARY = os.environ.get('FFMPEG_BINARY', 'ffmpeg')
+FFMPEG_PREFIX = 'ffmpeg+'  # e.g. "ffmpeg+rtsp://host/stream#640x360"
+DEFAULT_FFMPEG_SIZE = (640, 360)
+# FFmpegCapture waits on its pipe with select(), which only takes sockets on Windows
+FFMPEG_PIPE_SUPPORTED = os.name == 'posix'
+
+
+def parse_source(src):
+    """
+    Split a camera source into (backend, url, size). Sources prefixed with
+    "ffmpeg+" use the FFmpeg pipe backend, optionally with a "#WxH" output
+    size; everything else goes to cv2.VideoCapture unchanged. The FFmpeg
+    backend is POSIX-only; elsewhere open_capture() hands its URL to OpenCV.
+    """
+    if not src.startswith(FFMPEG_PREFIX):
+        return 'opencv', src, None
+
+    url = src[len(FFMPEG_PREFIX):]
+    size = DEFAULT_FFMPEG_SIZE
+    if '#' in url:
+        url, fragment = url.rsplit('#', 1)
+        try:
+            width, height = (int(part) for part in fragment.lower().split('x'))
+            size = (width, height)
+        except ValueError:
+            logger.warning(f"Ignoring invalid size '{fragment}' in source, using {size[0]}x{size[1]}")
+    return 'ffmpeg', url, size
+
+
+def open_capture(src, buffer_size=2):
+    """Open a camera source with the backend its URL selects; the result behaves like cv2.VideoCapture."""
+    backend, url, size = parse_source(src)
+    if backend == 'ffmpeg':
+        if FFMPEG_PIPE_SUPPORTED:
+            return FFmpegCapture(url, size)
+        logger.warning(f"The ffmpeg+ backend needs POSIX pipes, opening {url} with OpenCV instead")
+
+    if url.startswith("rtsp://") and "rtsp_transport=tcp" not in url:
+        url += "?rtsp_transport=tcp"
+    capture = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+    capture.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)  # Keep it minimal to reduce lag
+    return capture
+
+
+class FramePacer:
+    """
+    Paces grabs from local files at their native frame rate. Live streams
+    and FFmpeg pipes (which play files in real time) pace themselves by
+    blocking in grab(), so wait() is a no-op for them.
+    """
+
+    def __init__(self, capture, src):
+        self.interval = 0.0
+        backend, url, _ = parse_source(src)
+        if backend == 'opencv' and os.path.isfile(url):
+            fps = capture.get(cv2.CAP_PROP_FPS)
+            self.interval = 1.0 / fps if fps and fps > 0 else 1.0 / 30
+        self._deadline = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        self._deadline += self.interval
+        delay = self._deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            self._deadline = time.monotonic()  # fell behind; don't try to catch up in a burst
+
+
+class FFmpegCapture:
+    """
+    Capture backend that lets an ffmpeg subprocess decode and scale the
+    stream, and reads raw BGR frames of a fixed size from its stdout into
+    the caller's buffers. Only analysis-sized frames ever reach Python.
+    grab() only waits for the next frame; retrieve() reads it from the
+    pipe straight into the caller's buffer, and a frame that is grabbed
+    but never retrieved is drained by the next grab(). POSIX only (see
+    FFMPEG_PIPE_SUPPORTED).
+
+    Local files are looped in real time (-stream_loop -1 -re) so they can
+    stand in for live cameras. The capture counts as opened once the first
+    frame has arrived, which keeps reconnect() semantics unchanged.
+    """
+
+    def __init__(self, url, size=DEFAULT_FFMPEG_SIZE, read_timeout=10.0):
+        self.url = url
+        self.width, self.height = size
+        self.frame_bytes = self.width * self.height * 3
+        self.read_timeout = read_timeout  # seconds without data before a read fails
+
+        self._process = None
+        self._buffer = np.empty((self.height, self.width, 3), dtype=np.uint8)  # first frame, skipped frames
+        self._pending = None  # where the grabbed frame is: 'pipe', 'buffer' or None
+        self.frames_read = 0
+        self.frames_skipped = 0
+
+        self._start()
+
+    def _command(self):
+        command = [FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error', '-nostdin']
+        if self.url.startswith('rtsp://'):
+            command += ['-rtsp_transport', 'tcp']
+        elif os.path.isfile(self.url):
+            # Play local files at their native rate, forever, like a camera would
+            command += ['-re', '-stream_loop', '-1']
+        # Frames are downscaled for analysis anyway, so skip deblocking and allow non-spec-compliant speedups
+        command += ['-flags2', 'fast', '-skip_loop_filter', 'all']
+        command += ['-i', self.url, '-an',
+                    '-vf', f'scale={self.width}:{self.height}:flags=fast_bilinear',
+                    '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-']
+        return command
+
+    def _start(self):
+        try:
+            self._process = subprocess.Popen(self._command(), stdin=subprocess.DEVNULL,
+                                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+        except OSError as e:
+            logger.error(f"Could not start {FFMPEG_BINARY} for {self.url}: {e}")
+            self._process = None
+            return
+        if self._read_into(self._buffer):
+            self._pending = 'buffer'
+        else:
+            logger.error(f"No frames received from {self.url}")
+            self.release()
+
+    def _wait_readable(self):
+        ready, _, _ = select.select([self._process.stdout], [], [], self.read_timeout)
+        if not ready:
+            logger.warning(f"Timed out waiting for frame data from {self.url}")
+        return bool(ready)
+
+    def _read_into(self, buffer):
+        if self._process is None:
+            return False
+        stdout = self._process.stdout
+        view = memoryview(buffer.reshape(-1))
+        filled = 0
+        while filled < self.frame_bytes:
+            if not self._wait_readable():
+                return False
+            count = stdout.readinto(view[filled:])
+            if not count:
+                return False  # ffmpeg exited or closed the pipe
+            filled += count
+        self.frames_read += 1
+        return True
+
+    def _output_buffer(self, image):
+        shape = (self.height, self.width, 3)
+        if image is not None and image.shape == shape and image.dtype == np.uint8 and image.flags.writeable \
+                and image.flags.c_contiguous:
+            return image
+        return np.empty(shape, dtype=np.uint8)
+
+    def isOpened(self):
+        return self._process is not None and (self._pending is not None or self._process.poll() is None)
+
+    def grab(self):
+        """Wait until the next frame is in the pipe, dropping a grabbed one that was never retrieved."""
+        if self._process is None:
+            return False
+        if self._pending == 'pipe':
+            self.frames_skipped += 1
+            if not self._read_into(self._buffer):
+                self.release()  # ffmpeg exited or stalled mid-frame; the pipe is out of step now
+                return False
+        self._pending = 'pipe' if self._wait_readable() else None
+        return self._pending is not None
+
+    def retrieve(self, image=None):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return False, None
+        frame = self._output_buffer(image)
+        if pending == 'buffer':
+            np.copyto(frame, self._buffer)  # only the frame read at startup
+        elif not self._read_into(frame):
+            self.release()
+            return False, None
+        return True, frame
+
+    def read(self, image=None):
+        if self._pending is None and not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        return 0.0
+
+    def set(self, prop, value):
+        # Size and rate are fixed when ffmpeg is spawned
+        return False
+
+    def release(self):
+        process, self._process = self._process, None
+        self._pending = None
+        if process is None:
+            return
+        process.kill()
+        process.stdout.close()
+        process.wait()
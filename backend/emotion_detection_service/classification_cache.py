@@ -0,0 +1,51 @@
+import time
+
+import cv2
+import numpy as np
+
+CLASSIFIER_INPUT_SIZE = (64, 64)  # what ResEmoteNet sees after _transform
+
+
+def dhash(face_img):
+    """
+    64-bit difference hash of the crop as the classifier would see it:
+    normalised to 64x64, grey, shrunk to 9x8 and compared column to column.
+    """
+    crop = cv2.resize(face_img, CLASSIFIER_INPUT_SIZE, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class ClassificationCache:
+    """
+    Last classifier output for one track. The stored probability vector is
+    reused while new crops hash within max_distance bits of the crop it was
+    computed from, until it is older than max_age seconds.
+    """
+
+    def __init__(self, max_distance=5, max_age=2.0):
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self._signature = None
+        self._probs = None
+        self._computed_at = 0.0
+
+    def lookup(self, signature):
+        """Return (probs, age_seconds) for a reusable result, or None if the crop must be classified."""
+        if self._probs is None:
+            return None
+        age = time.monotonic() - self._computed_at
+        if age > self.max_age or hamming(signature, self._signature) > self.max_distance:
+            return None
+        return self._probs, age
+
+    def store(self, signature, probs):
+        self._signature = signature
+        self._probs = probs
+        self._computed_at = time.monotonic()
@@ -1,11 +1,15 @@
+import argparse
+import socket
 import sys
 import threading
 import time
 import logging
 
 from emotion_detection_service import create_app
-from emotion_detection_service.globals import init_camera_manager, load_model
-import emotion_detection_service.globals as globals_module
+from emotion_detection_service.node_agent import NodeAgent
+from emotion_detection_service.process_pipeline import pipeline_mode
+from emotion_detection_service.stream_server import MJPEGStreamServer
+from ip import ipaddress
 from models import Camera, CameraStatus
 
 logger = logging.getLogger(__name__)
@@ -15,7 +19,8 @@ if not logger.hasHandlers():
     formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s')
     logger.addHandler(ch)
 
-app = create_app()
+# Processes mode spawns children, which re-import this module as __mp_main__: keep module level
+# light (no app, no torch) and do the real work under the __main__ guard below.
 model_path = "emotion_detection_service/fer_model.pth"
 
 # Module-level variable
@@ -42,30 +47,109 @@ def start_cleanup_loop(camera_manager, interval=30):
     cleanup_thread_started = True
     return thread
 
-def run_flask():
-    logger.info("Starting Flask server on 0.0.0.0:5001")
-    app.run(host='0.0.0.0', port=5001, threaded=True)
+def run_flask(flask_app, port=5001):
+    logger.info(f"Starting Flask server on 0.0.0.0:{port}")
+    flask_app.run(host='0.0.0.0', port=port, threaded=True)
 
 
-if __name__ == "__main__":
-    logger.info("Loading model...")
+def run_supervisor(app, args):
+    """Sharded mode: this process only routes; K worker processes own the cameras."""
+    from emotion_detection_service.supervisor import ShardSupervisor, create_front_app
+
+    worker_args = ['--pipeline', args.pipeline]
+    if args.inference_workers:
+        worker_args += ['--inference-workers', str(args.inference_workers)]
+    supervisor = ShardSupervisor(app, args.workers, max_cameras_per_worker=args.max_cameras,
+                                 worker_args=worker_args)
+    supervisor.start()
+
+    front_app = create_front_app(supervisor)
+    flask_thread = threading.Thread(target=run_flask, args=(front_app, args.port), daemon=True)
+    flask_thread.start()
+
+    logger.info(f"Emotion detection supervisor started with {args.workers} workers.")
     try:
-        load_model(model_path)
-        logger.info("Model loaded successfully.")
-    except Exception as e:
-        logger.error(f"Failed to load model: {e}", exc_info=True)
-        sys.exit(1)
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("Stopping all workers...")
+        supervisor.stop()
+        logger.info("Shutdown complete.")
 
-    globals_module.manager = init_camera_manager(model_path=model_path, app=app)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Emotion detection & streaming service")
+    parser.add_argument('--pipeline', choices=['threads', 'processes'], default=pipeline_mode(),
+                        help="threads: one process for everything (default); "
+                             "processes: capture and inference in separate processes over shared memory "
+                             "(also settable with EMOTION_PIPELINE_MODE)")
+    parser.add_argument('--inference-workers', type=int, default=None,
+                        help="number of inference processes in processes mode")
+    parser.add_argument('--port', type=int, default=5001, help="port for the streaming / control API")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="run a supervisor with this many worker processes, each owning a shard of the cameras")
+    parser.add_argument('--max-cameras', type=int, default=10, help="camera limit per process")
+    parser.add_argument('--backend-url', default=None,
+                        help="run as a node: register with this backend (e.g. http://host:8080) and run only "
+                             "the cameras it assigns to this node")
+    parser.add_argument('--node-id', default=None, help="node name in node mode (default: <hostname>:<port>)")
+    parser.add_argument('--advertise-url', default=None,
+                        help="URL the backend should use to reach this node (default: http://<ipaddress>:<port>)")
+    parser.add_argument('--stream-port', type=int, default=None,
+                        help="serve /stream/<cam_id> from an asyncio server on this port; the Flask /stream "
+                             "route redirects there")
+    parser.add_argument('--no-autostart', action='store_true',
+                        help="don't start the DB's active cameras; wait for camera_status_update calls "
+                             "(used by supervised workers)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from emotion_detection_service.globals import init_camera_manager, load_model
+    import emotion_detection_service.globals as globals_module
+
+    args = parse_args()
+    app = create_app()
+
+    if args.workers > 0:
+        run_supervisor(app, args)
+        sys.exit(0)
+
+    # In processes mode every inference worker loads its own copy of the model
+    if args.pipeline == 'threads':
+        logger.info("Loading model...")
+        try:
+            load_model(model_path)
+            logger.info("Model loaded successfully.")
+        except Exception as e:
+            logger.error(f"Failed to load model: {e}", exc_info=True)
+            sys.exit(1)
+
+    globals_module.manager = init_camera_manager(model_path=model_path, app=app, pipeline_mode=args.pipeline,
+                                                 num_inference_workers=args.inference_workers,
+                                                 max_cameras=args.max_cameras)
     cleanup_thread = start_cleanup_loop(globals_module.manager)
 
-    with app.app_context():
-        active_cameras = Camera.query.filter_by(status=CameraStatus.Active).all()
-        for cam in active_cameras:
-            logger.info(f"Adding active camera: ID={cam.id}, SRC={cam.src}")
-            globals_module.manager.add_camera(cam.id, cam.src)
+    if args.backend_url:
+        # Node mode: the backend's hash ring decides which cameras run here
+        node_agent = NodeAgent(globals_module.manager, app, args.backend_url,
+                               node_id=args.node_id or f"{socket.gethostname()}:{args.port}",
+                               advertise_url=args.advertise_url or f"http://{ipaddress}:{args.port}")
+        node_agent.start()
+    elif not args.no_autostart:
+        with app.app_context():
+            active_cameras = Camera.query.filter_by(status=CameraStatus.Active).all()
+            for cam in active_cameras:
+                logger.info(f"Adding active camera: ID={cam.id}, SRC={cam.src}")
+                globals_module.manager.add_camera(cam.id, cam.src)
+
+    stream_server = None
+    if args.stream_port:
+        stream_server = MJPEGStreamServer(globals_module.manager, port=args.stream_port)
+        stream_server.start()
+        app.config['STREAM_SERVER_PORT'] = args.stream_port
 
-    flask_thread = threading.Thread(target=run_flask, daemon=True)
+    flask_thread = threading.Thread(target=run_flask, args=(app, args.port), daemon=True)
     flask_thread.start()
 
     logger.info("Emotion detection & streaming service started.")
@@ -74,5 +158,9 @@ if __name__ == "__main__":
             time.sleep(1)
     except KeyboardInterrupt:
         logger.info("Stopping all detectors...")
+        if args.backend_url:
+            node_agent.stop()
+        if stream_server is not None:
+            stream_server.stop()
         globals_module.manager.stop_all()
         logger.info("Shutdown complete.")
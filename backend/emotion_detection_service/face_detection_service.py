@@ -0,0 +1,80 @@
+import logging
+import os
+
+import cv2
+import numpy as np
+
+from emotion_detection_service.globals import FACE_DETECTOR_PROTO, FACE_DETECTOR_MODEL
+from emotion_detection_service.inference_scheduler import BatchScheduler
+
+# Configure logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARN)
+
+if not logger.handlers:  # Avoid duplicate logs
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.DEBUG)
+    formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+DETECTOR_INPUT_SIZE = (300, 300)
+DETECTOR_MEAN = (104.0, 177.0, 123.0)
+
+
+def default_pool_size():
+    # cv2.dnn already parallelises a single forward pass, so a couple of nets is plenty
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+
+class FaceDetectionService(BatchScheduler):
+    """
+    Shared SSD face detector. Detector threads submit BGR frames and get back
+    futures resolving to an (N, 5) float array of
+    (confidence, x1, y1, x2, y2) rows with coordinates normalised to [0, 1].
+    Each pool worker owns one Caffe net and a preallocated input blob, and
+    runs all frames of a batch through it in a single forward pass. Frames
+    should already be at DETECTOR_INPUT_SIZE (see FramePreprocessor); other
+    sizes are resized here.
+    """
+
+    def __init__(self, pool_size=None, max_batch_size=16, max_wait_ms=10, min_confidence=0.3):
+        super().__init__("FaceDetectionService", max_batch_size=max_batch_size,
+                         max_wait_ms=max_wait_ms, num_workers=pool_size or default_pool_size())
+        self.min_confidence = min_confidence
+        self.has_cv_cuda = cv2.cuda.getCudaEnabledDeviceCount() > 0
+        self._nets = [self._load_net() for _ in range(self.num_workers)]
+
+        w, h = DETECTOR_INPUT_SIZE
+        self._blobs = [np.empty((self.max_batch_size, 3, h, w), dtype=np.float32)
+                       for _ in range(self.num_workers)]
+        self._mean = np.array(DETECTOR_MEAN, dtype=np.float32).reshape(3, 1, 1)
+        logger.info(f"Loaded {len(self._nets)} face detector net(s), CUDA={self.has_cv_cuda}")
+
+    def _load_net(self):
+        net = cv2.dnn.readNetFromCaffe(FACE_DETECTOR_PROTO, FACE_DETECTOR_MODEL)
+        if self.has_cv_cuda:
+            net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+            net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
+        return net
+
+    def process_batch(self, items, worker_index):
+        net = self._nets[worker_index]
+        blob = self._blobs[worker_index][:len(items)]
+
+        # Same layout as blobFromImages(items, 1.0, DETECTOR_INPUT_SIZE, DETECTOR_MEAN): NCHW, BGR, mean removed
+        for i, image in enumerate(items):
+            if image.shape[1::-1] != DETECTOR_INPUT_SIZE:
+                image = cv2.resize(image, DETECTOR_INPUT_SIZE)
+            np.subtract(image.transpose(2, 0, 1), self._mean, out=blob[i])
+        net.setInput(blob)
+
+        # Output is (1, 1, K, 7): image_id, class_id, confidence, x1, y1, x2, y2
+        detections = net.forward()[0, 0]
+        detections = detections[detections[:, 2] >= self.min_confidence]
+
+        results = []
+        for image_id in range(len(items)):
+            rows = detections[detections[:, 0] == image_id]
+            results.append(np.ascontiguousarray(rows[:, 2:7]))
+        return results
@@ -0,0 +1,103 @@
+import logging
+
+import cv2
+import numpy as np
+
+from emotion_detection_service.lbp import texture_score
+
+# Configure logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARN)
+
+if not logger.handlers:  # Avoid duplicate logs
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.DEBUG)
+    formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+# Crops are analysed at this size so the cost per face no longer grows with resolution
+WORKING_SIZE = (96, 96)
+
+
+class FaceValidator:
+    """
+    Decides whether a detected region is really a face.
+    Checks run cheapest first and stop at the first failure. Verdicts can be
+    memoised per box so validating the same crop twice in one frame is free;
+    call reset() whenever a new frame starts.
+    """
+
+    def __init__(self, working_size=WORKING_SIZE):
+        self.working_size = working_size
+        self._verdicts = {}
+
+    def reset(self):
+        self._verdicts.clear()
+
+    def validate(self, face_img, key=None):
+        if key is not None:
+            verdict = self._verdicts.get(key)
+            if verdict is not None:
+                return verdict
+
+        verdict = self._run_checks(face_img)
+        if key is not None:
+            self._verdicts[key] = verdict
+        return verdict
+
+    def _run_checks(self, face_img):
+        h, w = face_img.shape[:2]
+
+        # Check 1: Minimum size filter
+        if h < 40 or w < 40:
+            logger.debug(f"Face too small: {w}x{h}")
+            return False
+
+        # Check 2: Aspect ratio check (faces are roughly square to slightly rectangular)
+        aspect_ratio = w / h
+        if aspect_ratio < 0.5 or aspect_ratio > 2.0:
+            logger.debug(f"Invalid aspect ratio: {aspect_ratio}")
+            return False
+
+        # Everything below works on a small grey copy
+        small = cv2.resize(face_img, self.working_size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+        # Checks 3 and 4: contrast and brightness from a single pass
+        mean, std = cv2.meanStdDev(gray)
+        mean_brightness = float(mean[0, 0])
+        std_dev = float(std[0, 0])
+        if std_dev < 10:  # Too uniform, likely not a face
+            logger.debug(f"Low contrast region, std_dev: {std_dev}")
+            return False
+        if mean_brightness < 30 or mean_brightness > 220:
+            logger.debug(f"Extreme brightness: {mean_brightness}")
+            return False
+
+        # Check 5: Edge density check - faces have good edge content
+        edges = cv2.Canny(gray, 50, 150)
+        edge_density = cv2.countNonZero(edges) / edges.size
+        if edge_density < 0.015:  # Too few edges
+            logger.debug(f"Low edge density: {edge_density}")
+            return False
+
+        # Check 6: Circularity test on the same edge map (faces are rarely perfect circles)
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if contours:
+            cnt = max(contours, key=cv2.contourArea)
+            perimeter = cv2.arcLength(cnt, True)
+            area = cv2.contourArea(cnt)
+            if perimeter > 0:
+                circularity = 4 * np.pi * area / (perimeter ** 2)
+                if circularity > 0.8:  # Reject perfect circles
+                    logger.debug(f"Circular object rejected: {circularity:.2f}")
+                    return False
+
+        # Check 7: Texture analysis using LBP (most expensive, so last)
+        score = texture_score(gray)
+        if score < 0.15:  # Faces have complex textures
+            logger.debug(f"Low texture variation: {score:.2f}")
+            return False
+
+        return True
@@ -0,0 +1,160 @@
+import threading
+import time
+
+
+class FrameLease:
+    """
+    Read-only view of one ring slot. The slot is not reused by the writer
+    until every lease on it has been released; use it as a context manager
+    or call release() explicitly.
+    """
+
+    def __init__(self, ring, index, seq, timestamp, frame):
+        self._ring = ring
+        self.index = index
+        self.seq = seq
+        self.timestamp = timestamp
+        self.frame = frame
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._ring._release(self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class FrameRing:
+    """
+    Fixed-size ring of reusable frame buffers with reference-counted read
+    leases. The writer asks for a free slot, fills it in place (for example
+    capture.read(buffer) decodes straight into it) and commits it, which
+    stamps it with the next sequence number and wakes waiting readers.
+    Readers lease the newest slot and get a read-only view instead of a copy.
+    """
+
+    def __init__(self, slots=4):
+        self._cond = threading.Condition()
+        self._buffers = [None] * slots
+        self._refs = [0] * slots
+        self._seqs = [0] * slots
+        self._timestamps = [0.0] * slots
+        self._writing = None
+        self._latest = None
+        self._seq = 0
+        self._closed = False
+        self._waiting = 0  # readers blocked in wait_newer()
+
+        self.created_at = time.monotonic()
+        self.frames_written = 0
+        self.writer_stalls = 0  # commits skipped because every slot was leased
+        self.bytes_copied = 0
+
+    @property
+    def seq(self):
+        return self._seq
+
+    # ---- writer side -------------------------------------------------
+
+    def acquire_write(self):
+        """
+        Reserve the least recently written free slot and return
+        (index, buffer); buffer is None until the slot has held a frame.
+        Returns None when every slot is leased or being written.
+        """
+        with self._cond:
+            candidates = [i for i in range(len(self._buffers))
+                          if self._refs[i] == 0 and i != self._latest and i != self._writing]
+            if not candidates:
+                self.writer_stalls += 1
+                return None
+            index = min(candidates, key=lambda i: self._seqs[i])
+            self._writing = index
+            return index, self._buffers[index]
+
+    def commit(self, index, frame, timestamp=None):
+        """
+        Publish the slot reserved by acquire_write(). `frame` is whatever
+        was written; if it is not the slot's own buffer (first frame, or the
+        resolution changed) it becomes the slot's buffer from now on.
+        """
+        with self._cond:
+            self._buffers[index] = frame
+            self._seq += 1
+            self._seqs[index] = self._seq
+            self._timestamps[index] = time.time() if timestamp is None else timestamp
+            self._latest = index
+            self._writing = None
+            self.frames_written += 1
+            self._cond.notify_all()
+            return self._seq
+
+    def abort(self, index):
+        with self._cond:
+            if self._writing == index:
+                self._writing = None
+
+    def has_waiting_readers(self):
+        """True while a reader is blocked waiting for a new frame, i.e. the next frame would be consumed."""
+        return self._waiting > 0
+
+    def record_copy(self, nbytes):
+        self.bytes_copied += nbytes
+
+    # ---- reader side -------------------------------------------------
+
+    def lease_latest(self):
+        with self._cond:
+            return self._lease_locked()
+
+    def wait_newer(self, last_seq, timeout=None):
+        """Block until a frame with seq > last_seq is committed and lease it; None on timeout / close."""
+        with self._cond:
+            self._waiting += 1
+            try:
+                ready = self._cond.wait_for(lambda: self._seq > last_seq or self._closed, timeout=timeout)
+            finally:
+                self._waiting -= 1
+            if not ready:
+                return None
+            if self._seq <= last_seq:
+                return None
+            return self._lease_locked()
+
+    def _lease_locked(self):
+        index = self._latest
+        if index is None:
+            return None
+        self._refs[index] += 1
+        view = self._buffers[index].view()
+        view.flags.writeable = False
+        return FrameLease(self, index, self._seqs[index], self._timestamps[index], view)
+
+    def _release(self, index):
+        with self._cond:
+            self._refs[index] -= 1
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def get_stats(self):
+        elapsed = max(time.monotonic() - self.created_at, 1e-6)
+        with self._cond:
+            leased = sum(1 for refs in self._refs if refs)
+            allocated = sum(buf.nbytes for buf in self._buffers if buf is not None)
+        return {
+            'slots': len(self._buffers),
+            'leased_slots': leased,
+            'allocated_bytes': allocated,
+            'frames_written': self.frames_written,
+            'writer_stalls': self.writer_stalls,
+            'bytes_copied': self.bytes_copied,
+            'memcpy_bytes_per_sec': round(self.bytes_copied / elapsed),
+        }
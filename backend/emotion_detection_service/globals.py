@@ -54,11 +54,19 @@ def load_model(model_path: str):
                 raise
 
 
-def init_camera_manager(model_path: str, app):
+def init_camera_manager(model_path: str, app, pipeline_mode: str = 'threads', num_inference_workers=None,
+                        max_cameras: int = 10):
     global manager
+    if pipeline_mode == 'processes':
+        from emotion_detection_service.process_pipeline import ProcessPipelineManager
+        logger.debug("Initializing multi-process camera pipeline...")
+        manager = ProcessPipelineManager(model_path=model_path, app=app, num_inference_workers=num_inference_workers,
+                                         max_cameras=max_cameras)
+        return manager
+
     from emotion_detection_service.multi_camera_manager import MultiCameraManager
     logger.debug("Initializing multi-camera manager...")
-    manager = MultiCameraManager(model_path=model_path, app=app)
+    manager = MultiCameraManager(model_path=model_path, app=app, max_cameras=max_cameras)
     return manager
 
 # Enhanced GPU detection and configuration
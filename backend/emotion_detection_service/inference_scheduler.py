@@ -0,0 +1,185 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from emotion_detection_service.metrics import Histogram
+
+# Configure logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARN)
+
+if not logger.handlers:  # Avoid duplicate logs
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.DEBUG)
+    formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+QUEUE_WAIT_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 250, 500, 1000]
+
+
+class BatchScheduler:
+    """
+    Collects work items submitted from many threads and hands them to
+    process_batch() in groups. A batch is closed as soon as it holds
+    max_batch_size items or its oldest item has waited max_wait_ms.
+    """
+
+    def __init__(self, name, max_batch_size=16, max_wait_ms=10, num_workers=1):
+        self.name = name
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.num_workers = max(1, int(num_workers))
+
+        self._pending = deque()  # (item, future, enqueued_at)
+        self._cond = threading.Condition()
+        self._running = False
+        self._workers = []
+
+        self.batch_size_hist = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_hist = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+
+        for index in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, args=(index,),
+                                      name=f"{self.name}-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        logger.info(f"{self.name} started with {self.num_workers} worker(s), "
+                    f"max_batch_size={self.max_batch_size}, max_wait_ms={self.max_wait_ms}")
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join(timeout=5)
+        self._workers.clear()
+
+        # Anything still queued will never be processed
+        with self._cond:
+            while self._pending:
+                _, future, _ = self._pending.popleft()
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(RuntimeError(f"{self.name} stopped"))
+        logger.info(f"{self.name} stopped.")
+
+    def submit(self, item):
+        future = Future()
+        with self._cond:
+            if not self._running:
+                future.set_exception(RuntimeError(f"{self.name} is not running"))
+                return future
+            self._pending.append((item, future, time.monotonic()))
+            # Wake a worker waiting for work, or one waiting for the batch to fill up
+            self._cond.notify()
+        return future
+
+    def process_batch(self, items, worker_index):
+        """Return one result per item, in order."""
+        raise NotImplementedError
+
+    def _next_batch(self):
+        with self._cond:
+            while self._running and not self._pending:
+                self._cond.wait(timeout=0.5)
+            if not self._running or not self._pending:
+                return []
+
+            deadline = self._pending[0][2] + self.max_wait_ms / 1000.0
+            while self._running and len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(timeout=remaining)
+
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                batch.append(self._pending.popleft())
+            return batch
+
+    def _worker_loop(self, worker_index):
+        while self._running:
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            now = time.monotonic()
+            live = []
+            for item, future, enqueued_at in batch:
+                # Futures cancelled by the submitter are dropped from the batch
+                if future.set_running_or_notify_cancel():
+                    self.queue_wait_hist.observe((now - enqueued_at) * 1000.0)
+                    live.append((item, future))
+            if not live:
+                continue
+
+            self.batch_size_hist.observe(len(live))
+            self.batches += 1
+            self.items += len(live)
+
+            try:
+                results = self.process_batch([item for item, _ in live], worker_index)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"{self.name} batch of {len(live)} failed: {e}")
+                for _, future in live:
+                    future.set_exception(e)
+                continue
+
+            results = list(results)
+            mismatch = None
+            if len(results) != len(live):
+                # A short result list must not leave the remaining submitters waiting forever
+                self.errors += 1
+                mismatch = RuntimeError(f"{self.name} returned {len(results)} results for a batch of {len(live)}")
+                logger.error(str(mismatch))
+            for index, (_, future) in enumerate(live):
+                if index < len(results):
+                    future.set_result(results[index])
+                else:
+                    future.set_exception(mismatch)
+
+    def get_stats(self):
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'batches': self.batches,
+            'items': self.items,
+            'errors': self.errors,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+            'batch_size': self.batch_size_hist.snapshot(),
+            'queue_wait_ms': self.queue_wait_hist.snapshot(),
+        }
+
+
+class InferenceScheduler(BatchScheduler):
+    """
+    Shared emotion classifier front end. Detector threads submit BGR face
+    crops and get back futures resolving to the softmax probability vector
+    for that crop; every batch is one ResEmoteNet forward pass.
+    """
+
+    def __init__(self, model_path, max_batch_size=16, max_wait_ms=15):
+        super().__init__("InferenceScheduler", max_batch_size=max_batch_size,
+                         max_wait_ms=max_wait_ms, num_workers=1)
+        self.model_path = model_path
+
+    def process_batch(self, items, worker_index):
+        from emotion_detection_service.predict import predict_emotion_probs_batch
+
+        probs = predict_emotion_probs_batch(items, self.model_path)
+        return list(probs)
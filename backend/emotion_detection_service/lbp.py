@@ -0,0 +1,140 @@
+"""
+NumPy uniform LBP(8, 1), bit-for-bit compatible with
+skimage.feature.local_binary_pattern(image, 8, 1, method='uniform').
+
+The 8 neighbours are sampled exactly as scikit-image does (bilinear
+interpolation at the rounded circle offsets, zero outside the image), packed
+into an 8-bit code with shifted-array comparisons, and mapped through a
+256-entry lookup table to the uniform label 0..9.
+"""
+import numpy as np
+
+P = 8
+R = 1
+TEXTURE_BINS = 59  # histogram bins used by the face validator's texture check
+BATCH_CHUNK = 8  # crops per vectorised pass in texture_scores()
+
+_angles = 2 * np.pi * np.arange(P, dtype=np.float64) / P
+_row_offsets = np.round(-R * np.sin(_angles), 5)
+_col_offsets = np.round(R * np.cos(_angles), 5)
+
+
+def _build_uniform_lut():
+    lut = np.empty(256, dtype=np.uint8)
+    for code in range(256):
+        bits = [(code >> i) & 1 for i in range(P)]
+        # scikit-image counts 0/1 changes between consecutive samples without wrapping around
+        changes = sum(bits[i] != bits[i + 1] for i in range(P - 1))
+        lut[code] = sum(bits) if changes <= 2 else P + 1
+    return lut
+
+
+UNIFORM_LUT = _build_uniform_lut()
+
+
+def _sample(padded, rows, cols, h, w, dr, dc, out, scratch):
+    """
+    Bilinear sample of `padded` at offset (dr, dc) from every pixel, using
+    scikit-image's arithmetic order. The four corners of every sample are
+    the same shifted window of the padded image, so they are taken as slices.
+    """
+    r0, r1 = int(np.floor(dr)) + R, int(np.ceil(dr)) + R
+    c0, c1 = int(np.floor(dc)) + R, int(np.ceil(dc)) + R
+    if r0 == r1 and c0 == c1:
+        return padded[..., r0:r0 + h, c0:c0 + w]
+
+    # Per-row / per-column fractions, computed exactly like the Cython code does per pixel
+    r = rows + dr
+    c = cols + dc
+    frac_r = r - np.floor(r)
+    frac_c = c - np.floor(c)
+    top_weight, bottom_weight = 1 - frac_r, frac_r
+    left_weight, right_weight = 1 - frac_c, frac_c
+
+    # top = (1 - dc) * top_left + dc * top_right
+    np.multiply(left_weight, padded[..., r0:r0 + h, c0:c0 + w], out=out)
+    np.multiply(right_weight, padded[..., r0:r0 + h, c1:c1 + w], out=scratch)
+    out += scratch
+    # bottom = (1 - dc) * bottom_left + dc * bottom_right
+    bottom = np.multiply(left_weight, padded[..., r1:r1 + h, c0:c0 + w])
+    np.multiply(right_weight, padded[..., r1:r1 + h, c1:c1 + w], out=scratch)
+    bottom += scratch
+    # (1 - dr) * top + dr * bottom
+    out *= top_weight
+    bottom *= bottom_weight
+    out += bottom
+    return out
+
+
+def _uniform_labels(gray):
+    image = np.asarray(gray, dtype=np.float64)
+    h, w = image.shape[-2:]
+
+    # Samples falling outside the image read as 0, like scikit-image's constant mode
+    padded = np.zeros(image.shape[:-2] + (h + 2 * R, w + 2 * R), dtype=np.float64)
+    padded[..., R:R + h, R:R + w] = image
+
+    rows = np.arange(h, dtype=np.float64)[:, None]
+    cols = np.arange(w, dtype=np.float64)[None, :]
+
+    codes = np.zeros(image.shape, dtype=np.uint8)
+    bit = np.empty(image.shape, dtype=bool)
+    out = np.empty(image.shape, dtype=np.float64)
+    scratch = np.empty(image.shape, dtype=np.float64)
+    for i in range(P):
+        neighbour = _sample(padded, rows, cols, h, w, _row_offsets[i], _col_offsets[i], out, scratch)
+        np.greater_equal(neighbour, image, out=bit)
+        codes |= bit.view(np.uint8) << np.uint8(i)
+
+    return np.take(UNIFORM_LUT, codes)
+
+
+def uniform_lbp(gray):
+    """
+    Uniform LBP codes (float64, values 0..9) for a 2-D image or a stack of
+    equally sized images shaped (N, H, W).
+    """
+    return _uniform_labels(gray).astype(np.float64)
+
+
+def _score_from_counts(counts):
+    """std of np.histogram(lbp, bins=TEXTURE_BINS, density=True) computed from label counts."""
+    present = np.flatnonzero(counts)
+    first, last = float(present[0]), float(present[-1])
+    if first == last:
+        # Same range adjustment np.histogram applies to constant input
+        first, last = first - 0.5, last + 0.5
+    hist, _ = np.histogram(np.arange(P + 2, dtype=np.float64), bins=TEXTURE_BINS,
+                           range=(first, last), weights=counts, density=True)
+    return float(np.std(hist))
+
+
+def texture_score(gray):
+    """Spread of the uniform LBP histogram; low values mean flat, face-unlike texture."""
+    counts = np.bincount(_uniform_labels(gray).ravel(), minlength=P + 2).astype(np.float64)
+    return _score_from_counts(counts)
+
+
+def texture_scores(crops):
+    """
+    texture_score() for several crops at once. Crops of the same shape are
+    stacked and run through a single vectorised LBP pass.
+    """
+    scores = [0.0] * len(crops)
+    groups = {}
+    for index, crop in enumerate(crops):
+        groups.setdefault(np.shape(crop), []).append(index)
+
+    # Chunk the stacks so the float64 working set stays cache sized
+    chunks = [indices[i:i + BATCH_CHUNK] for indices in groups.values()
+              for i in range(0, len(indices), BATCH_CHUNK)]
+    for indices in chunks:
+        stack = np.stack([crops[i] for i in indices])
+        codes = _uniform_labels(stack).astype(np.intp).reshape(len(indices), -1)
+        # One bincount over all crops, offset so each crop gets its own row of labels
+        offsets = (np.arange(len(indices)) * (P + 2))[:, None]
+        counts = np.bincount((codes + offsets).ravel(), minlength=len(indices) * (P + 2))
+        counts = counts.reshape(len(indices), P + 2).astype(np.float64)
+        for row, index in enumerate(indices):
+            scores[index] = _score_from_counts(counts[row])
+    return scores
@@ -0,0 +1,64 @@
+import bisect
+import sys
+import threading
+
+import psutil
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram that can be updated from several threads.
+    Bucket bounds are inclusive upper limits; anything larger lands in '+inf'.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            if value > self._max:
+                self._max = value
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            count = self._count
+            total = self._sum
+            maximum = self._max
+
+        labels = [f"<={bound:g}" for bound in self.buckets] + ["+inf"]
+        return {
+            'buckets': dict(zip(labels, counts)),
+            'count': count,
+            'sum': round(total, 3),
+            'mean': round(total / count, 3) if count else 0.0,
+            'max': round(maximum, 3),
+        }
+
+
+def process_memory():
+    """Current and peak resident set size of this process, in bytes (peak is None where unknown)."""
+    memory = psutil.Process().memory_info()
+    peak = getattr(memory, 'peak_wset', None)  # Windows reports the peak itself
+    if peak is None and resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform != 'darwin':
+            peak *= 1024  # ru_maxrss is in KiB on Linux, bytes on macOS
+    return {
+        'rss_bytes': memory.rss,
+        'peak_rss_bytes': peak,
+    }
@@ -0,0 +1,274 @@
+import logging
+import math
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from emotion_detection_service.broadcaster import EncodedFrame
+
+# Configure logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+if not logger.handlers:  # Avoid duplicate logs
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)
+    formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+DEFAULT_TILE_SIZE = (320, 180)
+DEFAULT_FPS = 5.0
+DEFAULT_QUALITY = 70
+MAX_TILES = 64
+IDLE_TIMEOUT = 30.0  # seconds without a viewer before a mosaic is dropped
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+LABEL_COLOR = (255, 255, 255)
+NO_SIGNAL_COLOR = (0, 0, 255)
+
+
+class MosaicTile:
+    def __init__(self, cam_id, index, x, y):
+        self.cam_id = cam_id
+        self.index = index
+        self.x = x
+        self.y = y
+        self.seq = None  # seq of the camera frame currently drawn, None while showing "no signal"
+        self.fit = None  # (source shape, (width, height, left, top)) of the last resize
+        self.buffer = None  # resize target, reused while the source shape stays the same
+
+
+class MosaicComposer:
+    """
+    Tiles several cameras into one preallocated canvas at a fixed tile size
+    and fps, and JPEG-encodes the canvas once per render for every viewer.
+    A render only redraws the tiles whose camera has published a frame
+    since the last one, and skips the encode when nothing changed.
+    cam_ids=None follows whatever cameras the manager is running.
+
+    Renders are driven by one waiting viewer at a time, which sleeps until
+    the next render is due; the others wait until a new mosaic is encoded.
+    """
+
+    def __init__(self, manager, cam_ids=None, tile_size=DEFAULT_TILE_SIZE, fps=DEFAULT_FPS,
+                 quality=DEFAULT_QUALITY, columns=None):
+        self.manager = manager
+        self.fixed_cam_ids = list(cam_ids) if cam_ids is not None else None
+        self.tile_width, self.tile_height = tile_size
+        self.interval = 1.0 / fps
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.columns_requested = columns
+
+        self.tiles = []
+        self.columns = self.rows = 0
+        self.canvas = None
+        self._current = None
+        self._seq = 0
+        self._last_render = 0.0
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)  # notified on every new mosaic
+        self._renderer = False  # a viewer is waiting for the next render time
+        self.last_used = time.monotonic()
+
+        self.renders = 0
+        self.tiles_drawn = 0
+        self.frames_encoded = 0
+
+    # ---- layout ------------------------------------------------------
+
+    def _wanted_cam_ids(self):
+        if self.fixed_cam_ids is not None:
+            return self.fixed_cam_ids
+        return sorted(self.manager.camera_ids())[:MAX_TILES]
+
+    def _build_layout(self, cam_ids):
+        count = max(1, len(cam_ids))
+        self.columns = self.columns_requested or math.ceil(math.sqrt(count))
+        self.rows = math.ceil(count / self.columns)
+        self.canvas = np.zeros((self.rows * self.tile_height, self.columns * self.tile_width, 3), dtype=np.uint8)
+        self.tiles = [MosaicTile(cam_id, index, (index % self.columns) * self.tile_width,
+                                 (index // self.columns) * self.tile_height)
+                      for index, cam_id in enumerate(cam_ids)]
+        for tile in self.tiles:
+            self._draw_no_signal(tile)
+        logger.info(f"Mosaic layout {self.columns}x{self.rows} for cameras {cam_ids}")
+
+    def layout(self):
+        """Which tile shows which camera, for the client to map clicks and labels."""
+        with self._lock:
+            if self.canvas is None:
+                self._build_layout(self._wanted_cam_ids())
+            return {
+                'columns': self.columns,
+                'rows': self.rows,
+                'tile_width': self.tile_width,
+                'tile_height': self.tile_height,
+                'width': self.canvas.shape[1],
+                'height': self.canvas.shape[0],
+                'tiles': [{'camera_id': tile.cam_id, 'index': tile.index, 'x': tile.x, 'y': tile.y,
+                           'width': self.tile_width, 'height': self.tile_height}
+                          for tile in self.tiles],
+            }
+
+    # ---- drawing -----------------------------------------------------
+
+    def _tile_view(self, tile):
+        return self.canvas[tile.y:tile.y + self.tile_height, tile.x:tile.x + self.tile_width]
+
+    def _draw_label(self, view, tile):
+        cv2.putText(view, f"Cam {tile.cam_id}", (6, 18), FONT, 0.5, LABEL_COLOR, 1, cv2.LINE_AA)
+
+    def _draw_no_signal(self, tile):
+        view = self._tile_view(tile)
+        view[:] = 0
+        self._draw_label(view, tile)
+        cv2.putText(view, "No signal", (6, self.tile_height // 2), FONT, 0.6, NO_SIGNAL_COLOR, 1, cv2.LINE_AA)
+        tile.seq = None
+        tile.fit = None
+        tile.buffer = None
+
+    def _draw_frame(self, tile, frame):
+        view = self._tile_view(tile)
+        # Fit the frame inside the tile keeping its aspect ratio; the borders only need clearing when it changes
+        if tile.fit is None or tile.fit[0] != frame.shape:
+            scale = min(self.tile_width / frame.shape[1], self.tile_height / frame.shape[0])
+            width, height = max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale))
+            tile.fit = (frame.shape, (width, height, (self.tile_width - width) // 2, (self.tile_height - height) // 2))
+            tile.buffer = np.empty((height, width, 3), dtype=np.uint8)
+            view[:] = 0
+        width, height, left, top = tile.fit[1]
+        cv2.resize(frame, (width, height), dst=tile.buffer, interpolation=cv2.INTER_AREA)
+        view[top:top + height, left:left + width] = tile.buffer
+        self._draw_label(view, tile)
+
+    def _render_locked(self):
+        cam_ids = self._wanted_cam_ids()
+        changed = False
+        if self.canvas is None or [tile.cam_id for tile in self.tiles] != list(cam_ids):
+            self._build_layout(cam_ids)
+            changed = True
+
+        for tile in self.tiles:
+            lease = self.manager.lease_frame(tile.cam_id)
+            if lease is None:
+                if tile.seq is not None:
+                    self._draw_no_signal(tile)
+                    changed = True
+                continue
+            with lease:
+                if lease.seq == tile.seq:
+                    continue
+                self._draw_frame(tile, lease.frame)
+                tile.seq = lease.seq
+            self.tiles_drawn += 1
+            changed = True
+
+        self.renders += 1
+        if changed or self._current is None:
+            ok, buffer = cv2.imencode('.jpg', self.canvas, self.params)
+            if ok:
+                self._seq += 1
+                self._current = EncodedFrame(self._seq, time.time(), buffer.tobytes())
+                self.frames_encoded += 1
+
+    # ---- viewers -----------------------------------------------------
+
+    def latest(self):
+        """The current mosaic JPEG, rendering first if a frame interval has passed since the last render."""
+        self.last_used = time.monotonic()
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_render >= self.interval:
+                self._last_render = now
+                seq = self._seq
+                self._render_locked()
+                if self._seq != seq:
+                    self._cond.notify_all()
+            return self._current
+
+    def next_frame(self, last_seq, timeout=5.0):
+        """Block until the mosaic changed from last_seq; None on timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            frame = self.latest()
+            if frame is not None and frame.seq != last_seq:
+                return frame
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            with self._cond:
+                if self._current is not None and self._current.seq != last_seq:
+                    continue  # rendered since latest() returned
+                if self._renderer:
+                    self._cond.wait(remaining)
+                    continue
+                self._renderer = True
+                delay = min(remaining, max(0.0, self._last_render + self.interval - time.monotonic()))
+            try:
+                time.sleep(delay)
+            finally:
+                with self._cond:
+                    self._renderer = False
+                    self._cond.notify()  # hand the role over in case this viewer times out
+
+    def get_stats(self):
+        return {
+            'cameras': [tile.cam_id for tile in self.tiles],
+            'renders': self.renders,
+            'tiles_drawn': self.tiles_drawn,
+            'frames_encoded': self.frames_encoded,
+        }
+
+
+class MosaicHub:
+    """One MosaicComposer per distinct mosaic request, shared by its viewers and dropped when idle."""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self._mosaics = {}
+        self._lock = threading.Lock()
+
+    def get(self, cam_ids=None, tile_size=DEFAULT_TILE_SIZE, fps=DEFAULT_FPS, quality=DEFAULT_QUALITY, columns=None):
+        key = (tuple(cam_ids) if cam_ids is not None else None, tuple(tile_size), fps, quality, columns)
+        with self._lock:
+            now = time.monotonic()
+            for other, mosaic in list(self._mosaics.items()):
+                if now - mosaic.last_used > IDLE_TIMEOUT:
+                    del self._mosaics[other]
+            mosaic = self._mosaics.get(key)
+            if mosaic is None:
+                mosaic = MosaicComposer(self.manager, cam_ids, tile_size, fps, quality, columns)
+                self._mosaics[key] = mosaic
+            return mosaic
+
+    def get_stats(self):
+        with self._lock:
+            return [mosaic.get_stats() for mosaic in self._mosaics.values()]
+
+
+def parse_mosaic_args(args):
+    """Mosaic options from query parameters cameras, tile, fps, quality and columns; ValueError if invalid."""
+    cam_ids = None
+    if args.get('cameras'):
+        cam_ids = [int(value) for value in str(args.get('cameras')).split(',') if value.strip()]
+        if not 0 < len(cam_ids) <= MAX_TILES:
+            raise ValueError(f"between 1 and {MAX_TILES} cameras")
+    tile_size = DEFAULT_TILE_SIZE
+    if args.get('tile'):
+        width, height = (int(value) for value in str(args.get('tile')).lower().split('x'))
+        if not (32 <= width <= 1280 and 32 <= height <= 720):
+            raise ValueError("tile must be between 32x32 and 1280x720")
+        tile_size = (width, height)
+    fps = float(args.get('fps') or DEFAULT_FPS)
+    if not 0 < fps <= 30:
+        raise ValueError("fps must be between 0 and 30")
+    quality = int(args.get('quality') or DEFAULT_QUALITY)
+    if not 10 <= quality <= 100:
+        raise ValueError("quality must be between 10 and 100")
+    columns = int(args['columns']) if args.get('columns') else None
+    if columns is not None and not 1 <= columns <= MAX_TILES:
+        raise ValueError(f"columns must be between 1 and {MAX_TILES}")
+    return {'cam_ids': cam_ids, 'tile_size': tile_size, 'fps': fps, 'quality': quality, 'columns': columns}
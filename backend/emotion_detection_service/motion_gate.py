@@ -0,0 +1,66 @@
+import cv2
+import numpy as np
+
+GATE_SIZE = (64, 36)  # frames are compared at this resolution
+
+
+class MotionGate:
+    """
+    Cheap scene-change detector that decides whether face detection is worth
+    running. Each frame is shrunk to GATE_SIZE, blurred, and compared with a
+    running-average background. The gate opens when at least `sensitivity`
+    of the pixels differ by more than `threshold` grey levels, and stays open
+    for `hold_frames` frames after the last motion so people who stop moving
+    are still picked up.
+    """
+
+    def __init__(self, threshold=15, sensitivity=0.005, learning_rate=0.05, hold_frames=25):
+        self.threshold = threshold
+        self.sensitivity = sensitivity
+        self.learning_rate = learning_rate
+        self.hold_frames = hold_frames
+
+        self._background = None
+        self._gray = np.empty(GATE_SIZE[::-1], dtype=np.float32)
+        self._hold = 0
+
+        self.frames = 0
+        self.open_frames = 0
+        self.motion_events = 0
+        self.last_changed_fraction = 0.0
+
+    def update(self, frame):
+        """Feed the next frame; returns True while detection should run."""
+        self.frames += 1
+        small = cv2.resize(frame, GATE_SIZE, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        cv2.GaussianBlur(gray.astype(np.float32), (3, 3), 0, dst=self._gray)
+
+        if self._background is None:
+            # Nothing to compare against yet, so look at the scene once
+            self._background = self._gray.copy()
+            self._hold = self.hold_frames
+        else:
+            diff = cv2.absdiff(self._gray, self._background)
+            self.last_changed_fraction = float(np.count_nonzero(diff > self.threshold)) / diff.size
+            cv2.accumulateWeighted(self._gray, self._background, self.learning_rate)
+            if self.last_changed_fraction >= self.sensitivity:
+                if self._hold == 0:
+                    self.motion_events += 1
+                self._hold = self.hold_frames
+
+        is_open = self._hold > 0
+        if is_open:
+            self._hold -= 1
+            self.open_frames += 1
+        return is_open
+
+    def get_stats(self):
+        return {
+            'threshold': self.threshold,
+            'sensitivity': self.sensitivity,
+            'hold_frames': self.hold_frames,
+            'duty_cycle': round(self.open_frames / self.frames, 3) if self.frames else 0.0,
+            'motion_events': self.motion_events,
+            'last_changed_fraction': round(self.last_changed_fraction, 4),
+        }
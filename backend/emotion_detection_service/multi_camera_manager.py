@@ -1,8 +1,16 @@
 import logging
 import concurrent.futures  # Add this import
+import time
 
+from emotion_detection_service.alert_sink import AlertSink
+from emotion_detection_service.broadcaster import BroadcastHub
 from emotion_detection_service.emotion_detector_thread import EmotionDetectorThread
-from models import Camera, CameraStatus
+from emotion_detection_service.face_detection_service import FaceDetectionService
+from emotion_detection_service.inference_scheduler import InferenceScheduler
+from emotion_detection_service.mosaic import MosaicHub
+from camera_registry import get_camera_registry
+from emotion_detection_service.metrics import process_memory
+from models import CameraStatus
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -18,18 +26,35 @@ if not logger.handlers:
 
 
 class MultiCameraManager:
-    def __init__(self, model_path, app):
+    def __init__(self, model_path, app, max_batch_size=16, max_wait_ms=15, face_detector_pool_size=None,
+                 max_cameras=10):
         self.detectors = {}
         self.model_path = model_path
         self.app = app
 
+        # One batched classifier shared by every camera's detector thread
+        self.inference_scheduler = InferenceScheduler(model_path, max_batch_size=max_batch_size,
+                                                      max_wait_ms=max_wait_ms)
+        self.inference_scheduler.start()
+
+        # One SSD face detector (or a small pool of nets) shared by every camera
+        self.face_detector = FaceDetectionService(pool_size=face_detector_pool_size)
+        self.face_detector.start()
+
+        # Alert images and DetectionLog rows are written in the background, in batches
+        self.alert_sink = AlertSink(app)
+
         # Add resource management
-        self.max_cameras = 10  # Limit based on system resources
+        self.max_cameras = max_cameras  # Limit based on system resources
         self.active_cameras = 0
 
         # Add thread pool for background tasks
         self.thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)
 
+        # Encode-once JPEG broadcasters shared by all viewers of a camera
+        self.broadcasts = BroadcastHub(self.lease_frame, self.wait_frame)
+        self.mosaics = MosaicHub(self)
+
         logger.info("MultiCameraManager initialized.")
 
     def add_camera(self, cam_id, src):
@@ -39,7 +64,10 @@ class MultiCameraManager:
                 logger.warning(f"Maximum camera limit reached ({self.max_cameras}). Cannot add camera {cam_id}.")
                 return False
 
-            detector = EmotionDetectorThread(cam_id, src, self.model_path, self.app)
+            detector = EmotionDetectorThread(cam_id, src, self.model_path, self.app,
+                                             inference_scheduler=self.inference_scheduler,
+                                             face_detector=self.face_detector,
+                                             alert_sink=self.alert_sink)
             detector.start()
             self.detectors[cam_id] = detector
             self.active_cameras += 1
@@ -55,6 +83,7 @@ class MultiCameraManager:
         if detector:
             detector.stop()
             detector.join()
+            self.broadcasts.discard(cam_id)
             self.active_cameras -= 1
             logger.debug(
                 f"Stopped detector for camera {cam_id}. Active cameras: {self.active_cameras}/{self.max_cameras}")
@@ -64,18 +93,19 @@ class MultiCameraManager:
             return False
 
     def cleanup_inactive_cameras(self):
+        registry = get_camera_registry()
         with self.app.app_context():
-            inactive_cameras = Camera.query.filter(Camera.status.in_([CameraStatus.Inactive, CameraStatus.Error])).all()
-            inactive_ids = {cam.id for cam in inactive_cameras}
+            # Status changes arrive through camera_status_update; the periodic reload catches direct DB edits
+            registry.reload(max_age=registry.max_age)
+        inactive_ids = registry.ids_with_status(CameraStatus.Inactive, CameraStatus.Error)
 
-            logger.debug(f"Inactive camera IDs from DB: {inactive_ids}")
-            logger.debug(f"Current detectors in manager: {list(self.detectors.keys())}")
+        logger.debug(f"Inactive camera IDs from registry: {inactive_ids}")
+        logger.debug(f"Current detectors in manager: {list(self.detectors.keys())}")
 
-            for cam_id in list(self.detectors.keys()):
-                if cam_id in inactive_ids:
-                    status = Camera.query.get(cam_id).status.value
-                    logger.info(f"Stopping camera {cam_id}, status from DB: {status}")
-                    self.remove_camera(cam_id)
+        for cam_id in list(self.detectors.keys()):
+            if cam_id in inactive_ids:
+                logger.info(f"Stopping camera {cam_id}, status: {registry.get(cam_id).status.value}")
+                self.remove_camera(cam_id)
 
     def get_frame(self, cam_id):
         detector = self.detectors.get(cam_id)
@@ -85,6 +115,29 @@ class MultiCameraManager:
             logger.debug(f"No frame available for camera {cam_id}")
             return None
 
+    def lease_frame(self, cam_id):
+        """Read-only lease on the latest processed frame of a camera; release it when done."""
+        detector = self.detectors.get(cam_id)
+        if detector:
+            return detector.lease_latest_frame()
+        logger.debug(f"No frame available for camera {cam_id}")
+        return None
+
+    def wait_frame(self, cam_id, last_seq, timeout):
+        """Lease the first processed frame newer than last_seq, waiting up to timeout for it; None on timeout."""
+        detector = self.detectors.get(cam_id)
+        if detector is None:
+            time.sleep(timeout)  # nothing to wait on yet
+            return None
+        return detector.wait_newer_frame(last_seq, timeout)
+
+    def camera_ids(self):
+        return list(self.detectors.keys())
+
+    def broadcaster(self, cam_id, quality=None, max_width=None):
+        """Shared encoder for a camera's stream; every viewer of the same encoding gets the same JPEG bytes."""
+        return self.broadcasts.get(cam_id, quality, max_width)
+
     def stop_all(self):
         logger.info("Stopping all camera detectors...")
         for detector in self.detectors.values():
@@ -92,4 +145,22 @@ class MultiCameraManager:
         for detector in self.detectors.values():
             detector.join()
         self.detectors.clear()
+        self.inference_scheduler.stop()
+        self.face_detector.stop()
+        self.alert_sink.stop()
         logger.info("All detectors stopped and cleared.")
+
+    def get_stats(self):
+        return {
+            'mode': 'threads',
+            'active_cameras': self.active_cameras,
+            'max_cameras': self.max_cameras,
+            'memory': process_memory(),
+            'inference': self.inference_scheduler.get_stats(),
+            'face_detection': self.face_detector.get_stats(),
+            'alerts': self.alert_sink.get_stats(),
+            'streams': self.broadcasts.get_stats(),
+            'mosaics': self.mosaics.get_stats(),
+            'camera_registry': get_camera_registry().get_stats(),
+            'cameras': {cam_id: detector.get_stats() for cam_id, detector in list(self.detectors.items())},
+        }
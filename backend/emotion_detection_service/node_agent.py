@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+
+import requests
+
+from camera_registry import get_camera_registry
+
+# Configure logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+if not logger.handlers:  # Avoid duplicate logs
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)
+    formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+HEARTBEAT_INTERVAL = 5.0  # seconds; the backend drops nodes after NODE_TTL (15s) without one
+LEASE_TIMEOUT = 15.0  # without backend contact for this long, assume our cameras went to other nodes
+REQUEST_TIMEOUT = 5.0
+
+
+class NodeAgent(threading.Thread):
+    """
+    Registers this emotion service with the backend as a node and keeps it
+    alive with heartbeats. Every reply carries the cameras the backend's
+    hash ring assigns to this node, and the agent starts and stops
+    detectors on the local manager until it runs exactly that set.
+    """
+
+    def __init__(self, manager, app, backend_url, node_id, advertise_url, interval=HEARTBEAT_INTERVAL):
+        super().__init__(daemon=True)
+        self.manager = manager
+        self.app = app
+        self.backend_url = backend_url.rstrip('/')
+        self.node_id = node_id
+        self.advertise_url = advertise_url
+        self.interval = interval
+        self.running = True
+        self.registered = False
+        self.last_contact = None
+        self._stop_event = threading.Event()
+
+    def _post(self, path, payload):
+        return requests.post(f"{self.backend_url}/api/nodes/{path}", json=payload, timeout=REQUEST_TIMEOUT)
+
+    def running_cameras(self):
+        return set(self.manager.camera_ids())
+
+    def _register(self):
+        response = self._post('register', {'node_id': self.node_id, 'url': self.advertise_url})
+        response.raise_for_status()
+        self.registered = True
+        logger.info(f"Registered node {self.node_id} ({self.advertise_url}) with {self.backend_url}")
+        return response.json().get('cameras', [])
+
+    def _heartbeat(self):
+        response = self._post('heartbeat', {'node_id': self.node_id, 'running': sorted(self.running_cameras())})
+        if response.status_code == 404:
+            # The backend forgot us (restart or missed TTL)
+            logger.warning(f"Node {self.node_id} unknown to backend, registering again")
+            return self._register()
+        response.raise_for_status()
+        return response.json().get('cameras', [])
+
+    def reconcile(self, assigned):
+        assigned = set(assigned)
+        running = self.running_cameras()
+        for cam_id in running - assigned:
+            logger.info(f"Camera {cam_id} no longer assigned to this node, stopping it")
+            self.manager.remove_camera(cam_id)
+        missing = assigned - running
+        if missing:
+            with self.app.app_context():
+                for cam in get_camera_registry().lookup(missing).values():
+                    logger.info(f"Camera {cam.id} assigned to this node, starting it")
+                    self.manager.add_camera(cam.id, cam.src)
+
+    def run(self):
+        while self.running:
+            try:
+                assigned = self._heartbeat() if self.registered else self._register()
+                self.last_contact = time.monotonic()
+                self.reconcile(assigned)
+            except requests.RequestException as e:
+                logger.warning(f"Backend unreachable from node {self.node_id}: {e}")
+                # Keep running what we have for a while, but not past the point where the
+                # backend has handed our cameras to other nodes
+                if self.last_contact is not None and time.monotonic() - self.last_contact > LEASE_TIMEOUT:
+                    logger.error(f"Lease of node {self.node_id} expired, stopping all cameras")
+                    self.reconcile([])
+                    self.registered = False
+                    self.last_contact = None
+            except Exception as e:
+                logger.error(f"Node agent error: {e}", exc_info=True)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self.running = False
+        self._stop_event.set()
+        try:
+            self._post('unregister', {'node_id': self.node_id})
+        except requests.RequestException:
+            pass
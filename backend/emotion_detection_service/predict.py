@@ -3,7 +3,8 @@ import cv2
 import numpy as np
 import torch
 import torch.nn.functional as F
-from emotion_detection_service.globals import load_model, _model, _device, _labels, _transform
+import emotion_detection_service.globals as globals_module
+from emotion_detection_service.globals import load_model, _device, _labels, _transform
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -20,16 +21,28 @@ if not logger.handlers:
 _model_loaded = False
 
 
-def predict_emotion(frame, model_path: str):
+def _ensure_model(model_path: str):
     global _model_loaded
 
-    try:
-        # Load model only once
-        if not _model_loaded:
-            load_model(model_path)
-            _model_loaded = True
+    # Load model only once
+    if not _model_loaded:
+        load_model(model_path)
+        _model_loaded = True
+
+    # Read through the module so we see the instance load_model() assigned
+    return globals_module._model
+
+
+def decode_probs(probs):
+    """Turn a probability vector into an (emotion, confidence) pair."""
+    idx = int(np.argmax(probs))
+    return _labels[idx], float(probs[idx])
 
-        if _model is None:
+
+def predict_emotion(frame, model_path: str):
+    try:
+        model = _ensure_model(model_path)
+        if model is None:
             logger.error("Model is not loaded properly.")
             return "error", 0.0
 
@@ -38,53 +51,43 @@ def predict_emotion(frame, model_path: str):
         img_tensor = _transform(rgb).unsqueeze(0).to(_device)
 
         with torch.no_grad():
-            logits = _model(img_tensor)
+            logits = model(img_tensor)
             probs = F.softmax(logits, dim=1).squeeze(0).cpu().numpy()
 
-        idx = int(np.argmax(probs))
-        return _labels[idx], float(probs[idx])
+        return decode_probs(probs)
 
     except Exception as e:
         logger.error(f"[predict_emotion] Error: {e}")
         return "error", 0.0
 
 
+def predict_emotion_probs_batch(frames, model_path: str):
+    """
+    Run one batched forward pass over a list of BGR face crops and return
+    an (N, len(_labels)) array of softmax probabilities.
+    Raises on failure so callers can decide how to report it.
+    """
+    model = _ensure_model(model_path)
+    if model is None:
+        raise RuntimeError("Model is not loaded properly.")
+
+    if not frames:
+        return np.empty((0, len(_labels)), dtype=np.float32)
+
+    # Convert images to RGB and preprocess
+    batch_tensors = [_transform(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for frame in frames]
+    batch = torch.stack(batch_tensors, 0).to(_device)
+
+    with torch.no_grad():
+        logits = model(batch)
+        return F.softmax(logits, dim=1).cpu().numpy()
+
+
 # Add batch processing capability
 def predict_emotions_batch(frames, model_path: str):
-    global _model_loaded
-
     try:
-        # Load model only once
-        if not _model_loaded:
-            load_model(model_path)
-            _model_loaded = True
-
-        if _model is None:
-            logger.error("Model is not loaded properly.")
-            return [("error", 0.0)] * len(frames)
-
-        # Process batch of images
-        batch_tensors = []
-        for frame in frames:
-            # Convert image to RGB and preprocess
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img_tensor = _transform(rgb).unsqueeze(0)
-            batch_tensors.append(img_tensor)
-
-        # Stack tensors into a batch
-        if batch_tensors:
-            batch = torch.cat(batch_tensors, 0).to(_device)
-
-            with torch.no_grad():
-                logits = _model(batch)
-                probs = F.softmax(logits, dim=1).cpu().numpy()
-
-            results = []
-            for i in range(len(frames)):
-                idx = int(np.argmax(probs[i]))
-                results.append((_labels[idx], float(probs[i][idx])))
-            return results
-        return []
+        probs = predict_emotion_probs_batch(frames, model_path)
+        return [decode_probs(row) for row in probs]
 
     except Exception as e:
         logger.error(f"[predict_emotions_batch] Error: {e}")
@@ -0,0 +1,748 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from camera_registry import get_camera_registry
+from emotion_detection_service.broadcaster import BroadcastHub
+from emotion_detection_service.capture import FramePacer, open_capture
+from emotion_detection_service.frame_ring import FrameLease
+from emotion_detection_service.metrics import Histogram, process_memory
+from emotion_detection_service.mosaic import MosaicHub
+from extensions import db
+from models import Camera, CameraStatus
+
+# Configure logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+if not logger.handlers:  # Avoid duplicate logs
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)
+    formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+PIPELINE_MODE_ENV = 'EMOTION_PIPELINE_MODE'  # "threads" (default) or "processes"
+PIPELINE_FRAME_SIZE = (640, 360)  # every camera is delivered to the analysers at this size
+RAW_SLOTS = 2  # one frame being analysed, one waiting
+PROCESSED_SLOTS = 4
+STATS_INTERVAL = 2.0  # seconds between stats reports from inference workers
+FRAME_LATENCY_MS_BUCKETS = [10, 25, 50, 100, 250, 500, 1000]
+CAPTURE_STOP_TIMEOUT = 5.0  # seconds a capture process gets to notice its stop event before it is killed
+WORKER_STOP_TIMEOUT = 15.0
+WORKER_RESTART_BACKOFF = 1.0  # first delay before restarting a crashed inference worker; doubles per crash
+WORKER_MAX_BACKOFF = 60.0
+WORKER_STABLE_AFTER = 60.0  # a worker that ran this long before crashing starts over at the first delay
+
+# Layout of CameraChannel.counters, written by the capture process
+DECODED, SKIPPED, FAILURES, STATUS = range(4)
+CAPTURE_RUNNING, CAPTURE_FAILED = 0, 1
+
+# Spawned children don't inherit the parent's threads, CUDA context or open captures
+_ctx = multiprocessing.get_context('spawn')
+
+
+def pipeline_mode():
+    return os.environ.get(PIPELINE_MODE_ENV, 'threads')
+
+
+def default_inference_workers():
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+
+class SharedFrameRing:
+    """
+    FrameRing across processes: fixed-shape frame slots in one shared memory
+    block, whose header (sequence numbers, timestamps and lease counts) is
+    guarded by a multiprocessing condition. Readers lease a slot and read
+    its pixels in place; the writer never reuses a leased slot. commit()
+    notifies the condition, so readers in any process can block in
+    wait_newer() instead of polling.
+
+    commit(handoff=True) leases the slot on behalf of a consumer in another
+    process, which is told the slot index over a queue and calls release()
+    once it is done with it.
+
+    Like other multiprocessing primitives a ring can only be handed to a
+    child process as a Process argument, not sent over a queue.
+    """
+
+    def __init__(self, slots, shape, cond=None, name=None):
+        self.slots = slots
+        self.shape = tuple(shape)
+        # One object for the lock and the condition: a lock and a condition pickled separately would
+        # unpickle as two handles that don't know the other one holds the semaphore
+        self._cond = cond if cond is not None else _ctx.Condition(_ctx.Lock())
+        self._lock = self._cond
+
+        frame_bytes = int(np.prod(self.shape))
+        header_bytes = 8 * (2 + 3 * slots)
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=header_bytes + slots * frame_bytes)
+            self._owner = True
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+
+        # header: [seq, latest, refs..., slot seqs...], then per-slot timestamps, then the frames
+        self._header = np.ndarray((2 + 2 * slots,), dtype=np.int64, buffer=self._shm.buf)
+        self._timestamps = np.ndarray((slots,), dtype=np.float64, buffer=self._shm.buf,
+                                      offset=8 * (2 + 2 * slots))
+        self._frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self._shm.buf,
+                                  offset=header_bytes)
+        if self._owner:
+            self._header[:] = 0
+            self._header[1] = -1
+
+        # Per-process counters, like FrameRing's
+        self.created_at = time.monotonic()
+        self.frames_written = 0
+        self.writer_stalls = 0
+        self.bytes_copied = 0
+
+    def __getstate__(self):
+        return {'slots': self.slots, 'shape': self.shape, 'cond': self._cond, 'name': self._shm.name}
+
+    def __setstate__(self, state):
+        self.__init__(state['slots'], state['shape'], cond=state['cond'], name=state['name'])
+
+    @property
+    def _refs(self):
+        return self._header[2:2 + self.slots]
+
+    @property
+    def _seqs(self):
+        return self._header[2 + self.slots:]
+
+    # ---- writer side -------------------------------------------------
+
+    def acquire_write(self):
+        """Index of the least recently written slot that nobody holds, or None."""
+        with self._lock:
+            refs, seqs, latest = self._refs, self._seqs, self._header[1]
+            candidates = [i for i in range(self.slots) if refs[i] == 0 and i != latest]
+            if not candidates:
+                self.writer_stalls += 1
+                return None
+            return min(candidates, key=lambda i: seqs[i])
+
+    def frame(self, index):
+        return self._frames[index]
+
+    def timestamp(self, index):
+        return float(self._timestamps[index])
+
+    def commit(self, index, timestamp=None, handoff=False):
+        with self._lock:
+            self._header[0] += 1
+            seq = int(self._header[0])
+            self._seqs[index] = seq
+            self._timestamps[index] = time.time() if timestamp is None else timestamp
+            self._header[1] = index
+            if handoff:
+                self._refs[index] += 1
+            self._cond.notify_all()
+        self.frames_written += 1
+        return seq
+
+    def record_copy(self, nbytes):
+        self.bytes_copied += nbytes
+
+    def clear(self):
+        """Forget the latest frame, e.g. before the ring is reused for another camera."""
+        with self._lock:
+            self._header[1] = -1
+
+    # ---- reader side -------------------------------------------------
+
+    def lease_latest(self):
+        with self._cond:
+            return self._lease_locked()
+
+    def wait_newer(self, last_seq, timeout=None):
+        """Block until a frame with seq > last_seq is committed and lease it; None on timeout or close."""
+        with self._cond:
+            # close() drops the header without notifying (its lock may be held by a killed process)
+            ready = self._cond.wait_for(
+                lambda: self._header is None or (self._header[0] > last_seq and self._header[1] >= 0), timeout)
+            if not ready or self._header is None:
+                return None
+            return self._lease_locked()
+
+    def _lease_locked(self):
+        index = int(self._header[1])
+        if index < 0:
+            return None
+        self._refs[index] += 1
+        view = self._frames[index].view()
+        view.flags.writeable = False
+        return FrameLease(self, index, int(self._seqs[index]), float(self._timestamps[index]), view)
+
+    def release(self, index):
+        with self._lock:
+            if self._refs[index] > 0:
+                self._refs[index] -= 1
+
+    _release = release  # FrameLease calls this
+
+    def close(self):
+        self._header = self._timestamps = self._frames = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # a lease still points into the block; the mapping goes away with the process
+        if self._owner:
+            self._shm.unlink()
+
+    def get_stats(self):
+        elapsed = max(time.monotonic() - self.created_at, 1e-6)
+        with self._lock:
+            leased = int(np.count_nonzero(self._refs))
+        return {
+            'slots': self.slots,
+            'leased_slots': leased,
+            'allocated_bytes': self._shm.size,
+            'frames_written': self.frames_written,
+            'writer_stalls': self.writer_stalls,
+            'bytes_copied': self.bytes_copied,
+            'memcpy_bytes_per_sec': round(self.bytes_copied / elapsed),
+        }
+
+
+class CameraChannel:
+    """
+    Shared-memory plumbing for one camera: the raw ring written by its
+    capture process, the work queue carrying raw slot indices to its
+    inference worker, and the processed ring the Flask process streams
+    from. These objects can only reach a worker when it is started, so
+    channels are created up front, bound to one inference worker and
+    reused; one is only replaced together with that worker's process.
+    """
+
+    def __init__(self, index, frame_shape):
+        self.index = index
+        self.raw_ring = SharedFrameRing(RAW_SLOTS, frame_shape)
+        self.processed_ring = SharedFrameRing(PROCESSED_SLOTS, frame_shape)
+        self.work_queue = _ctx.Queue()
+        self.stop_event = _ctx.Event()
+        self.counters = _ctx.Array('q', 4, lock=False)
+
+    def close(self):
+        self.raw_ring.close()
+        self.processed_ring.close()
+
+
+def run_capture(channel, cam_id, src, max_failures=20):
+    """Capture process: grab every frame, decode into a free raw slot and hand its index to the analyser."""
+    ring = channel.raw_ring
+    counters = channel.counters
+    height, width = ring.shape[:2]
+
+    capture = open_capture(src)
+    pacer = FramePacer(capture, src)
+    failure_count = 0
+    logger.info(f"Capture process for camera {cam_id} started (pid {os.getpid()})")
+
+    while not channel.stop_event.is_set():
+        if not capture.grab():
+            failure_count += 1
+            counters[FAILURES] += 1
+            if failure_count >= max_failures:
+                logger.warning(f"Reconnecting camera {cam_id}")
+                capture.release()
+                time.sleep(2)
+                capture = open_capture(src)
+                pacer = FramePacer(capture, src)
+                if not capture.isOpened():
+                    # The manager marks the camera inactive on its next cleanup pass
+                    logger.error(f"Failed to reconnect camera {cam_id}")
+                    counters[STATUS] = CAPTURE_FAILED
+                    break
+                failure_count = 0
+            time.sleep(0.03)
+            continue
+        failure_count = 0
+
+        # Both raw slots busy means the analyser is behind; skip without converting
+        index = ring.acquire_write()
+        if index is None:
+            counters[SKIPPED] += 1
+            pacer.wait()
+            continue
+
+        slot = ring.frame(index)
+        ret, frame = capture.retrieve(slot)
+        if ret:
+            if frame is not slot:
+                # Source is not at pipeline size (or OpenCV allocated its own buffer)
+                if frame.shape == slot.shape:
+                    np.copyto(slot, frame)
+                else:
+                    cv2.resize(frame, (width, height), dst=slot, interpolation=cv2.INTER_LINEAR)
+            seq = ring.commit(index, handoff=True)
+            channel.work_queue.put((index, seq))
+            counters[DECODED] += 1
+        pacer.wait()
+
+    capture.release()
+    logger.info(f"Capture process for camera {cam_id} stopped")
+
+
+class ChannelWorker(threading.Thread):
+    """Inference-side loop for one camera: analyse each handed-off raw slot and publish the annotated frame."""
+
+    def __init__(self, channel, analyzer):
+        super().__init__(daemon=True)
+        self.channel = channel
+        self.analyzer = analyzer
+        self.running = True
+        self.frames_dropped = 0
+        self.frame_latency_hist = Histogram(FRAME_LATENCY_MS_BUCKETS)
+
+    def run(self):
+        raw, processed = self.channel.raw_ring, self.channel.processed_ring
+        last_seq = 0
+        while self.running:
+            try:
+                index, seq = self.channel.work_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                if last_seq and seq > last_seq + 1:
+                    self.frames_dropped += seq - last_seq - 1
+                last_seq = seq
+                timestamp = raw.timestamp(index)
+                self.frame_latency_hist.observe((time.time() - timestamp) * 1000.0)
+
+                frame = raw.frame(index).view()
+                frame.flags.writeable = False
+                annotations = self.analyzer.process_frame(frame)
+
+                out = processed.acquire_write()
+                if out is not None:
+                    buffer = processed.frame(out)
+                    np.copyto(buffer, frame)
+                    processed.record_copy(frame.nbytes)
+                    self.analyzer.draw_annotations(buffer, annotations)
+                    processed.commit(out, timestamp)
+            except Exception as e:
+                logger.error(f"Processing failed for camera {self.analyzer.cam_id}: {e}", exc_info=True)
+            finally:
+                raw.release(index)
+
+    def drain(self):
+        """Release raw slots still queued for this channel after its capture process stopped."""
+        while True:
+            try:
+                index, _ = self.channel.work_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.channel.raw_ring.release(index)
+
+    def get_stats(self):
+        stats = self.analyzer.get_stats()
+        stats.update({
+            'frames_dropped': self.frames_dropped,
+            'frame_latency_ms': self.frame_latency_hist.snapshot(),
+            'processed_ring': self.channel.processed_ring.get_stats(),
+        })
+        return stats
+
+
+def run_inference_worker(worker_index, model_path, channels, control_queue, stats_queue,
+                         max_batch_size=16, max_wait_ms=15):
+    """Inference process: its own model, batch schedulers and one ChannelWorker per assigned camera."""
+    from emotion_detection_service import create_app
+    from emotion_detection_service.alert_sink import AlertSink
+    from emotion_detection_service.camera_analyzer import CameraAnalyzer
+    from emotion_detection_service.face_detection_service import FaceDetectionService
+    from emotion_detection_service.globals import load_model
+    from emotion_detection_service.inference_scheduler import InferenceScheduler
+
+    app = create_app()
+    load_model(model_path)
+    inference_scheduler = InferenceScheduler(model_path, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    inference_scheduler.start()
+    face_detector = FaceDetectionService(pool_size=1)
+    face_detector.start()
+    alert_sink = AlertSink(app)
+    logger.info(f"Inference worker {worker_index} started (pid {os.getpid()})")
+
+    workers = {}  # channel index -> (cam_id, ChannelWorker)
+    next_report = time.monotonic()
+    while True:
+        try:
+            message = control_queue.get(timeout=STATS_INTERVAL)
+        except queue.Empty:
+            message = None
+
+        if message is not None:
+            op = message[0]
+            if op == 'stop':
+                break
+            elif op == 'add':
+                _, channel_index, cam_id = message
+                channel = channels[channel_index]
+                worker = ChannelWorker(channel, CameraAnalyzer(cam_id, app, inference_scheduler, face_detector,
+                                                                     alert_sink))
+                worker.start()
+                workers[channel_index] = (cam_id, worker)
+            elif op == 'remove':
+                _, channel_index = message
+                entry = workers.pop(channel_index, None)
+                if entry is not None:
+                    _, worker = entry
+                    worker.running = False
+                    worker.join(timeout=10)
+                    worker.drain()
+                channels[channel_index].processed_ring.clear()
+                stats_queue.put(('removed', worker_index, channel_index))
+
+        if time.monotonic() >= next_report:
+            next_report = time.monotonic() + STATS_INTERVAL
+            stats_queue.put(('stats', worker_index, {
+                'pid': os.getpid(),
+                'memory': process_memory(),
+                'inference': inference_scheduler.get_stats(),
+                'face_detection': face_detector.get_stats(),
+                'alerts': alert_sink.get_stats(),
+                'cameras': {cam_id: worker.get_stats() for cam_id, worker in workers.values()},
+            }))
+
+    for _, worker in workers.values():
+        worker.running = False
+    for _, worker in workers.values():
+        worker.join(timeout=10)
+    inference_scheduler.stop()
+    face_detector.stop()
+    alert_sink.stop()
+    logger.info(f"Inference worker {worker_index} stopped")
+
+
+class InferenceWorker:
+    """One inference process and the channels it serves; channel i always belongs to worker i % K."""
+
+    def __init__(self, index, channel_indices):
+        self.index = index
+        self.channel_indices = channel_indices
+        self.process = None
+        self.control_queue = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.backoff = WORKER_RESTART_BACKOFF
+        self.restart_at = None  # set once a crash is noticed
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+
+class ProcessPipelineManager:
+    """
+    Drop-in alternative to MultiCameraManager that runs each camera's
+    capture in its own process and the analysis in a pool of inference
+    processes, so decoding, NumPy/OpenCV work and Python bookkeeping are
+    spread over cores instead of sharing one GIL. Frames move through
+    shared memory; only slot indices cross process boundaries. The Flask
+    process streams straight from the processed shared-memory rings.
+
+    Captures are stopped cooperatively. A process that has to be killed
+    may die holding a ring's lock, so its channels are never reused: the
+    inference worker serving them is restarted on freshly allocated ones
+    and their cameras start over. Crashed inference workers are restarted
+    the same way, with exponential backoff.
+    """
+
+    def __init__(self, model_path, app, num_inference_workers=None, frame_size=PIPELINE_FRAME_SIZE,
+                 max_cameras=10, max_batch_size=16, max_wait_ms=15):
+        self.model_path = model_path
+        self.app = app
+        self.max_cameras = max_cameras
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.active_cameras = 0
+        self.running = True
+
+        width, height = frame_size
+        self.channels = [CameraChannel(i, (height, width, 3)) for i in range(max_cameras)]
+        self._free_channels = list(range(max_cameras))
+        self.cameras = {}  # cam_id -> (channel index, worker index, capture process, src)
+        self._lock = threading.Lock()  # bookkeeping shared with the stats collector
+        self._lifecycle = threading.RLock()  # one add / remove / restart at a time
+        self.broadcasts = BroadcastHub(self.lease_frame, self.wait_frame)
+        self.mosaics = MosaicHub(self)
+
+        num_inference_workers = min(num_inference_workers or default_inference_workers(), max_cameras)
+        self.stats_queue = _ctx.Queue()
+        self.worker_stats = {}
+        self.workers = [InferenceWorker(k, list(range(k, max_cameras, num_inference_workers)))
+                        for k in range(num_inference_workers)]
+        for worker in self.workers:
+            self._spawn_worker(worker)
+
+        self._collecting = True
+        self._collector = threading.Thread(target=self._collect_stats, daemon=True)
+        self._collector.start()
+
+        logger.info(f"ProcessPipelineManager initialized with {num_inference_workers} inference workers.")
+
+    # ---- processes ---------------------------------------------------
+
+    def _spawn_worker(self, worker):
+        worker.control_queue = _ctx.Queue()
+        channels = {index: self.channels[index] for index in worker.channel_indices}
+        worker.process = _ctx.Process(target=run_inference_worker, name=f'inference-{worker.index}',
+                                      args=(worker.index, self.model_path, channels, worker.control_queue,
+                                            self.stats_queue, self.max_batch_size, self.max_wait_ms),
+                                      daemon=True)
+        worker.process.start()
+        worker.started_at = time.monotonic()
+
+    def _start_capture(self, cam_id, src, channel_index, worker):
+        self.channels[channel_index].stop_event.clear()
+        worker.control_queue.put(('add', channel_index, cam_id))
+        process = _ctx.Process(target=run_capture, name=f'capture-{cam_id}',
+                               args=(self.channels[channel_index], cam_id, src), daemon=True)
+        process.start()
+        return process
+
+    def _stop_capture(self, cam_id, channel_index, process):
+        """Ask a capture process to stop; True if it did, False if it had to be killed."""
+        self.channels[channel_index].stop_event.set()
+        process.join(timeout=CAPTURE_STOP_TIMEOUT)
+        if not process.is_alive():
+            return True
+        logger.warning(f"Capture process for camera {cam_id} did not stop within {CAPTURE_STOP_TIMEOUT}s, killing it")
+        process.terminate()
+        process.join()
+        return False
+
+    def _stop_worker(self, worker):
+        if worker.alive:
+            worker.control_queue.put(('stop',))
+            worker.process.join(timeout=WORKER_STOP_TIMEOUT)
+            if worker.process.is_alive():
+                logger.warning(f"Inference worker {worker.index} did not stop within {WORKER_STOP_TIMEOUT}s, "
+                               f"killing it")
+                worker.process.terminate()
+                worker.process.join()
+
+    def _restart_worker(self, worker):
+        """Replace an inference worker and all of its channels, then start its cameras again on the new ones."""
+        with self._lifecycle:
+            cameras = [(cam_id, entry) for cam_id, entry in self.cameras.items() if entry[1] == worker.index]
+            for cam_id, (channel_index, _, process, _) in cameras:
+                self.broadcasts.discard(cam_id)
+                self._stop_capture(cam_id, channel_index, process)
+            self._stop_worker(worker)
+
+            in_use = {entry[0] for _, entry in cameras}
+            with self._lock:
+                for channel_index in worker.channel_indices:
+                    old = self.channels[channel_index]
+                    self.channels[channel_index] = CameraChannel(channel_index, old.raw_ring.shape)
+                    old.close()
+                    # Channels whose 'removed' ack died with the old worker are free again
+                    if channel_index not in in_use and channel_index not in self._free_channels:
+                        self._free_channels.append(channel_index)
+
+            worker.restarts += 1
+            self._spawn_worker(worker)
+            for cam_id, (channel_index, _, _, src) in cameras:
+                self.cameras[cam_id] = (channel_index, worker.index,
+                                        self._start_capture(cam_id, src, channel_index, worker), src)
+        logger.info(f"Restarted inference worker {worker.index} with {len(cameras)} cameras "
+                    f"(restart #{worker.restarts})")
+
+    def _check_workers(self):
+        """Restart inference workers that died, backing off while they keep crashing right after starting."""
+        now = time.monotonic()
+        for worker in self.workers:
+            if not self.running or worker.alive:
+                continue
+            if worker.restart_at is None:
+                if now - worker.started_at >= WORKER_STABLE_AFTER:
+                    worker.backoff = WORKER_RESTART_BACKOFF
+                worker.restart_at = now + worker.backoff
+                logger.error(f"Inference worker {worker.index} exited with code {worker.process.exitcode}, "
+                             f"restarting in {worker.backoff:.0f}s")
+                worker.backoff = min(worker.backoff * 2, WORKER_MAX_BACKOFF)
+            elif now >= worker.restart_at:
+                worker.restart_at = None
+                self._restart_worker(worker)
+
+    def _collect_stats(self):
+        while self._collecting:
+            try:
+                self._check_workers()
+            except Exception as e:
+                logger.error(f"Error while restarting inference workers: {e}", exc_info=True)
+            try:
+                kind, worker_index, payload = self.stats_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            if kind == 'stats':
+                self.worker_stats[worker_index] = payload
+            elif kind == 'removed':
+                # The inference side has let go of the channel, so it can take another camera
+                with self._lock:
+                    in_use = any(entry[0] == payload for entry in self.cameras.values())
+                    if not in_use and payload not in self._free_channels:
+                        self.channels[payload].counters[:] = [0, 0, 0, CAPTURE_RUNNING]
+                        self._free_channels.append(payload)
+
+    # ---- cameras -----------------------------------------------------
+
+    def _worker_load(self, worker):
+        return sum(1 for entry in self.cameras.values() if entry[1] == worker.index)
+
+    def add_camera(self, cam_id, src):
+        with self._lifecycle, self._lock:
+            if cam_id in self.cameras:
+                logger.debug(f"Camera {cam_id} already exists.")
+                return False
+            if self.active_cameras >= self.max_cameras or not self._free_channels:
+                logger.warning(f"Maximum camera limit reached ({self.max_cameras}). Cannot add camera {cam_id}.")
+                return False
+            candidates = [worker for worker in self.workers if worker.alive
+                          and any(index in self._free_channels for index in worker.channel_indices)]
+            if not candidates:
+                logger.warning(f"No inference worker is running. Cannot add camera {cam_id}.")
+                return False
+
+            worker = min(candidates, key=self._worker_load)
+            channel_index = next(index for index in self._free_channels if index in worker.channel_indices)
+            self._free_channels.remove(channel_index)
+            process = self._start_capture(cam_id, src, channel_index, worker)
+            self.cameras[cam_id] = (channel_index, worker.index, process, src)
+            self.active_cameras += 1
+
+        logger.info(f"Started capture process for camera {cam_id} on inference worker {worker.index}. "
+                    f"Active cameras: {self.active_cameras}/{self.max_cameras}")
+        return True
+
+    def remove_camera(self, cam_id):
+        with self._lifecycle:
+            with self._lock:
+                entry = self.cameras.pop(cam_id, None)
+                if entry is None:
+                    logger.debug(f"Attempted to remove unknown camera {cam_id}")
+                    return False
+                self.active_cameras -= 1
+
+            channel_index, worker_index, process, _ = entry
+            worker = self.workers[worker_index]
+            self.broadcasts.discard(cam_id)
+            if self._stop_capture(cam_id, channel_index, process):
+                worker.control_queue.put(('remove', channel_index))
+            elif self.running:
+                self._restart_worker(worker)
+        logger.debug(f"Stopped camera {cam_id}. Active cameras: {self.active_cameras}/{self.max_cameras}")
+        return True
+
+    def cleanup_inactive_cameras(self):
+        registry = get_camera_registry()
+        with self.app.app_context():
+            # Captures that could not reconnect are marked inactive here, as the threaded detector does itself
+            for cam_id, entry in list(self.cameras.items()):
+                if self.channels[entry[0]].counters[STATUS] == CAPTURE_FAILED:
+                    try:
+                        if Camera.query.filter_by(id=cam_id).update({'status': CameraStatus.Inactive}):
+                            db.session.commit()
+                            registry.set_status(cam_id, CameraStatus.Inactive)
+                            logger.info(f"Marked camera {cam_id} as Inactive due to repeated failures.")
+                    except Exception as e:
+                        db.session.rollback()
+                        logger.error(f"Could not update camera status: {e}")
+                    self.remove_camera(cam_id)
+
+            registry.reload(max_age=registry.max_age)
+        inactive_ids = registry.ids_with_status(CameraStatus.Inactive, CameraStatus.Error)
+        for cam_id in list(self.cameras.keys()):
+            if cam_id in inactive_ids:
+                logger.info(f"Stopping camera {cam_id}, status: {registry.get(cam_id).status.value}")
+                self.remove_camera(cam_id)
+
+    def lease_frame(self, cam_id):
+        """Read-only lease on the latest processed frame, straight from shared memory; release it when done."""
+        entry = self.cameras.get(cam_id)
+        if entry is None:
+            logger.debug(f"No frame available for camera {cam_id}")
+            return None
+        return self.channels[entry[0]].processed_ring.lease_latest()
+
+    def wait_frame(self, cam_id, last_seq, timeout):
+        """Lease the first processed frame newer than last_seq, waiting up to timeout for it; None on timeout."""
+        entry = self.cameras.get(cam_id)
+        if entry is None:
+            time.sleep(timeout)  # nothing to wait on yet
+            return None
+        return self.channels[entry[0]].processed_ring.wait_newer(last_seq, timeout)
+
+    def camera_ids(self):
+        return list(self.cameras.keys())
+
+    def broadcaster(self, cam_id, quality=None, max_width=None):
+        return self.broadcasts.get(cam_id, quality, max_width)
+
+    def get_frame(self, cam_id):
+        lease = self.lease_frame(cam_id)
+        if lease is None:
+            return None
+        with lease:
+            return lease.frame.copy()
+
+    def stop_all(self):
+        logger.info("Stopping all camera processes...")
+        self.running = False
+        for cam_id in list(self.cameras.keys()):
+            self.remove_camera(cam_id)
+        self._collecting = False
+        self._collector.join(timeout=2)
+        for worker in self.workers:
+            self._stop_worker(worker)
+        for channel in self.channels:
+            channel.close()
+        logger.info("All camera processes stopped.")
+
+    def get_stats(self):
+        worker_stats = dict(self.worker_stats)
+        cameras = {}
+        for cam_id, (channel_index, worker_index, process, _) in list(self.cameras.items()):
+            counters = self.channels[channel_index].counters
+            stats = dict(worker_stats.get(worker_index, {}).get('cameras', {}).get(cam_id, {}))
+            stats.update({
+                'inference_worker': worker_index,
+                'capture_alive': process.is_alive(),
+                'frames_decoded': counters[DECODED],
+                'frames_skipped': counters[SKIPPED],
+                'capture_failures': counters[FAILURES],
+            })
+            cameras[cam_id] = stats
+
+        workers = {}
+        for worker in self.workers:
+            stats = {key: value for key, value in worker_stats.get(worker.index, {}).items() if key != 'cameras'}
+            stats.update({'alive': worker.alive, 'restarts': worker.restarts})
+            workers[worker.index] = stats
+
+        return {
+            'mode': 'processes',
+            'active_cameras': self.active_cameras,
+            'max_cameras': self.max_cameras,
+            'memory': process_memory(),
+            'workers': workers,
+            'streams': self.broadcasts.get_stats(),
+            'mosaics': self.mosaics.get_stats(),
+            'camera_registry': get_camera_registry().get_stats(),
+            'cameras': cameras,
+        }
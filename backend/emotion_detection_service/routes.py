@@ -1,9 +1,9 @@
 import time
-import cv2
 import logging
-from flask import Blueprint, Response, jsonify, current_app, request
+from flask import Blueprint, Response, jsonify, current_app, request, redirect
 import emotion_detection_service.globals as globals_module
-import cv2
+from emotion_detection_service.mosaic import parse_mosaic_args
+from emotion_detection_service.stream_profiles import StreamProfile, StreamSession
 import threading
 
 emotion_bp = Blueprint('emotion', __name__)
@@ -14,13 +14,14 @@ local_storage = threading.local()
 @emotion_bp.route('/stream/<int:camera_id>')
 def video_feed(camera_id):
     def generate_frames():
+        last_seq = None
         while True:
-            frame = globals_module.manager.get_frame(camera_id)
+            # Looked up each time so a camera that is removed and added again gets a fresh broadcaster
+            frame = globals_module.manager.broadcaster(camera_id, quality=70).next_frame(last_seq, timeout=1.0)
             if frame is not None:
-                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-                if ret:
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+                last_seq = frame.seq
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + frame.jpeg + b'\r\n')
             else:
                 # Return a blank frame or error image if no frame is available
                 yield (b'--frame\r\n'
@@ -29,9 +30,8 @@ def video_feed(camera_id):
     return Response(generate_frames(),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
-from extensions import db
-
-from models import Camera
+from camera_registry import get_camera_registry
+from models import CameraStatus
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARN)
@@ -49,7 +49,22 @@ api_bp = Blueprint('api', __name__)
 def stream(cam_id):
     logger.info(f"📡 Incoming stream request for camera {cam_id}")
 
+    # Optional profile: ?fps=5&width=320&quality=60&adaptive=1
+    try:
+        profile = StreamProfile.from_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    stream_port = current_app.config.get('STREAM_SERVER_PORT')
+    if stream_port:
+        # The asyncio stream server serves viewers from one event loop instead of a thread each
+        host = request.host.rsplit(':', 1)[0]
+        query = f"?{request.query_string.decode()}" if request.query_string else ""
+        return redirect(f"http://{host}:{stream_port}/stream/{cam_id}{query}", code=307)
+
     def generate():
+        session = StreamSession(profile)
+        last_seq = None
         while True:
             try:
                 manager = globals_module.manager
@@ -58,12 +73,22 @@ def stream(cam_id):
                     time.sleep(0.1)
                     continue
 
-                frame = manager.get_frame(cam_id)
+                delay = session.delay()
+                if delay:
+                    time.sleep(delay)
+
+                # Encoded once per new frame and shared by every viewer with the same width and quality
+                broadcaster = manager.broadcaster(cam_id, session.quality, session.max_width)
+                frame = broadcaster.next_frame(last_seq, timeout=1.0)
                 if frame is not None:
-                    _, buf = cv2.imencode('.jpg', frame)
+                    last_seq = frame.seq
+                    session.schedule()
                     try:
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + buf.tobytes() + b'\r\n')
+                        # The generator resumes once the server has written the part
+                        send_start = time.monotonic()
+                        yield (b'--frame\r\nContent-Type: image/jpeg\r\n'
+                               b'Content-Length: ' + str(len(frame.jpeg)).encode() + b'\r\n\r\n' + frame.jpeg + b'\r\n')
+                        session.record_send(time.monotonic() - send_start)
                     except GeneratorExit:
                         logger.info(f"Client disconnected from cam_id={cam_id} stream")
                         break
@@ -72,7 +97,6 @@ def stream(cam_id):
                         break
                 else:
                     logger.debug(f"🕳️ No frame available for cam_id={cam_id}")
-                    time.sleep(0.05)
 
             except Exception as e:
                 logger.error(f"❌ Exception in stream generator for cam_id={cam_id}: {e}", exc_info=True)
@@ -81,6 +105,56 @@ def stream(cam_id):
     return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
+@api_bp.route('/mosaic', methods=['GET'])
+def mosaic():
+    # All (or ?cameras=1,2,3) cameras tiled into one stream: ?tile=320x180&fps=5&quality=70&columns=4
+    manager = globals_module.manager
+    if manager is None:
+        return jsonify({'error': 'Camera manager not initialized'}), 503
+    try:
+        options = parse_mosaic_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def generate():
+        last_seq = None
+        while True:
+            # Shared by every viewer of the same mosaic; rendered and encoded once per interval
+            frame = manager.mosaics.get(**options).next_frame(last_seq, timeout=1.0)
+            if frame is None:
+                continue
+            last_seq = frame.seq
+            try:
+                yield (b'--frame\r\nContent-Type: image/jpeg\r\n'
+                       b'Content-Length: ' + str(len(frame.jpeg)).encode() + b'\r\n\r\n' + frame.jpeg + b'\r\n')
+            except GeneratorExit:
+                logger.info("Client disconnected from mosaic stream")
+                break
+
+    return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+
+@api_bp.route('/mosaic/layout', methods=['GET'])
+def mosaic_layout():
+    # Tile to camera map of the mosaic with the same query parameters
+    manager = globals_module.manager
+    if manager is None:
+        return jsonify({'error': 'Camera manager not initialized'}), 503
+    try:
+        options = parse_mosaic_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(manager.mosaics.get(**options).layout()), 200
+
+
+@api_bp.route('/stats', methods=['GET'])
+def stats():
+    manager = globals_module.manager
+    if manager is None:
+        return jsonify({'error': 'Camera manager not initialized'}), 503
+    return jsonify(manager.get_stats()), 200
+
+
 @api_bp.route('/camera_status_update', methods=['POST'])
 def camera_status_update():
     logger = current_app.logger
@@ -97,11 +171,13 @@ def camera_status_update():
     try:
         with current_app.app_context():
             if status == 'Inactive':
+                get_camera_registry().set_status(camera_id, CameraStatus.Inactive)
                 globals_module.manager.remove_camera(camera_id)
                 logger.info(f"📴 Camera {camera_id} set to Inactive and removed from manager")
 
             elif status == 'Active':
-                cam = db.session.get(Camera, camera_id)
+                # The backend changed the row, so this is the one read of it; src or label may be new too
+                cam = get_camera_registry().refresh(camera_id)
                 if not cam:
                     logger.error(f"❌ Camera with ID {camera_id} not found in DB")
                     return jsonify({'error': 'Camera not found'}), 404
@@ -0,0 +1,119 @@
+import time
+
+DEFAULT_QUALITY = 95  # cv2.imencode's own default, what /stream has always sent
+QUALITY_STEPS = (80, 65, 50, 35)  # rungs below the requested quality for adaptive streams
+MIN_WIDTH, MAX_WIDTH = 64, 3840
+NOMINAL_FPS = 25.0  # frame budget for adaptive streams without an fps cap
+SLOW_SEND_RATIO = 0.8  # step down once sends average this share of the frame budget
+FAST_SEND_RATIO = 0.3  # sends below this share of the budget count towards stepping back up
+RECOVER_FRAMES = 50  # fast sends in a row before quality goes one step back up
+
+
+class StreamProfile:
+    """
+    What a viewer asked for: fps cap, maximum width, JPEG quality and
+    whether quality may adapt to the connection. Width and quality are
+    rounded so that similar requests share one cached encoding.
+    """
+
+    def __init__(self, max_fps=None, max_width=None, quality=None, adaptive=False):
+        self.max_fps = max_fps
+        self.max_width = max_width
+        self.quality = quality
+        self.adaptive = adaptive
+
+    @classmethod
+    def from_args(cls, args):
+        """Build a profile from query parameters fps, width, quality and adaptive; ValueError if invalid."""
+        max_fps = max_width = quality = None
+        if args.get('fps'):
+            max_fps = float(args.get('fps'))
+            if not 0 < max_fps <= 60:
+                raise ValueError("fps must be between 0 and 60")
+        if args.get('width'):
+            max_width = int(args.get('width'))
+            if not MIN_WIDTH <= max_width <= MAX_WIDTH:
+                raise ValueError(f"width must be between {MIN_WIDTH} and {MAX_WIDTH}")
+            max_width -= max_width % 16
+        if args.get('quality'):
+            quality = int(args.get('quality'))
+            if not 10 <= quality <= 100:
+                raise ValueError("quality must be between 10 and 100")
+            quality -= quality % 5
+        adaptive = str(args.get('adaptive', '')).lower() in ('1', 'true', 'yes')
+        return cls(max_fps, max_width, quality, adaptive)
+
+    def to_dict(self):
+        return {
+            'fps': self.max_fps,
+            'width': self.max_width,
+            'quality': self.quality,
+            'adaptive': self.adaptive,
+        }
+
+
+class AdaptiveQuality:
+    """
+    Walks down a quality ladder while a viewer's sends take most of the
+    frame budget, and back up after a long run of fast sends. The ladder
+    is fixed, so adaptive viewers at the same rung share an encoding.
+    """
+
+    def __init__(self, start_quality, frame_interval):
+        self.ladder = [start_quality] + [step for step in QUALITY_STEPS if step < start_quality]
+        self.frame_interval = frame_interval
+        self.index = 0
+        self.avg_send = 0.0
+        self.fast_sends = 0
+        self.steps_down = 0
+
+    @property
+    def quality(self):
+        return self.ladder[self.index]
+
+    def record(self, seconds):
+        self.avg_send = 0.8 * self.avg_send + 0.2 * seconds
+        if self.avg_send > SLOW_SEND_RATIO * self.frame_interval:
+            self.fast_sends = 0
+            if self.index < len(self.ladder) - 1:
+                self.index += 1
+                self.steps_down += 1
+                self.avg_send = 0.0  # judge the new rung on its own sends
+        elif self.avg_send < FAST_SEND_RATIO * self.frame_interval:
+            self.fast_sends += 1
+            if self.fast_sends >= RECOVER_FRAMES and self.index > 0:
+                self.index -= 1
+                self.fast_sends = 0
+
+
+class StreamSession:
+    """Per-viewer state for a profile: fps pacing and the current (adaptive) quality."""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.interval = 1.0 / profile.max_fps if profile.max_fps else 0.0
+        self.adaptive = None
+        if profile.adaptive:
+            self.adaptive = AdaptiveQuality(profile.quality or DEFAULT_QUALITY, self.interval or 1.0 / NOMINAL_FPS)
+        self._next_time = 0.0
+
+    @property
+    def quality(self):
+        """JPEG quality for the next frame; None means the encoder default."""
+        return self.adaptive.quality if self.adaptive else self.profile.quality
+
+    @property
+    def max_width(self):
+        return self.profile.max_width
+
+    def delay(self):
+        """Seconds until the fps cap allows the next frame."""
+        return max(0.0, self._next_time - time.monotonic())
+
+    def schedule(self):
+        """A frame was handed to the viewer; the next one is due one interval from now."""
+        self._next_time = time.monotonic() + self.interval
+
+    def record_send(self, seconds):
+        if self.adaptive:
+            self.adaptive.record(seconds)
@@ -0,0 +1,260 @@
+import asyncio
+import json
+import logging
+import re
+import socket
+import threading
+import time
+from urllib.parse import parse_qsl
+
+from emotion_detection_service.stream_profiles import StreamProfile, StreamSession
+
+# Configure logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+if not logger.handlers:  # Avoid duplicate logs
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)
+    formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+STREAM_PATH = re.compile(r'^/stream/(\d+)$')
+BOUNDARY = b'frame'
+WRITE_BUFFER_HIGH = 64 * 1024  # bytes buffered per socket before drain() makes the sender wait
+SOCKET_SEND_BUFFER = 128 * 1024  # kernel send buffer; kept small so drain() times follow the viewer's real speed
+
+
+class StreamClient:
+    """
+    One MJPEG viewer. Frames wait in a short queue; when the viewer cannot
+    keep up the oldest queued frame is dropped, so a slow connection only
+    ever lags by queue_size frames and never holds anybody else back.
+    """
+
+    def __init__(self, cam_id, peer, profile, queue_size=2):
+        self.cam_id = cam_id
+        self.peer = peer
+        self.session = StreamSession(profile)
+        self.last_seq = None
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.frames_sent = 0
+        self.frames_dropped = 0
+
+    def offer(self, jpeg):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.frames_dropped += 1
+        self.queue.put_nowait(jpeg)
+
+
+class CameraFeed:
+    """The clients watching one camera, fed by a single task."""
+
+    def __init__(self, cam_id):
+        self.cam_id = cam_id
+        self.clients = set()
+        self.task = None
+
+
+class MJPEGStreamServer:
+    """
+    asyncio MJPEG server for /stream/<cam_id>. Every viewer is a coroutine
+    on one event loop instead of a Flask thread; JPEGs come from the
+    manager's broadcasters, called in the loop's executor, and frames are
+    produced by the pipeline as before.
+    Sends are bounded by drain() with a timeout, so viewers that stall
+    longer than send_timeout are disconnected.
+    """
+
+    def __init__(self, manager, host='0.0.0.0', port=5002, poll_fps=30, queue_size=2, send_timeout=10.0):
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self.poll_interval = 1.0 / poll_fps
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+
+        self.feeds = {}  # cam_id -> CameraFeed
+        self.loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+        self.connections_total = 0
+        self.slow_disconnects = 0
+
+    # ---- lifecycle ---------------------------------------------------
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='mjpeg-stream-server', daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._server = self.loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, reuse_address=True))
+        logger.info(f"MJPEG stream server listening on {self.host}:{self.port}")
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def stop(self):
+        if self.loop is None:
+            return
+
+        async def shutdown():
+            self._server.close()
+            # Cancel the viewer handlers and feeds, and let their cleanup run before the loop goes away
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.loop.stop()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop)
+        self._thread.join(timeout=5)
+
+    # ---- HTTP --------------------------------------------------------
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=10)
+            parts = request_line.decode('latin-1').split()
+            # Headers are not needed; read them so the request is fully consumed
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=10)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+        except (asyncio.TimeoutError, ConnectionError, UnicodeDecodeError):
+            writer.close()
+            return
+
+        if len(parts) < 2 or parts[0] != 'GET':
+            await self._respond(writer, 405, b'Method Not Allowed')
+            return
+        path, _, query = parts[1].partition('?')
+
+        match = STREAM_PATH.match(path)
+        if match:
+            try:
+                profile = StreamProfile.from_args(dict(parse_qsl(query)))
+            except ValueError as e:
+                await self._respond(writer, 400, json.dumps({'error': str(e)}).encode(), 'application/json')
+                return
+            await self._stream(int(match.group(1)), profile, peer, writer)
+        elif path == '/stats':
+            await self._respond(writer, 200, json.dumps(self.get_stats()).encode(), 'application/json')
+        else:
+            await self._respond(writer, 404, b'Not Found')
+
+    async def _respond(self, writer, status, body, content_type='text/plain'):
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}.get(status, '')
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def _stream(self, cam_id, profile, peer, writer):
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH)
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_SEND_BUFFER)
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: multipart/x-mixed-replace; boundary=" + BOUNDARY + b"\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+
+        client = StreamClient(cam_id, peer, profile, self.queue_size)
+        self._subscribe(client)
+        self.connections_total += 1
+        logger.info(f"Stream client {peer} connected to cam_id={cam_id}")
+        try:
+            while True:
+                jpeg = await client.queue.get()
+                send_start = time.monotonic()
+                writer.write(b'--' + BOUNDARY + b'\r\nContent-Type: image/jpeg\r\nContent-Length: '
+                             + str(len(jpeg)).encode() + b'\r\n\r\n' + jpeg + b'\r\n')
+                await asyncio.wait_for(writer.drain(), timeout=self.send_timeout)
+                client.session.record_send(time.monotonic() - send_start)
+                client.frames_sent += 1
+        except asyncio.TimeoutError:
+            self.slow_disconnects += 1
+            logger.info(f"Stream client {peer} on cam_id={cam_id} too slow, disconnecting")
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._unsubscribe(client)
+            writer.close()
+            logger.info(f"Stream client {peer} disconnected from cam_id={cam_id}")
+
+    # ---- frame production --------------------------------------------
+
+    def _subscribe(self, client):
+        feed = self.feeds.get(client.cam_id)
+        if feed is None:
+            feed = self.feeds[client.cam_id] = CameraFeed(client.cam_id)
+            feed.task = self.loop.create_task(self._feed(feed))
+        feed.clients.add(client)
+
+    def _unsubscribe(self, client):
+        feed = self.feeds.get(client.cam_id)
+        if feed is None:
+            return
+        feed.clients.discard(client)
+        if not feed.clients:
+            feed.task.cancel()
+            del self.feeds[client.cam_id]
+
+    async def _feed(self, feed):
+        while feed.clients:
+            # Clients whose fps cap allows a frame, grouped by the encoding they need
+            groups = {}
+            for client in list(feed.clients):
+                if client.session.delay() == 0:
+                    groups.setdefault((client.session.quality, client.session.max_width), []).append(client)
+
+            for (quality, max_width), clients in groups.items():
+                # The broadcaster encodes each frame once per encoding, for these clients and Flask viewers alike
+                try:
+                    broadcaster = self.manager.broadcaster(feed.cam_id, quality, max_width)
+                    frame = await self.loop.run_in_executor(None, broadcaster.latest)
+                except Exception as e:
+                    logger.error(f"Could not get a frame for cam_id={feed.cam_id}: {e}")
+                    continue
+                if frame is None:
+                    continue
+                for client in clients:
+                    if frame.seq != client.last_seq:
+                        client.last_seq = frame.seq
+                        client.session.schedule()
+                        client.offer(frame.jpeg)
+            await asyncio.sleep(self.poll_interval)
+
+    def get_stats(self):
+        feeds = {}
+        for cam_id, feed in list(self.feeds.items()):
+            clients = list(feed.clients)
+            feeds[cam_id] = {
+                'clients': len(clients),
+                'frames_sent': sum(client.frames_sent for client in clients),
+                'frames_dropped': sum(client.frames_dropped for client in clients),
+                'adaptive_steps_down': sum(client.session.adaptive.steps_down
+                                           for client in clients if client.session.adaptive),
+            }
+        return {
+            'port': self.port,
+            'clients': sum(feed['clients'] for feed in feeds.values()),
+            'connections_total': self.connections_total,
+            'slow_disconnects': self.slow_disconnects,
+            'cameras': feeds,
+        }
@@ -0,0 +1,318 @@
+import logging
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+from flask import Blueprint, Flask, current_app, jsonify, redirect, request
+
+from extensions import db
+from models import Camera, CameraStatus
+from storage import configure_engine
+
+# Configure logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+if not logger.handlers:  # Avoid duplicate logs
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)
+    formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+WORKER_BASE_PORT = 5101  # worker k listens on WORKER_BASE_PORT + k
+RECONCILE_INTERVAL = 5.0  # seconds between health checks / assignment reconciliation
+RESTART_BACKOFF = 5.0  # minimum seconds between restarts of the same worker
+WORKER_TIMEOUT = 5.0  # seconds for HTTP calls to a worker
+
+
+class WorkerHandle:
+    """One emotion worker process owning a shard of the cameras."""
+
+    def __init__(self, index, port):
+        self.index = index
+        self.port = port
+        self.process = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.cameras = set()  # cameras assigned to this worker by the supervisor
+        self.last_stats = None  # latest /stats reply, None while unreachable
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+
+class ShardSupervisor:
+    """
+    Runs K emotion_worker_service processes, each with its own camera
+    manager on its own port, and keeps every active camera assigned to
+    exactly one of them. Cameras go to the least-loaded worker, crashed
+    workers are restarted and get their cameras back, and the shards are
+    rebalanced whenever cameras come or go. Assignment state is reconciled
+    against the DB and against what each worker reports in /stats, so a
+    worker that is still starting up simply receives its cameras on a
+    later pass.
+    """
+
+    def __init__(self, app, num_workers, base_port=WORKER_BASE_PORT, max_cameras_per_worker=10, worker_args=()):
+        self.app = app
+        self.max_cameras_per_worker = max_cameras_per_worker
+        self.worker_args = list(worker_args)  # passed through to every worker, e.g. --pipeline
+        self.workers = [WorkerHandle(k, base_port + k) for k in range(num_workers)]
+        self.assignments = {}  # cam_id -> WorkerHandle
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self.running = False
+        self.moves = 0
+
+    # ---- worker processes --------------------------------------------
+
+    def _spawn(self, worker):
+        command = [sys.executable, '-m', 'emotion_detection_service.emotion_worker_service',
+                   '--port', str(worker.port), '--no-autostart',
+                   '--max-cameras', str(self.max_cameras_per_worker)] + self.worker_args
+        worker.process = subprocess.Popen(command)
+        worker.started_at = time.monotonic()
+        worker.last_stats = None
+        logger.info(f"Started worker {worker.index} on port {worker.port} (pid {worker.process.pid})")
+
+    def start(self):
+        self.running = True
+        for worker in self.workers:
+            self._spawn(worker)
+        self._monitor = threading.Thread(target=self._monitor_loop, daemon=True)
+        self._monitor.start()
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+        for worker in self.workers:
+            if worker.alive:
+                worker.process.terminate()
+        for worker in self.workers:
+            if worker.process is not None:
+                try:
+                    worker.process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    worker.process.kill()
+        logger.info("All workers stopped.")
+
+    # ---- assignment --------------------------------------------------
+
+    def owner_of(self, cam_id):
+        with self._lock:
+            return self.assignments.get(cam_id)
+
+    def _least_loaded(self):
+        candidates = [w for w in self.workers if len(w.cameras) < self.max_cameras_per_worker]
+        return min(candidates, key=lambda w: len(w.cameras)) if candidates else None
+
+    def assign(self, cam_id):
+        """Give a camera to the least-loaded worker; returns the owner, or None when every shard is full."""
+        with self._lock:
+            worker = self.assignments.get(cam_id)
+            if worker is None:
+                worker = self._least_loaded()
+                if worker is None:
+                    logger.warning(f"All {len(self.workers)} workers are full. Cannot assign camera {cam_id}.")
+                    return None
+                worker.cameras.add(cam_id)
+                self.assignments[cam_id] = worker
+                logger.info(f"Camera {cam_id} assigned to worker {worker.index}")
+        self._wake.set()
+        return worker
+
+    def unassign(self, cam_id):
+        with self._lock:
+            worker = self.assignments.pop(cam_id, None)
+            if worker is not None:
+                worker.cameras.discard(cam_id)
+                logger.info(f"Camera {cam_id} unassigned from worker {worker.index}")
+        self._wake.set()
+        return worker
+
+    def _rebalance(self):
+        """Move cameras from the fullest to the emptiest shard until they differ by at most one."""
+        with self._lock:
+            while True:
+                fullest = max(self.workers, key=lambda w: len(w.cameras))
+                emptiest = min(self.workers, key=lambda w: len(w.cameras))
+                if len(fullest.cameras) - len(emptiest.cameras) <= 1:
+                    return
+                cam_id = max(fullest.cameras)  # the most recently added, by id
+                fullest.cameras.discard(cam_id)
+                emptiest.cameras.add(cam_id)
+                self.assignments[cam_id] = emptiest
+                self.moves += 1
+                logger.info(f"Rebalanced camera {cam_id}: worker {fullest.index} -> worker {emptiest.index}")
+
+    # ---- reconciliation ----------------------------------------------
+
+    def _post_status(self, worker, cam_id, status):
+        try:
+            response = requests.post(f"{worker.url}/camera_status_update",
+                                     json={'camera_id': cam_id, 'status': status}, timeout=WORKER_TIMEOUT)
+            return response.ok
+        except requests.RequestException as e:
+            logger.debug(f"Worker {worker.index} unreachable for camera {cam_id}: {e}")
+            return False
+
+    def notify_status(self, cam_id, status, worker=None):
+        """
+        Push a camera status change to a worker now instead of on the next
+        reconcile pass; worker defaults to the camera's current owner.
+        Returns False if no worker was told (the reconcile loop retries).
+        """
+        worker = worker or self.owner_of(cam_id)
+        if worker is None:
+            return False
+        return self._post_status(worker, cam_id, status)
+
+    def _fetch_stats(self, worker):
+        try:
+            response = requests.get(f"{worker.url}/stats", timeout=WORKER_TIMEOUT)
+            if response.ok:
+                return response.json()
+        except (requests.RequestException, ValueError):
+            pass
+        return None
+
+    def reconcile(self):
+        # Restart workers that died; their cameras stay assigned and are pushed again once they are up
+        for worker in self.workers:
+            if self.running and not worker.alive and time.monotonic() - worker.started_at >= RESTART_BACKOFF:
+                logger.error(f"Worker {worker.index} exited with code {worker.process.returncode}, restarting")
+                worker.restarts += 1
+                self._spawn(worker)
+
+        # The DB is the source of truth for which cameras should run at all
+        with self.app.app_context():
+            active_ids = {cam.id for cam in Camera.query.filter_by(status=CameraStatus.Active).all()}
+        with self._lock:
+            for cam_id in list(self.assignments):
+                if cam_id not in active_ids:
+                    self.unassign(cam_id)
+            for cam_id in sorted(active_ids - set(self.assignments)):
+                self.assign(cam_id)
+            self._rebalance()
+            desired = {worker.index: set(worker.cameras) for worker in self.workers}
+
+        # Make every reachable worker run exactly its shard
+        for worker in self.workers:
+            stats = self._fetch_stats(worker) if worker.alive else None
+            worker.last_stats = stats
+            if stats is None:
+                continue
+            running = {int(cam_id) for cam_id in stats.get('cameras', {})}
+            for cam_id in running - desired[worker.index]:
+                self._post_status(worker, cam_id, 'Inactive')
+            for cam_id in desired[worker.index] - running:
+                self._post_status(worker, cam_id, 'Active')
+
+    def _monitor_loop(self):
+        while self.running:
+            try:
+                self.reconcile()
+            except Exception as e:
+                logger.error(f"Error during reconciliation: {e}", exc_info=True)
+            self._wake.wait(RECONCILE_INTERVAL)
+            self._wake.clear()
+
+    def get_stats(self):
+        with self._lock:
+            workers = []
+            for worker in self.workers:
+                stats = worker.last_stats or {}
+                workers.append({
+                    'index': worker.index,
+                    'port': worker.port,
+                    'pid': worker.process.pid if worker.process else None,
+                    'alive': worker.alive,
+                    'reachable': worker.last_stats is not None,
+                    'restarts': worker.restarts,
+                    'assigned_cameras': sorted(worker.cameras),
+                    'running_cameras': sorted(int(cam_id) for cam_id in stats.get('cameras', {})),
+                    'memory': stats.get('memory'),
+                })
+            return {
+                'mode': 'sharded',
+                'active_cameras': len(self.assignments),
+                'max_cameras': self.max_cameras_per_worker * len(self.workers),
+                'rebalance_moves': self.moves,
+                'workers': workers,
+                'cameras': {cam_id: (worker.last_stats or {}).get('cameras', {}).get(str(cam_id))
+                            for cam_id, worker in self.assignments.items()},
+            }
+
+
+front_bp = Blueprint('front', __name__)
+
+
+def _supervisor():
+    return current_app.extensions['shard_supervisor']
+
+
+@front_bp.route('/stream/<int:cam_id>', methods=['GET'])
+def stream(cam_id):
+    worker = _supervisor().owner_of(cam_id)
+    if worker is None:
+        return jsonify({'error': f'Camera {cam_id} is not assigned to any worker'}), 404
+    # Send the client straight to the owning worker so frames never pass through this process
+    host = request.host.rsplit(':', 1)[0]
+    query = f"?{request.query_string.decode()}" if request.query_string else ""
+    return redirect(f"http://{host}:{worker.port}/stream/{cam_id}{query}", code=307)
+
+
+@front_bp.route('/camera_status_update', methods=['POST'])
+def camera_status_update():
+    data = request.get_json()
+    camera_id = data.get('camera_id')
+    status = data.get('status')
+
+    if camera_id is None or status is None:
+        return jsonify({'error': 'camera_id and status are required'}), 400
+
+    supervisor = _supervisor()
+    if status == 'Active':
+        if not db.session.get(Camera, camera_id):
+            return jsonify({'error': 'Camera not found'}), 404
+        worker = supervisor.assign(camera_id)
+        if worker is None:
+            return jsonify({'error': 'All workers are at capacity'}), 503
+    elif status == 'Inactive':
+        worker = supervisor.unassign(camera_id)
+    else:
+        return jsonify({'error': 'Invalid status'}), 400
+
+    # Apply it on the owner right away; the reconcile loop retries if the worker is busy restarting
+    if worker is not None:
+        supervisor.notify_status(camera_id, status, worker)
+    return jsonify({'message': f'Status updated to {status}',
+                    'worker': worker.index if worker else None}), 200
+
+
+@front_bp.route('/stats', methods=['GET'])
+def stats():
+    return jsonify(_supervisor().get_stats()), 200
+
+
+def create_front_app(supervisor):
+    """Flask app for the routing front end: same URLs as a worker, but it owns no cameras."""
+    from emotion_detection_service import Config
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    with app.app_context():
+        # The workers create tables and run migrations; the front end only reads
+        configure_engine(db.engine)
+    app.extensions['shard_supervisor'] = supervisor
+    app.register_blueprint(front_bp)
+    return app
@@ -0,0 +1,193 @@
+import itertools
+import logging
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from emotion_detection_service.classification_cache import ClassificationCache
+
+# Configure logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARN)
+
+if not logger.handlers:  # Avoid duplicate logs
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.DEBUG)
+    formatter = logging.Formatter('[%(asctime)s] [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+
+FLOW_WIDTH = 480  # optical flow runs on a copy of the frame scaled to this width
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def centroid_distance(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    return np.hypot((ax + aw / 2) - (bx + bw / 2), (ay + ah / 2) - (by + bh / 2))
+
+
+class Track:
+    """One face followed across frames, with its own emotion history and alert state."""
+
+    def __init__(self, track_id, box, history=10):
+        self.track_id = track_id
+        self.box = box  # (x, y, w, h) in frame coordinates
+        self.emotion_buffer = deque(maxlen=history)
+        self.last_negative_emotion = None
+        self.hits = 1
+        self.misses = 0  # consecutive keyframes without a matching detection
+        self.lost = False  # optical flow could not follow it since the last keyframe
+        self.lost_at = 0.0  # monotonic time it was lost
+        self.classification_cache = ClassificationCache()
+
+
+class FaceTracker:
+    """
+    Associates detections across keyframes by IoU (falling back to centroid
+    distance) and, between keyframes, moves the boxes with sparse optical
+    flow. The detector only needs to run on keyframes, when there is nobody
+    to track, or when a track was lost.
+
+    Misses are only counted on keyframes, and keyframes stop while the
+    motion gate is closed, so a track that stays lost for `max_lost_seconds`
+    of wall-clock time is retired without waiting for one.
+    """
+
+    def __init__(self, detect_interval=4, iou_threshold=0.3, max_misses=2, use_optical_flow=True,
+                 max_lost_seconds=2.0):
+        self.detect_interval = detect_interval
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.max_lost_seconds = max_lost_seconds
+        self.use_optical_flow = use_optical_flow
+
+        self.tracks = []
+        self._ids = itertools.count(1)
+        self._frames_since_detection = 0
+        self._prev_gray = None
+        self._flow_scale = 1.0
+
+    def needs_detection(self):
+        if not self.tracks:
+            return True
+        if any(track.lost for track in self.tracks):
+            return True
+        return self._frames_since_detection >= self.detect_interval - 1
+
+    def update(self, boxes, frame):
+        """Keyframe: match fresh detections to tracks, start new tracks and retire stale ones."""
+        self._frames_since_detection = 0
+        self._remember(frame)
+
+        pairs = []
+        for t_index, track in enumerate(self.tracks):
+            for d_index, box in enumerate(boxes):
+                overlap = iou(track.box, box)
+                if overlap >= self.iou_threshold:
+                    pairs.append((overlap, t_index, d_index))
+                elif centroid_distance(track.box, box) < 0.5 * max(track.box[2], track.box[3]):
+                    # Fast movers can lose all overlap between keyframes; rank them below any IoU match
+                    pairs.append((overlap - 1.0, t_index, d_index))
+        pairs.sort(reverse=True)
+
+        matched_tracks, matched_boxes = set(), set()
+        for _, t_index, d_index in pairs:
+            if t_index in matched_tracks or d_index in matched_boxes:
+                continue
+            track = self.tracks[t_index]
+            track.box = boxes[d_index]
+            track.hits += 1
+            track.misses = 0
+            track.lost = False
+            matched_tracks.add(t_index)
+            matched_boxes.add(d_index)
+
+        survivors = []
+        for t_index, track in enumerate(self.tracks):
+            if t_index not in matched_tracks:
+                track.misses += 1
+                track.lost = False
+                if track.misses > self.max_misses:
+                    logger.debug(f"Track {track.track_id} retired after {track.misses} missed keyframes")
+                    continue
+            survivors.append(track)
+
+        for d_index, box in enumerate(boxes):
+            if d_index not in matched_boxes:
+                track = Track(next(self._ids), box)
+                logger.debug(f"Track {track.track_id} started at {box}")
+                survivors.append(track)
+
+        self.tracks = survivors
+        return self.tracks
+
+    def propagate(self, frame):
+        """Non-keyframe: carry every track forward, following it with optical flow if enabled."""
+        self._frames_since_detection += 1
+        if not self.use_optical_flow or self._prev_gray is None:
+            return self.tracks
+
+        prev_gray = self._prev_gray
+        gray = self._remember(frame)
+        frame_h, frame_w = frame.shape[:2]
+        scale = self._flow_scale
+
+        for track in self.tracks:
+            x, y, w, h = track.box
+            sx, sy, sw, sh = int(x * scale), int(y * scale), max(1, int(w * scale)), max(1, int(h * scale))
+            mask = np.zeros_like(prev_gray)
+            mask[sy:sy + sh, sx:sx + sw] = 255
+            points = cv2.goodFeaturesToTrack(prev_gray, maxCorners=20, qualityLevel=0.01,
+                                             minDistance=3, mask=mask)
+            if points is None or len(points) < 3:
+                self._mark_lost(track)
+                continue
+
+            moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None,
+                                                        winSize=(15, 15), maxLevel=2)
+            good = status.ravel() == 1
+            if good.sum() < 3:
+                self._mark_lost(track)
+                continue
+
+            dx, dy = np.median((moved[good] - points[good]).reshape(-1, 2), axis=0) / scale
+            nx = int(round(min(max(0, x + dx), frame_w - w)))
+            ny = int(round(min(max(0, y + dy), frame_h - h)))
+            track.box = (nx, ny, w, h)
+
+        now = time.monotonic()
+        survivors = []
+        for track in self.tracks:
+            if track.lost and now - track.lost_at > self.max_lost_seconds:
+                logger.debug(f"Track {track.track_id} retired after {now - track.lost_at:.1f}s lost")
+                continue
+            survivors.append(track)
+        self.tracks = survivors
+        return self.tracks
+
+    @staticmethod
+    def _mark_lost(track):
+        if not track.lost:
+            track.lost = True
+            track.lost_at = time.monotonic()
+
+    def _remember(self, frame):
+        if not self.use_optical_flow:
+            return None
+        h, w = frame.shape[:2]
+        self._flow_scale = min(1.0, FLOW_WIDTH / w)
+        small = cv2.resize(frame, (int(w * self._flow_scale), int(h * self._flow_scale)))
+        self._prev_gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return self._prev_gray
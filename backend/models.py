@@ -75,6 +75,12 @@ class Camera(db.Model):
 # ---------- Detection Log Model ----------
 class DetectionLog(db.Model):
     __tablename__ = 'detection_logs'
+    # Match the query shapes: time ranges, per camera and per emotion over time (storage migration 1)
+    __table_args__ = (
+        db.Index('ix_detection_logs_timestamp', 'timestamp'),
+        db.Index('ix_detection_logs_camera_id_timestamp', 'camera_id', 'timestamp'),
+        db.Index('ix_detection_logs_emotion_timestamp', 'emotion', 'timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     camera_id = db.Column(db.Integer, nullable=False)  # No ForeignKey constraint now
@@ -105,3 +111,38 @@ class DetectionLog(db.Model):
 
     def __repr__(self):
         return f"<Log Cam#{self.camera_id} ({self.camera_label}) - {self.emotion} @ {self.timestamp}>"
+
+
+# ---------- Detection Rollup Models ----------
+class DetectionRollupMixin:
+    """Per (bucket, camera, emotion) totals of detection_logs, kept current by rollups.py."""
+    bucket = db.Column(db.DateTime, primary_key=True)  # bucket start on the analytics clock (rollups.CLOCK_OFFSET)
+    camera_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    emotion = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    confidence_sum = db.Column(db.Float, nullable=False, default=0.0)
+    confidence_count = db.Column(db.Integer, nullable=False, default=0)  # logs that have a confidence
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.bucket} Cam#{self.camera_id} {self.emotion}: {self.count}>"
+
+
+class DetectionRollupMinute(DetectionRollupMixin, db.Model):
+    __tablename__ = 'detection_rollup_minute'
+
+
+class DetectionRollupHour(DetectionRollupMixin, db.Model):
+    __tablename__ = 'detection_rollup_hour'
+
+
+class DetectionRollupDay(DetectionRollupMixin, db.Model):
+    __tablename__ = 'detection_rollup_day'
+
+
+# ---------- Data Version Model ----------
+class DataVersion(db.Model):
+    """A counter per dataset, bumped in the same transaction as every change to it (see rollups.py)."""
+    __tablename__ = 'data_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
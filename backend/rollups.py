@@ -0,0 +1,216 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, func, inspect, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import DataVersion, DetectionLog, DetectionRollupDay, DetectionRollupHour, DetectionRollupMinute
+
+# The dashboard shows stored timestamps as UTC converted to IST. Buckets are cut on that clock, so an
+# hour or day bucket is exactly the hour or date the analytics label it with (IST has no DST).
+CLOCK_OFFSET = timedelta(hours=5, minutes=30)
+SQL_CLOCK_OFFSET = f"+{int(CLOCK_OFFSET.total_seconds() // 60)} minutes"
+EPOCH = datetime(2000, 1, 1)
+
+# Coarsest first: (name, model, bucket size, SQLite strftime format of the bucket start as SQLAlchemy stores it)
+LEVELS = [
+    ('day', DetectionRollupDay, timedelta(days=1), '%Y-%m-%d 00:00:00.000000'),
+    ('hour', DetectionRollupHour, timedelta(hours=1), '%Y-%m-%d %H:00:00.000000'),
+    ('minute', DetectionRollupMinute, timedelta(minutes=1), '%Y-%m-%d %H:%M:00.000000'),
+]
+LEVEL_NAMES = [level[0] for level in LEVELS]
+DETECTION_LOGS = 'detection_logs'  # DataVersion name bumped on every change to the logs
+
+
+def clock_time(ts):
+    """Stored timestamp -> analytics clock. Aware values are stored as their wall-clock time."""
+    return ts.replace(tzinfo=None) + CLOCK_OFFSET
+
+
+def floor_time(ts, size):
+    return EPOCH + (ts - EPOCH) // size * size
+
+
+def ceil_time(ts, size):
+    floor = floor_time(ts, size)
+    return floor if floor == ts else floor + size
+
+
+def _bucket_expr(fmt):
+    return func.strftime(fmt, DetectionLog.timestamp, SQL_CLOCK_OFFSET, type_=db.DateTime)
+
+
+def _raw_bounds(query, start, end):
+    """Filter raw logs to the clock range [start, end); None is unbounded."""
+    if start is not None:
+        query = query.where(DetectionLog.timestamp >= start - CLOCK_OFFSET)
+    if end is not None:
+        query = query.where(DetectionLog.timestamp < end - CLOCK_OFFSET)
+    return query
+
+
+# ---------- Incremental maintenance ----------
+
+def bump_version(connection, name=DETECTION_LOGS):
+    table = DataVersion.__table__
+    stmt = insert(table).values(name=name, version=1)
+    connection.execute(stmt.on_conflict_do_update(index_elements=['name'], set_={'version': table.c.version + 1}))
+
+
+def data_version(name=DETECTION_LOGS):
+    """Changes whenever the dataset does, in any process; one primary key lookup."""
+    return db.session.execute(select(DataVersion.version).where(DataVersion.name == name)).scalar() or 0
+
+
+def _collect_deltas(session):
+    deltas = defaultdict(lambda: [0, 0.0, 0])
+    changes = [(obj, 1) for obj in session.new] + [(obj, -1) for obj in session.deleted]
+    for obj, sign in changes:
+        if not isinstance(obj, DetectionLog) or obj.timestamp is None:
+            continue
+        clock = clock_time(obj.timestamp)
+        for name, _, size, _ in LEVELS:
+            delta = deltas[(name, floor_time(clock, size), obj.camera_id, obj.emotion)]
+            delta[0] += sign
+            if obj.confidence is not None:
+                delta[1] += sign * obj.confidence
+                delta[2] += sign
+    return deltas
+
+
+def _update_rollups(session, flush_context):
+    # Runs inside the flush, so the rollups commit or roll back together with the logs
+    deltas = _collect_deltas(session)
+    if not deltas:
+        return
+    connection = session.connection()
+    for name, model, _, _ in LEVELS:
+        rows = [{'bucket': bucket, 'camera_id': camera_id, 'emotion': emotion,
+                 'count': count, 'confidence_sum': confidence_sum, 'confidence_count': confidence_count}
+                for (level, bucket, camera_id, emotion), (count, confidence_sum, confidence_count) in deltas.items()
+                if level == name]
+        table = model.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['bucket', 'camera_id', 'emotion'],
+            set_={'count': table.c.count + stmt.excluded.count,
+                  'confidence_sum': table.c.confidence_sum + stmt.excluded.confidence_sum,
+                  'confidence_count': table.c.confidence_count + stmt.excluded.confidence_count})
+        connection.execute(stmt, rows)
+        if any(row['count'] < 0 for row in rows):
+            connection.execute(delete(table).where(table.c.count <= 0,
+                                                   table.c.bucket.in_({row['bucket'] for row in rows})))
+    bump_version(connection)
+
+
+event.listen(Session, 'after_flush', _update_rollups)
+
+
+def create_rollup_tables(connection):
+    for _, model, _, _ in LEVELS:
+        model.__table__.create(connection, checkfirst=True)
+
+
+def create_version_table(connection):
+    DataVersion.__table__.create(connection, checkfirst=True)
+
+
+def rebuild_rollups(connection, start=None, end=None, camera_id=None):
+    """
+    Recompute the rollups from the raw logs, for every bucket touching the
+    stored-time range [start, end) (None is unbounded) and optionally one
+    camera. Needed after bulk deletes or inserts that bypass the ORM flush.
+    """
+    for _, model, size, fmt in LEVELS:
+        table = model.__table__
+        low = floor_time(clock_time(start), size) if start is not None else None
+        high = ceil_time(clock_time(end), size) if end is not None else None
+
+        clear = delete(table)
+        if low is not None:
+            clear = clear.where(table.c.bucket >= low)
+        if high is not None:
+            clear = clear.where(table.c.bucket < high)
+        if camera_id is not None:
+            clear = clear.where(table.c.camera_id == camera_id)
+        connection.execute(clear)
+
+        bucket = _bucket_expr(fmt)
+        source = _raw_bounds(select(
+            bucket, DetectionLog.camera_id, DetectionLog.emotion, func.count(),
+            func.coalesce(func.sum(DetectionLog.confidence), 0.0), func.count(DetectionLog.confidence),
+        ), low, high)
+        if camera_id is not None:
+            source = source.where(DetectionLog.camera_id == camera_id)
+        source = source.group_by(bucket, DetectionLog.camera_id, DetectionLog.emotion)
+        connection.execute(table.insert().from_select(
+            ['bucket', 'camera_id', 'emotion', 'count', 'confidence_sum', 'confidence_count'], source))
+    if inspect(connection).has_table(DataVersion.__tablename__):  # migration 2 ran before the table existed
+        bump_version(connection)
+
+
+# ---------- Queries ----------
+
+def _pieces(start, end, levels):
+    """Split the clock range [start, end) into whole buckets of the coarsest levels that fit and raw edges."""
+    if start is not None and end is not None and start >= end:
+        return []
+    if not levels:
+        return [(None, start, end)]
+    size = levels[0][2]
+    low = ceil_time(start, size) if start is not None else None
+    high = floor_time(end, size) if end is not None else None
+    if low is not None and high is not None and low >= high:
+        return _pieces(start, end, levels[1:])
+    pieces = [(levels[0], low, high)]
+    if start is not None:
+        pieces += _pieces(start, low, levels[1:])
+    if end is not None:
+        pieces += _pieces(high, end, levels[1:])
+    return pieces
+
+
+def detection_counts(start=None, end=None, coarsest='day'):
+    """
+    (bucket, emotion, count, confidence_sum, confidence_count) for the logs
+    with stored timestamps in [start, end), summed over cameras and sorted
+    by bucket. Buckets are on the analytics clock and no coarser than
+    `coarsest`; whole buckets come from the rollups, partial ones at the
+    edges are counted from the raw logs per minute.
+    """
+    levels = LEVELS[LEVEL_NAMES.index(coarsest):]
+    start = clock_time(start) if start is not None else None
+    end = clock_time(end) if end is not None else None
+    rows = []
+    for level, low, high in _pieces(start, end, levels):
+        if level is None:
+            bucket = _bucket_expr(LEVELS[-1][3])
+            query = _raw_bounds(select(
+                bucket, DetectionLog.emotion, func.count(),
+                func.coalesce(func.sum(DetectionLog.confidence), 0.0), func.count(DetectionLog.confidence),
+            ), low, high).group_by(bucket, DetectionLog.emotion)
+        else:
+            table = level[1].__table__
+            query = select(table.c.bucket, table.c.emotion, func.sum(table.c.count),
+                           func.sum(table.c.confidence_sum), func.sum(table.c.confidence_count))
+            if low is not None:
+                query = query.where(table.c.bucket >= low)
+            if high is not None:
+                query = query.where(table.c.bucket < high)
+            query = query.group_by(table.c.bucket, table.c.emotion)
+        rows.extend(tuple(row) for row in db.session.execute(query))
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+
+def first_detections(emotions, start=None):
+    """Earliest stored timestamp per emotion since start; each is a seek on the (emotion, timestamp) index."""
+    first = {}
+    for emotion in emotions:
+        query = select(func.min(DetectionLog.timestamp)).where(DetectionLog.emotion == emotion)
+        if start is not None:
+            query = query.where(DetectionLog.timestamp >= start)
+        first[emotion] = db.session.execute(query).scalar()
+    return first
@@ -0,0 +1,119 @@
+import time
+from datetime import datetime
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+from rollups import create_rollup_tables, create_version_table, rebuild_rollups  # also registers the flush hook
+
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),  # readers see the last commit while the emotion service writes
+    ('synchronous', 'NORMAL'),  # with WAL a power cut can lose the last commits, never corrupt the file
+    ('mmap_size', 256 * 1024 * 1024),
+    ('cache_size', -64 * 1024),  # negative means KiB: 64 MB page cache per connection
+    ('busy_timeout', 5000),  # wait for the other service's write instead of failing with "database is locked"
+    ('temp_store', 'MEMORY'),
+)
+
+MIGRATION_LOCK_WAIT = 30 * 60  # seconds to wait for another process's migration (v1 takes ~2 min on 10M rows)
+
+# (version, name, steps). A step is SQL or a callable taking the connection. Every process runs the
+# pending ones at startup; migrate() serializes them behind SQLite's write lock.
+MIGRATIONS = [
+    (1, 'detection_logs indexes', [
+        "CREATE INDEX IF NOT EXISTS ix_detection_logs_timestamp ON detection_logs (timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_detection_logs_camera_id_timestamp ON detection_logs (camera_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_detection_logs_emotion_timestamp ON detection_logs (emotion, timestamp)",
+        "ANALYZE detection_logs",
+    ]),
+    (2, 'detection rollups', [
+        create_rollup_tables,
+        rebuild_rollups,
+    ]),
+    (3, 'data versions', [
+        create_version_table,
+    ]),
+]
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def configure_engine(engine):
+    """Apply SQLITE_PRAGMAS to every connection the engine opens from now on."""
+    if engine.dialect.name != 'sqlite' or event.contains(engine, 'connect', _set_sqlite_pragmas):
+        return
+    event.listen(engine, 'connect', _set_sqlite_pragmas)
+    engine.dispose()  # pooled connections opened before the listener reconnect with the pragmas
+
+
+def _begin_immediate(conn, wait):
+    """Take the database write lock, waiting out other writers (e.g. another process migrating)."""
+    deadline = time.monotonic() + wait
+    announced = False
+    while True:
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")  # busy_timeout applies to each attempt
+            return
+        except OperationalError as e:
+            if 'locked' not in str(e) or time.monotonic() > deadline:
+                raise
+            if not announced:
+                print("⏳ Database is locked, waiting for another process (migration in progress?)")
+                announced = True
+
+
+def applied_migrations(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, applied_at DATETIME NOT NULL)"
+    ))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def migrate(engine, migrations=MIGRATIONS, metadata=None, wait=MIGRATION_LOCK_WAIT):
+    """
+    Create metadata's missing tables, then run the migrations not yet
+    recorded in schema_migrations, in version order; returns their versions.
+    All of it happens in one BEGIN IMMEDIATE transaction, and the applied
+    versions are read inside it, so a process starting while another one
+    migrates waits for it and then finds nothing left to do.
+    """
+    ran = []
+    # Autocommit at the driver level, so the BEGIN IMMEDIATE below is the only transaction
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        _begin_immediate(conn, wait)
+        try:
+            if metadata is not None:
+                metadata.create_all(conn)
+            done = applied_migrations(conn)
+            for version, name, steps in sorted(migrations, key=lambda migration: migration[0]):
+                if version in done:
+                    continue
+                started = datetime.utcnow()
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(text(step))
+                conn.execute(text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                             {'v': version, 'n': name, 't': started})
+                ran.append((version, name, (datetime.utcnow() - started).total_seconds()))
+            conn.exec_driver_sql("COMMIT")
+        except BaseException:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+    for version, name, elapsed in ran:
+        print(f"🗄️ Applied migration {version} ({name}) in {elapsed:.1f}s")
+    return [version for version, _, _ in ran]
+
+
+def init_storage():
+    """Inside an app context: SQLite pragmas on every connection, missing tables, pending migrations."""
+    configure_engine(db.engine)
+    migrate(db.engine, metadata=db.metadata)